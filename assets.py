@@ -0,0 +1,143 @@
+import glob
+import hashlib
+import os
+import struct
+import time
+import pygame
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT, BIRD_WIDTH, BIRD_HEIGHT, COIN_WIDTH, PIPE_WIDTH
+
+
+CACHE_DIR = "cache"  # Scaled sprites are stored here, so later starts skip decoding the large PNGs
+CACHE_VERSION = 1  # Bump when the scaling rules change
+CACHE_HEADER = struct.Struct("<II")  # Width and height, followed by the RGBA pixels
+
+
+class AssetRegistry:
+    """Decodes, scales and converts every sprite once so entities can share the surfaces.
+
+    Loading is split in two: decode() reads and scales the files and needs no display, so it can run
+    on a background thread, while convert() must run on the main thread after set_mode().
+    Sounds live in the SoundBank of audio.py.
+    """
+
+    def __init__(self, use_cache=True):
+        self.use_cache = use_cache
+        self.images = {}
+        self.alpha = {}  # Sprite name -> whether it keeps per-pixel alpha when converted
+        self.load_time = 0.0  # Seconds spent decoding and converting the sprites
+        self.converted = False  # True once the sprites match the display pixel format
+
+    def load(self):
+        """Load all sprites. Call again after set_mode() to convert them to the display format."""
+        self.decode()
+        if pygame.display.get_surface() is not None:
+            self.convert()
+
+    def decode(self):
+        """Read and scale every sprite. Safe to call from a background thread."""
+        start = time.perf_counter()
+        images, alpha = {}, {}
+
+        def add(name, path, size, keep_alpha, smooth=False):
+            images[name] = self._scaled(name, path, size, smooth)
+            alpha[name] = keep_alpha
+
+        # Every bird pose is scaled to the bird size the simulations use for collisions
+        bird_size = (BIRD_WIDTH, BIRD_HEIGHT)
+        add("bird_rising", "static/bird_rising.png", bird_size, True, smooth=True)
+        add("bird_falling", "static/bird_falling.png", bird_size, True, smooth=True)
+        add("bird_neutral", "static/bird.png", bird_size, True, smooth=True)
+        add("bitcoin", "static/bitcoin.png", lambda w, h: (COIN_WIDTH, int(COIN_WIDTH * h / w)), True, smooth=True)
+
+        # Pipes keep their natural height and are only stretched to the pipe width
+        add("top_pipe", "static/top_pipe.png", lambda w, h: (PIPE_WIDTH, h), True)
+        add("bottom_pipe", "static/bottom_pipe.png", lambda w, h: (PIPE_WIDTH, h), True)
+
+        # The background is opaque, so a plain convert() gives the fastest blits
+        add("background", "static/background.png", (SCREEN_WIDTH, SCREEN_HEIGHT), False)
+
+        # Swap the finished set in at once, so other threads never see a partial registry
+        self.alpha = alpha
+        self.images = images
+        self.converted = False
+        self.load_time = time.perf_counter() - start
+
+    def _scaled(self, name, path, size, smooth):
+        """Return the image at path scaled to size, a (width, height) or a function of the source size.
+
+        Scaled sprites are kept in CACHE_DIR, keyed by the source file's size and modification time,
+        so only the first start pays for decoding the full-resolution PNGs. Writing a sprite removes its
+        older entries, so a resolution or source change leaves one file per sprite behind.
+        """
+        cache_path = None
+        if self.use_cache:
+            stat = os.stat(path)
+            key = (f"{name}|{path}|{stat.st_mtime_ns}|{stat.st_size}|{size if isinstance(size, tuple) else ''}|"
+                   f"{SCREEN_WIDTH}x{SCREEN_HEIGHT}|{smooth}|{CACHE_VERSION}")
+            cache_path = os.path.join(CACHE_DIR, f"sprite_{name}_{hashlib.sha1(key.encode()).hexdigest()[:12]}.rgba")
+            try:
+                with open(cache_path, "rb") as file:
+                    data = file.read()
+                width, height = CACHE_HEADER.unpack_from(data)
+                return pygame.image.frombytes(data[CACHE_HEADER.size:], (width, height), "RGBA")
+            except (OSError, ValueError, struct.error):
+                pass  # Missing or damaged: decode the source again
+
+        image = pygame.image.load(path)
+        if callable(size):
+            size = size(*image.get_size())
+        if smooth:
+            # smoothscale needs a 24 or 32 bit surface, which the PNGs already are
+            image = pygame.transform.smoothscale(image, size)
+        else:
+            image = pygame.transform.scale(image, size)
+
+        if cache_path:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                temporary = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as file:
+                    file.write(CACHE_HEADER.pack(*image.get_size()) + pygame.image.tobytes(image, "RGBA"))
+                os.replace(temporary, cache_path)  # Readers never see a half-written file
+                for stale in glob.glob(os.path.join(CACHE_DIR, f"sprite_{name}_{'?' * 12}.rgba")):
+                    if stale != cache_path:
+                        os.remove(stale)
+            except OSError:
+                pass  # A read-only install simply decodes every time
+        return image
+
+    def convert(self):
+        """Convert the decoded sprites to the display pixel format. Needs a display from set_mode()."""
+        start = time.perf_counter()
+        self.images = {name: image.convert_alpha() if self.alpha[name] else image.convert()
+                       for name, image in self.images.items()}
+        self.converted = True
+        self.load_time += time.perf_counter() - start
+
+    def get(self, name):
+        """Return the shared surface for a sprite, loading the registry on first use."""
+        if not self.images:
+            self.load()
+        return self.images[name]
+
+    def memory_usage(self):
+        """Return the number of bytes held by the decoded surfaces."""
+        return sum(image.get_pitch() * image.get_height() for image in self.images.values())
+
+    def report(self):
+        """Return load time and memory figures for the registry."""
+        return {
+            "sprites": len(self.images),
+            "load_time_ms": round(self.load_time * 1000, 2),
+            "memory_bytes": self.memory_usage(),
+            "converted": self.converted,
+        }
+
+    def format_report(self):
+        report = self.report()
+        return (f"Loaded {report['sprites']} sprites in {report['load_time_ms']} ms "
+                f"({report['memory_bytes'] / 1024 / 1024:.1f} MiB, converted={report['converted']})")
+
+
+# Shared registry used by every entity
+assets = AssetRegistry()
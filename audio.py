@@ -0,0 +1,170 @@
+import math
+import time
+from collections import deque
+import pygame
+from profiler import percentile
+from simulation import TICK_RATE
+
+
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 256  # Samples mixed at a time: about 6 ms at 44.1 kHz, where pygame's default is 512
+FLAP_SOUND_SECONDS = 0.4  # Length of static/flapp.wav, rounded up
+
+# Channels reserved for each category of sound, so one category can never cut off another
+CHANNELS = {
+    "music": 1,
+    # The bird flaps at most once per tick, so every flap can ring out even when SPACE is pressed on every tick
+    "flap": math.ceil(TICK_RATE * FLAP_SOUND_SECONDS),
+    "score": 2,
+}
+
+# Sound name -> (file, volume, category)
+SOUNDS = {
+    "bitconnect": ("static/bitconnect.wav", 0.05, "music"),
+    "cash": ("static/cash.wav", 0.18, "score"),
+    "flap": ("static/flapp.wav", 0.3, "flap"),
+}
+
+
+class SoundBank:
+    """Every sound of the game, loaded once, played on channels reserved for its category.
+
+    Each category owns a fixed set of mixer channels. A sound plays on an idle channel of its category,
+    and is skipped when all are busy, so a playing sound is never cut off: spamming SPACE reuses the flap
+    channels without interrupting the music, the score sounds or an earlier flap, and without allocating
+    anything per play.
+
+    play(name, pressed_at) also records how long after the key press the sound was started. Add the
+    mixer's buffer time (buffer_ms) for the delay until it can be heard.
+    """
+
+    def __init__(self, sounds=SOUNDS, channels=CHANNELS, frequency=MIXER_FREQUENCY, buffer=MIXER_BUFFER):
+        self.sound_files = sounds
+        self.channel_counts = channels
+        self.frequency = frequency
+        self.buffer = buffer
+        self.sounds = {}
+        self.categories = {}  # Sound name -> category
+        self.voices = {}  # Category -> its reserved Channels
+        self.next_voice = dict.fromkeys(channels, 0)  # Category -> index of the channel to try first
+        self.loaded = False
+        self.plays = 0
+        self.skipped = 0  # Plays left out because every channel of their category was busy
+        self.dispatch_ms = deque(maxlen=500)  # Key press to play() returning, for the latest presses
+
+    def configure(self, frequency=None, buffer=None):
+        """Set the mixer's rate and buffer size. Call before pygame.init(), which opens the mixer."""
+        self.frequency = frequency or self.frequency
+        self.buffer = buffer or self.buffer
+        pygame.mixer.pre_init(self.frequency, -16, 2, self.buffer)
+
+    def load(self):
+        """Load every sound and reserve the channels. Without an initialized mixer, or for a missing
+        file, the sound is left out and play() does nothing for it."""
+        if not self.loaded:
+            self.load_sounds()
+        self.reserve_channels()
+
+    def load_sounds(self):
+        """Decode every sound file. Needs an initialized mixer, but can run on a background thread;
+        until it has run with the mixer up, the bank is not marked loaded and later calls try again."""
+        if not pygame.mixer.get_init():
+            return
+        sounds, categories = {}, {}
+        for name, (path, volume, category) in self.sound_files.items():
+            try:
+                sound = pygame.mixer.Sound(path)
+            except (pygame.error, FileNotFoundError) as error:
+                print(f"Could not load sound {path}: {error}")
+                continue
+            sound.set_volume(volume)
+            sounds[name] = sound
+            categories[name] = category
+        self.categories = categories
+        self.sounds = sounds
+        self.loaded = True
+
+    def channels_lost(self):
+        """True when the mixer was restarted with fewer channels than were reserved, since a Channel
+        beyond the mixer's count must not be played."""
+        reserved = sum(self.channel_counts.values())
+        return bool(pygame.mixer.get_init()) and pygame.mixer.get_num_channels() < reserved
+
+    def reserve_channels(self):
+        """Reserve each category's mixer channels. Call on the main thread, once the mixer is up."""
+        if (self.voices and not self.channels_lost()) or not pygame.mixer.get_init():
+            return
+        # Reserved channels come first and are never handed out by Sound.play()
+        reserved = sum(self.channel_counts.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved + 2))
+        pygame.mixer.set_reserved(reserved)
+        voices, first = {}, 0
+        for category, count in self.channel_counts.items():
+            voices[category] = [pygame.mixer.Channel(first + i) for i in range(count)]
+            first += count
+        self.voices = voices
+
+    def sound(self, name):
+        """Return the loaded Sound called name, or None when it is not available."""
+        if not self.voices or self.channels_lost():
+            self.load()
+        return self.sounds.get(name)
+
+    def play(self, name, loops=0, pressed_at=None):
+        """Play a sound on its category's channels. pressed_at is the time.perf_counter() of the input
+        that triggered it, if any."""
+        sound = self.sound(name)
+        if sound is None:
+            return
+        category = self.categories[name]
+        voices = self.voices[category]
+        first = self.next_voice[category]
+        for offset in range(len(voices)):
+            index = (first + offset) % len(voices)
+            if not voices[index].get_busy():
+                break
+        else:
+            self.skipped += 1
+            return
+        voices[index].play(sound, loops)
+        self.next_voice[category] = (index + 1) % len(voices)
+        self.plays += 1
+        if pressed_at is not None:
+            self.dispatch_ms.append((time.perf_counter() - pressed_at) * 1000)
+
+    def stop(self):
+        for voices in self.voices.values():
+            for channel in voices:
+                channel.stop()
+
+    @property
+    def buffer_ms(self):
+        """Time one mixer buffer takes to play, the minimum delay before a started sound is heard."""
+        frequency = (pygame.mixer.get_init() or (self.frequency,))[0]
+        return self.buffer / frequency * 1000
+
+    def latency_report(self):
+        """Return the key press to sound delays, in milliseconds, as p50/p95/max of the dispatch time
+        plus the mixer buffer."""
+        dispatch = sorted(self.dispatch_ms)
+        report = {"plays": self.plays, "skipped": self.skipped, "presses": len(dispatch),
+                  "buffer_ms": round(self.buffer_ms, 2)}
+        if dispatch:
+            for label, value in (("p50", percentile(dispatch, 50)),
+                                 ("p95", percentile(dispatch, 95)),
+                                 ("max", dispatch[-1])):
+                report[f"dispatch_ms_{label}"] = round(value, 3)
+                report[f"latency_ms_{label}"] = round(value + self.buffer_ms, 2)
+        return report
+
+    def format_latency_report(self):
+        report = self.latency_report()
+        if not report["presses"]:
+            return f"Audio: {report['plays']} sounds played, no timed key presses"
+        return (f"Audio: key press to sound p50 {report['latency_ms_p50']} ms, p95 {report['latency_ms_p95']} ms, "
+                f"max {report['latency_ms_max']} ms ({report['buffer_ms']} ms of it the mixer buffer), "
+                f"{report['plays']} sounds played, {report['skipped']} skipped with every channel busy")
+
+
+# Shared sound bank used by the game and its entities
+sound_bank = SoundBank()
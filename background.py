@@ -1,16 +1,15 @@
-import pygame
+from assets import assets
+from resolution import SCREEN_WIDTH
 
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
-
 class Background:
     def __init__(self, speed):
-        # Load and scale the background image to fit the screen size
-        self.image = pygame.image.load("static/background.png")
-        self.image = pygame.transform.scale(self.image, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        # Share the screen-sized background image from the asset registry
+        self.image = assets.get("background")
         self.x1 = 0  # Initial position of the first image
         self.x2 = SCREEN_WIDTH  # Initial position of the second image for looping
         self.speed = speed * 1.1  # Set background speed 10% faster than initial speed
+        self.distance = 0.0  # Pixels scrolled so far, which the dirty renderer redraws the backdrop by
 
     def update(self, pipe_speed, bird_speed):
         # Update the background speed to be 10% faster than the pipe speed + some factor of bird speed
@@ -19,6 +18,7 @@ class Background:
         # Move both background images to the left
         self.x1 -= self.speed
         self.x2 -= self.speed
+        self.distance += self.speed
 
         # Reset the positions to create a seamless loop
         if self.x1 <= -SCREEN_WIDTH:
@@ -26,7 +26,11 @@ class Background:
         if self.x2 <= -SCREEN_WIDTH:
             self.x2 = SCREEN_WIDTH
 
-    def render(self, screen):
-        # Draw both images to create the looping effect
-        screen.blit(self.image, (self.x1, 0))
-        screen.blit(self.image, (self.x2, 0))
+    def render(self, screen, alpha=1.0):
+        """Draw both images to create the looping effect.
+
+        alpha between 0 and 1 draws the images between their previous and current update positions.
+        """
+        offset = self.speed * (1 - alpha)
+        screen.blit(self.image, (self.x1 + offset, 0))
+        screen.blit(self.image, (self.x2 + offset, 0))
@@ -0,0 +1,206 @@
+import numpy as np
+from course import Course, COURSE_CHUNK, SPEED_STEP, SPEED_TABLE as TIER_SPEEDS
+from simulation import (
+    SCREEN_HEIGHT, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, GRAVITY, LIFT, POSE_TICKS, POSES,
+    PIPE_WIDTH, PIPE_GAP, PIPE_SPAWN_X, TOP_PIPE_TRIM, BOTTOM_PIPE_TRIM, SCREEN_WIDTH,
+    BirdState, PipeState,
+)
+
+
+# The course's speed table as an array, so every bird's speed is looked up at once
+SPEED_TABLE = np.array(TIER_SPEEDS)
+
+
+class BatchSimulation:
+    """Steps N birds at once with struct-of-arrays NumPy buffers.
+
+    Every bird follows the same rules as a Simulation with the same pixel_collision and produces the same
+    result tick for tick. With the default box collision, scores can differ from the game's, which tests
+    the sprite masks; pass pixel_collision=True where they must match. The boxes are then only a
+    broadphase, and the few birds whose rotated sprite overlaps a pipe are tested against the masks.
+    Pass seed to give all birds one shared pipe course, or seeds (one per bird) for separate courses.
+    Pipes are kept per bird in a small ring of slots because their speed depends on that bird's score.
+    The gap heights come from the same Course as Simulation, and only the stretch of course between
+    the last live bird and the furthest one is kept in memory.
+    """
+
+    def __init__(self, n, seed=None, seeds=None, pipe_slots=8, pixel_collision=False):
+        self.n = n
+        self.pipe_slots = pipe_slots
+        self.pixel_collision = pixel_collision
+        self.collider = None
+        if pixel_collision:
+            from collision import PixelCollider  # Only pixel collision needs pygame
+            self.collider = PixelCollider()
+            # Largest rotated bird sprite, so the broadphase never misses a pipe the mask test would hit
+            sizes = [size for _, size in self.collider.bird_masks.values()]
+            self.sprite_margin = (max(w for w, _ in sizes) - BIRD_WIDTH) // 2 + 1
+            self.sprite_margin_y = (max(h for _, h in sizes) - BIRD_HEIGHT) // 2 + 1
+            self._bird = BirdState()  # Scratch states handed to the collider, one bird and pipe at a time
+            self._pipe = PipeState(0, 0)
+        self.shared_course = seeds is None
+        if self.shared_course:
+            self.courses = [Course(seed)]
+        else:
+            if len(seeds) != n:
+                raise ValueError("seeds must contain one seed per bird")
+            self.courses = [Course(s) for s in seeds]
+        self.reset()
+
+    def reset(self):
+        """Restart every bird at the beginning of its course."""
+        n, k = self.n, self.pipe_slots
+        self.y = np.full(n, float(SCREEN_HEIGHT // 2))
+        self.velocity = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.current_speed = np.full(n, SPEED_TABLE[0])
+        self.done = np.zeros(n, dtype=bool)
+        self.last_jump_tick = np.full(n, -1, dtype=np.int64)  # -1 until the bird first flaps
+        self.pose = np.full(n, POSES.index("neutral"), dtype=np.int64)  # Index into simulation.POSES
+        self.ticks = np.zeros(n, dtype=np.int64)  # Ticks survived by each bird
+        self.tick = 0
+
+        self.pipe_x = np.zeros((n, k))
+        self.pipe_speed = np.zeros((n, k))
+        self.pipe_top = np.zeros((n, k), dtype=np.int64)
+        self.pipe_passed = np.zeros((n, k), dtype=bool)
+        self.pipe_active = np.zeros((n, k), dtype=bool)
+        self.last_slot = np.full(n, k - 1)  # Slot of the most recently spawned pipe
+        self.pipes_spawned = np.zeros(n, dtype=np.int64)
+
+        # Gap heights of pipes course_start onwards: shape (1, length) when shared, (n, length) otherwise
+        for course in self.courses:
+            course.reset()
+        self.course = np.empty((len(self.courses), 0), dtype=np.int64)
+        self.course_start = 0
+        self._spawn(np.ones(n, dtype=bool))
+
+    def _extend_course(self, length):
+        """Make gap heights available up to pipe number length, dropping those every live bird has passed."""
+        end = self.course_start + self.course.shape[1]
+        if end >= length:
+            return
+        chunks = [self.course]
+        while end < length:
+            chunks.append(np.array([course.lookahead(end, COURSE_CHUNK) for course in self.courses], dtype=np.int64))
+            end += COURSE_CHUNK
+            for course in self.courses:
+                course.release(end)
+        alive = ~self.done
+        oldest = int(self.pipes_spawned[alive].min()) if alive.any() else length - 1
+        drop = min(oldest, length - 1) - self.course_start
+        self.course = np.concatenate(chunks, axis=1)[:, drop:].copy()
+        self.course_start += drop
+
+    def _spawn(self, mask):
+        birds = np.nonzero(mask)[0]
+        if birds.size == 0:
+            return
+        self._extend_course(int(self.pipes_spawned[birds].max()) + 1)
+        slots = (self.last_slot[birds] + 1) % self.pipe_slots
+        if self.pipe_active[birds, slots].any():
+            raise RuntimeError("pipe_slots is too small for the number of live pipes")
+        course_rows = 0 if self.shared_course else birds
+        self.pipe_x[birds, slots] = SCREEN_WIDTH
+        self.pipe_speed[birds, slots] = self.current_speed[birds]
+        self.pipe_top[birds, slots] = self.course[course_rows, self.pipes_spawned[birds] - self.course_start]
+        self.pipe_passed[birds, slots] = False
+        self.pipe_active[birds, slots] = True
+        self.last_slot[birds] = slots
+        self.pipes_spawned[birds] += 1
+
+    def step(self, flap):
+        """Advance every live bird by one tick.
+
+        flap is a bool or a bool array of length n. Returns the points scored by each bird.
+        """
+        alive = ~self.done
+        flap = np.broadcast_to(np.asarray(flap, dtype=bool), (self.n,))
+
+        self.velocity = np.where(flap & alive, float(LIFT), self.velocity)
+        self.last_jump_tick = np.where(flap & alive, self.tick, self.last_jump_tick)
+        self.velocity = np.where(alive, self.velocity + GRAVITY, self.velocity)
+        self.y = np.where(alive, self.y + self.velocity, self.y)
+        self._update_pose(alive)
+
+        rows = np.arange(self.n)
+        self._spawn(alive & (self.pipe_x[rows, self.last_slot] < PIPE_SPAWN_X))
+
+        moving = self.pipe_active & alive[:, None]
+        self.pipe_x = np.where(moving, self.pipe_x - self.pipe_speed, self.pipe_x)
+        self.pipe_active &= self.pipe_x + PIPE_WIDTH > 0
+
+        # Collision boxes, truncated to integers the same way pygame.Rect does
+        live = self.pipe_active & alive[:, None]
+        pipe_x = self.pipe_x.astype(np.int64)
+        bird_y = self.y.astype(np.int64)[:, None]
+        bottom_y = self.pipe_top + PIPE_GAP  # Top edge of the bottom pipe
+        if self.collider:
+            margin, margin_y = self.sprite_margin, self.sprite_margin_y
+            # Only birds whose sprite box reaches past the edges of a pipe's gap can touch it
+            near = (live & (BIRD_X - margin < pipe_x + PIPE_WIDTH) & (pipe_x < BIRD_X + BIRD_WIDTH + margin)
+                    & ((bird_y - margin_y < self.pipe_top) | (bird_y + BIRD_HEIGHT + margin_y > bottom_y)))
+            collision = self._pixel_collisions(near.any(axis=1))
+        else:
+            overlap_x = (BIRD_X < pipe_x + PIPE_WIDTH) & (pipe_x < BIRD_X + BIRD_WIDTH)
+            hit_top = (bird_y < self.pipe_top - TOP_PIPE_TRIM) & (bird_y + BIRD_HEIGHT > 0)
+            hit_bottom = (bird_y < SCREEN_HEIGHT - BOTTOM_PIPE_TRIM) & (bird_y + BIRD_HEIGHT > bottom_y)
+            collision = (live & overlap_x & (hit_top | hit_bottom)).any(axis=1)
+
+        # Score every pipe whose midpoint the bird has passed
+        passing = live & ~self.pipe_passed & (BIRD_X > self.pipe_x + PIPE_WIDTH // 2)
+        self.pipe_passed |= passing
+        scored = passing.sum(axis=1)
+        self.score += scored
+        tiers = np.minimum(self.score // SPEED_STEP, len(SPEED_TABLE) - 1)  # As course.speed_tier
+        self.current_speed = np.where(alive, SPEED_TABLE[tiers], self.current_speed)
+
+        self.done |= alive & ((self.y < 0) | (self.y > SCREEN_HEIGHT) | collision)
+        self.ticks += alive
+        self.tick += 1
+        return scored
+
+    def _update_pose(self, alive):
+        """Update the poses of the live birds the way Simulation._update_pose does."""
+        elapsed = self.tick - self.last_jump_tick
+        jumped = self.last_jump_tick >= 0
+        pose = np.where(jumped & (elapsed < 2 * POSE_TICKS), POSES.index("neutral"), self.pose)
+        pose = np.where(jumped & (elapsed < POSE_TICKS), POSES.index("rising"), pose)
+        pose = np.where(self.velocity < 0, pose, POSES.index("falling"))
+        self.pose = np.where(alive, pose, self.pose)
+
+    def _pixel_collisions(self, candidates):
+        """Mask-test the candidate birds against their live pipes, as Simulation.step does for one bird."""
+        collision = np.zeros(self.n, dtype=bool)
+        bird, pipe = self._bird, self._pipe
+        for i in np.nonzero(candidates)[0]:
+            bird.y, bird.velocity, bird.pose = float(self.y[i]), float(self.velocity[i]), POSES[self.pose[i]]
+            span_left, span_right = self.collider.x_span(bird)
+            for slot in np.nonzero(self.pipe_active[i])[0]:
+                pipe.x = self.pipe_x[i, slot]
+                pipe_x = int(pipe.x)
+                if pipe_x >= span_right or pipe_x + PIPE_WIDTH <= span_left:
+                    continue
+                pipe.top_height = int(self.pipe_top[i, slot])
+                pipe.bottom_height = SCREEN_HEIGHT - pipe.top_height - PIPE_GAP
+                if self.collider.hits(bird, pipe):
+                    collision[i] = True
+                    break
+        return collision
+
+    def next_pipes(self):
+        """Return (x, top_height, bottom_height) arrays of the first pipe ahead of each bird."""
+        ahead = self.pipe_active & (self.pipe_x + PIPE_WIDTH > BIRD_X)
+        slots = np.argmin(np.where(ahead, self.pipe_x, np.inf), axis=1)
+        rows = np.arange(self.n)
+        top = self.pipe_top[rows, slots]
+        return self.pipe_x[rows, slots], top, SCREEN_HEIGHT - top - PIPE_GAP
+
+    def run(self, controller, max_ticks):
+        """Step until every bird is done or max_ticks pass, with controller(batch) -> bool array.
+
+        Returns the final scores.
+        """
+        while not self.done.all() and self.tick < max_ticks:
+            self.step(controller(self))
+        return self.score
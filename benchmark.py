@@ -0,0 +1,261 @@
+"""Headless benchmarks that drive the game's own frame loop through scripted scenarios.
+
+Run with:  python benchmark.py [--save-baseline] [--threshold 0.15]
+The SDL dummy video and audio drivers are used, so no window or sound device is needed.
+Frames run through project.Game, as in project.main: the frame's fixed ticks of a Simulation with pixel
+collision, then the frame drawn between the last two ticks. The frames are paced by a simulated clock at
+the scenario's frame rate instead of the wall clock, so every run does the same work.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import pygame
+from assets import assets
+from bitcoin import Bitcoin
+from course import SPEED_STEP, speed_for_score
+from fixed_timestep import FixedTimestep
+from lighting_effect import LightingEffect
+from profiler import FrameProfiler, TRACE_FILTERS
+from project import Game
+from quality import TIERS, TIER_NAMES, settings as quality_settings
+from soak import scripted_player
+from tournament import never_flap
+from utils import load_custom_font, text_cache
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+WARMUP_FRAMES = 120  # Unmeasured frames that fill the caches and pools before each scenario is measured
+FRAME_RATE = 60  # Frames drawn per second of game time: two per tick, so half the frames only interpolate
+
+
+class Scenario:
+    """A scripted workload: how many frames to run and how the player plays them."""
+
+    def __init__(self, name, frames, flap_every=None, follow_gap=False, mistake_rate=0.0, speed_tier=0,
+                 extra_particles=0, frame_rate=FRAME_RATE, render_mode="full"):
+        self.name = name
+        self.frames = frames
+        self.frame_rate = frame_rate  # Frames per second of the simulated clock that paces the ticks
+        self.flap_every = flap_every  # Flap on every Nth tick, or never
+        self.follow_gap = follow_gap  # Play through the gaps with tournament.follow_gap instead
+        self.mistake_rate = mistake_rate  # Chance per tick that follow_gap decides wrong, ending games
+        self.speed_tier = speed_tier  # Difficulty tier every game starts at
+        self.extra_particles = extra_particles  # Extra wind particles emitted per tick, within the pool's limits
+        self.render_mode = render_mode  # "full" or "dirty", as in project.py --render-mode
+
+
+SCENARIOS = [
+    Scenario("idle", 600),  # The bird falls and the game restarts, with few entities on screen
+    Scenario("flapping", 600, flap_every=6),
+    Scenario("max_speed", 600, follow_gap=True, speed_tier=6),  # Fast pipes, scoring, coins and score animation
+    Scenario("particles", 600, follow_gap=True, extra_particles=2),  # Keeps the ParticleSystem at the tier's cap
+    Scenario("soak", 9000, follow_gap=True, mistake_rate=0.01, speed_tier=1),
+    # Dirty rectangles with the frame rate far above the tick rate, as when uncapped
+    Scenario("dirty", 2400, follow_gap=True, frame_rate=240, render_mode="dirty"),
+]
+
+
+def make_player(scenario):
+    """Return the scenario's controller(simulation) -> flap."""
+    if scenario.follow_gap:
+        return scripted_player(0, scenario.mistake_rate)
+    if scenario.flap_every:
+        return lambda sim: sim.tick % scenario.flap_every == 0
+    return never_flap
+
+
+def start_game(game, seed, speed_tier):
+    """Start a new game on seed's course, as if speed_tier * SPEED_STEP points were already scored."""
+    game.restart(seed)
+    sim = game.sim
+    if speed_tier:
+        sim.score = speed_tier * SPEED_STEP
+        sim.current_speed = speed_for_score(sim.score)
+        for pipe in sim.pipes:
+            pipe.speed = sim.current_speed
+
+
+def run_scenario(screen, font, scenario, frame_scale=1.0, warmup_frames=WARMUP_FRAMES, lighting_effect=None):
+    """Run one scenario and return its frames/sec, per-stage timings and the memory it allocates.
+
+    Frames are drawn at the quality tier currently applied to quality.settings, and each one runs the
+    ticks that scenario.frame_rate calls for. frame_scale shortens or lengthens the scenario, e.g. 0.1
+    for a quick smoke run. warmup_frames are run first, unmeasured, so the caches and pools fill up
+    whichever scenario runs first. The frames are then run twice: once timed, and once traced by
+    tracemalloc, which slows them down.
+    """
+    profiler = FrameProfiler(window=100000)
+    player = make_player(scenario)
+    course_seeds = random.Random(0)
+    game = Game(screen, font, render_mode=scenario.render_mode, lighting_effect=lighting_effect, profiler=profiler,
+                particle_seed=0)
+    start_game(game, course_seeds.getrandbits(32), scenario.speed_tier)
+    game.renderer.apply_quality(quality_settings)
+    sim, bitcoin = game.sim, game.bitcoin
+    timestep = FixedTimestep()
+    timestep.advance(0.0)
+    text_cache.clear()
+    frames = max(1, int(scenario.frames * frame_scale))
+    next_frame = 0
+
+    def controls(index):
+        flap = player(sim)
+        for _ in range(scenario.extra_particles):
+            bitcoin.wind_particles.emit(bitcoin.x - 20, bitcoin.y + bitcoin.image.get_height() // 2)
+        return flap, 0
+
+    def run(count):
+        nonlocal next_frame
+        for frame in range(next_frame, next_frame + count):
+            profiler.begin_frame()
+            pygame.event.pump()
+            profiler.mark("events")
+
+            ticks = timestep.advance((frame + 1) / scenario.frame_rate)
+            game.update(ticks, controls)
+            if sim.game_over:
+                start_game(game, course_seeds.getrandbits(32), scenario.speed_tier)
+                timestep.reset()
+                timestep.advance((frame + 1) / scenario.frame_rate)
+
+            game.draw(timestep.alpha, flicker=ticks > 0)
+            profiler.mark("present")
+            game.count_entities()
+            profiler.end_frame()
+        next_frame += count
+
+    run(warmup_frames)
+    for samples in profiler.samples.values():  # Only the timed frames count towards the stage timings
+        samples.clear()
+
+    redraws_before = game.renderer.full_redraws
+    start = time.perf_counter()
+    run(frames)
+    elapsed = time.perf_counter() - start
+    full_redraws = game.renderer.full_redraws - redraws_before
+
+    stages = {}
+    for stage in profiler.stages:
+        samples = profiler.samples[stage]
+        if not samples:
+            continue  # Stages such as game_over need not run in the timed frames
+        p50, p95, p99 = profiler.percentiles(stage)
+        stages[stage] = {"mean_ms": round(sum(samples) / len(samples), 4), "p95_ms": round(p95, 4)}
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+    tracemalloc.reset_peak()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    run(frames)
+    peak = tracemalloc.get_traced_memory()[1] - traced_before
+    retained = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS).compare_to(before, "filename")
+    if started_tracing:
+        tracemalloc.stop()
+    return {
+        "frames": frames,
+        "fps": round(frames / elapsed, 2),
+        "stages": stages,
+        # Dirty mode only: full-screen redraws per second of game time, which should not exceed the tick rate
+        "full_redraws_per_second": round(full_redraws * scenario.frame_rate / frames, 1),
+        # Blocks and bytes still held after the traced frames, leaving out the profiler's own samples
+        "allocated_blocks": sum(stat.count_diff for stat in retained),
+        "retained_kib": round(sum(stat.size_diff for stat in retained) / 1024, 1),
+        # Most memory in use at once above the starting point: the transient allocations of a frame
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, threshold=0.15, alloc_threshold=None):
+    """Return a list of failure messages for scenarios that regressed against the baseline.
+
+    A scenario fails when its frames/sec drops more than threshold (a fraction) below the baseline,
+    or, when alloc_threshold is set, when the blocks it leaves allocated exceed the baseline's by more
+    than alloc_threshold. The baseline may hold its own "thresholds" per scenario.
+    """
+    failures = []
+    overrides = baseline.get("thresholds", {})
+    for name, result in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        limit = overrides.get(name, threshold)
+        minimum_fps = reference["fps"] * (1 - limit)
+        if result["fps"] < minimum_fps:
+            failures.append(f"{name}: {result['fps']} fps is below {minimum_fps:.2f} "
+                            f"(baseline {reference['fps']}, threshold {limit:.0%})")
+        if alloc_threshold is not None:
+            growth = result["allocated_blocks"] - reference["allocated_blocks"]
+            if growth > alloc_threshold:
+                failures.append(f"{name}: {growth} more allocated blocks than the baseline")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Bitcoin Bird benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=[s.name for s in SCENARIOS],
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--frame-scale", type=float, default=1.0, help="multiply every scenario's frame count")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed fractional frames/sec drop before a scenario fails")
+    parser.add_argument("--alloc-threshold", type=int, default=None,
+                        help="allowed increase in retained allocated blocks over the baseline")
+    parser.add_argument("--quality", choices=TIER_NAMES, default=TIER_NAMES[0],
+                        help="effect quality tier to draw at (the game picks one automatically)")
+    parser.add_argument("--no-lighting", action="store_true", help="leave out the lighting overlay")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    assets.load()
+    Bitcoin.warm_sprite_cache()
+    font = load_custom_font(54)
+    lighting_effect = None if args.no_lighting else LightingEffect()
+    quality_settings.apply(TIERS[TIER_NAMES.index(args.quality)])
+
+    results = {}
+    for scenario in SCENARIOS:
+        if args.scenarios and scenario.name not in args.scenarios:
+            continue
+        results[scenario.name] = result = run_scenario(screen, font, scenario, args.frame_scale,
+                                                              lighting_effect=lighting_effect)
+        slowest = max((s for s in result["stages"] if s != "total"), key=lambda s: result["stages"][s]["mean_ms"])
+        print(f"{scenario.name:<10} {result['fps']:>9.1f} fps  {result['frames']:>6} frames  "
+              f"slowest stage: {slowest}  retained blocks: {result['allocated_blocks']:+d}  "
+              f"({result['retained_kib']:+} KiB, peak {result['peak_kib']} KiB)")
+        if scenario.render_mode == "dirty":
+            print(f"{'':<10} {result['full_redraws_per_second']} full redraws per second of game time")
+    pygame.quit()
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({"scenarios": results, "thresholds": {}}, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    failures = compare(results, baseline, args.threshold, args.alloc_threshold)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,49 @@
+from collections import deque
 import pygame
-import random
-from wind_particle import WindParticle
+from particles import ParticleSystem
+from assets import assets
+from audio import sound_bank
+from sprite_cache import sprite_cache, BIRD_ANGLES
+from quality import settings as quality
+from simulation import bird_angle
+from resolution import SCREEN_HEIGHT
+
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
-pygame.mixer.init()
-flap_sound = pygame.mixer.Sound("static/flapp.wav")  # Make sure you have this file
 class Bitcoin:
-    def __init__(self):
-        # Load and scale the Bitcoin images for both rising, neutral, and falling states
-        self.rising_image = pygame.image.load("static/bird_rising.png").convert_alpha()
-        self.falling_image = pygame.image.load("static/bird_falling.png").convert_alpha()
-        self.neutral_image = pygame.image.load("static/bird.png").convert_alpha()
-
-        # Scale all images proportionally
-        scaled_width = int(SCREEN_WIDTH * 0.075)
-        scaled_height = int(scaled_width * self.rising_image.get_height() / self.rising_image.get_width())
-        self.rising_image = pygame.transform.smoothscale(self.rising_image, (scaled_width, scaled_height))
-        self.falling_image = pygame.transform.smoothscale(self.falling_image, (scaled_width, scaled_height))
-        self.neutral_image = pygame.transform.smoothscale(self.neutral_image, (scaled_width, scaled_height))
-
-        # Set initial state and position
-        self.image = self.neutral_image
-        self.x = 50
-        self.y = SCREEN_HEIGHT // 2
+    def __init__(self, seed=None):
+        # Share the pre-scaled images for the rising, neutral, and falling states
+        self.rising_image = assets.get("bird_rising")
+        self.falling_image = assets.get("bird_falling")
+        self.neutral_image = assets.get("bird_neutral")
+
         self.gravity = 0.6
         self.lift = -8
-        self.velocity = 0
+        self.state_duration = 0.5  # 0.5 seconds duration for rising and neutral states
+
+        # Pooled wind particles, reproducible when a seed is given
+        self.wind_particles = ParticleSystem(seed=seed)
 
-        # Wind particles list
-        self.wind_particles = []
+        # Track history for motion blur effect, the bird's position and the 3 before it
+        self.history = deque(maxlen=4)
 
-        # Track history for motion blur effect
-        self.history = []
+        self.reset()
 
-        # Variables to track the state
+    def reset(self):
+        """Put the bird back at its start for a new game, keeping its particle pool and sprites."""
+        self.image = self.neutral_image
+        self.x = 50
+        self.y = SCREEN_HEIGHT // 2
+        self.previous_y = self.y  # Position at the previous update, for interpolated rendering
+        self.velocity = 0
+        self.wind_particles.clear()
+        self.history.clear()
         self.last_jump_time = None
-        self.state_duration = 0.5  # 0.5 seconds duration for rising and neutral states
 
     def update(self):
+        self.previous_y = self.y
         self.velocity += self.gravity
         self.y += self.velocity
-
-        # Update history for motion blur
-        if len(self.history) > 3:  # Reduce the number of blur copies for subtlety
-            self.history.pop(0)
-        self.history.append((self.x, self.y, self.velocity))
-
-        # Generate wind particles based on bird movement
-        if self.velocity < 0:  # If the bird is moving upwards, stronger wind
-            self.wind_particles.append(WindParticle(self.x - 20, self.y + self.image.get_height() // 2))
-        else:
-            if random.random() < 0.3:  # Add fewer particles when falling
-                self.wind_particles.append(WindParticle(self.x - 20, self.y + self.image.get_height() // 2))
-
-        # Update each wind particle
-        for particle in self.wind_particles:
-            particle.update(speed_factor=self.velocity)
-
-        # Remove particles that have shrunk too small
-        self.wind_particles = [p for p in self.wind_particles if p.size > 0]
+        self.update_effects()
 
         # Get the current time
         current_time = pygame.time.get_ticks() / 1000  # Time in seconds
@@ -71,37 +56,83 @@ class Bitcoin:
         else:
             self.image = self.falling_image
 
+    def sync(self, bird_state):
+        """Follow a simulated bird instead of running the physics here."""
+        self.previous_y = self.y
+        self.x = bird_state.x
+        self.y = bird_state.y
+        self.velocity = bird_state.velocity
+        if bird_state.pose == "rising":
+            self.image = self.rising_image
+        elif bird_state.pose == "falling":
+            self.image = self.falling_image
+        else:
+            self.image = self.neutral_image
+        self.update_effects()
+
+    def update_effects(self):
+        """Advance the motion blur history and wind particles for the current position."""
+        # Update history for motion blur; the deque drops the oldest entry
+        self.history.append((self.x, self.y, self.velocity))
+
+        # Generate wind particles based on bird movement, as many as the quality settings allow
+        self.wind_particles.limit = quality.max_particles
+        if self.velocity < 0:  # If the bird is moving upwards, stronger wind
+            self.wind_particles.emit(self.x - 20, self.y + self.image.get_height() // 2)
+        else:  # Add fewer particles when falling
+            self.wind_particles.emit(self.x - 20, self.y + self.image.get_height() // 2, probability=0.3)
+
+        # Move, shrink and cull every wind particle in one vectorized pass
+        self.wind_particles.update(speed_factor=self.velocity)
+
+    @staticmethod
+    def warm_sprite_cache():
+        """Pre-render every rotation and blur frame the bird can draw."""
+        images = [assets.get(name) for name in ("bird_rising", "bird_neutral", "bird_falling")]
+        # Every quantized rising and falling angle, and the blur alphas for up to 4 history entries
+        sprite_cache.prebuild(images, angles=BIRD_ANGLES, alphas=(25, 33, 50))
+
     def jump(self):
         self.velocity = self.lift
         self.last_jump_time = pygame.time.get_ticks() / 1000  # Record the jump time in seconds
-        flap_sound.play()
+        sound_bank.play("flap")
 
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.image.get_width(), self.image.get_height())
 
-    def render(self, screen):
-        # Render motion blur effect
-        for i, (hx, hy, hvelocity) in enumerate(self.history[:-1]):
+    def render(self, screen, alpha=1.0):
+        """Draw the bird and its effects, and return the screen area that was drawn to.
+
+        alpha between 0 and 1 draws the bird between its previous and current update positions.
+        """
+        drawn = []
+
+        # Render motion blur effect from the cached, pre-scaled blur frames
+        count = len(self.history)
+        skipped = count - 1 - quality.blur_copies
+        for i, (hx, hy, hvelocity) in enumerate(self.history):
+            if i == count - 1:
+                break  # The newest entry is the bird itself
+            if i < skipped:
+                continue  # Lower quality settings drop the oldest, faintest copies
             # Calculate decreasing alpha for each older position
-            alpha = int(100 * (i / len(self.history)))  # Lower the alpha for more subtlety
-            temp_image = pygame.transform.scale(self.image, (int(self.image.get_width() * 1.1), self.image.get_height()))
-            temp_image.set_alpha(alpha)
-            screen.blit(temp_image, (hx - 25, hy))  # Draw even further behind the bird
+            blur_alpha = int(100 * (i / count))  # Lower the alpha for more subtlety
+            if blur_alpha > 0:  # Fully transparent copies would not show anyway
+                drawn.append(screen.blit(sprite_cache.blur_frame(self.image, blur_alpha), (hx - 25, hy)))  # Draw even further behind the bird
 
         # Render the wind particles
-        for particle in self.wind_particles:
-            particle.render(screen)
+        particles_rect = self.wind_particles.render(screen)
+        if particles_rect:
+            drawn.append(particles_rect)
 
         # Determine the rotation angle based on the velocity
-        if self.velocity < 0:
-            angle = max(30, self.velocity * 3)
-        else:
-            angle = min(-30, self.velocity * 3)
+        angle = bird_angle(self.velocity)
 
-        # Rotate the image based on the calculated angle
-        rotated_image = pygame.transform.rotate(self.image, angle)
-        rotated_rect = rotated_image.get_rect(center=(self.x + self.image.get_width() // 2, self.y + self.image.get_height() // 2))
+        # Look up the image rotated by the calculated angle
+        rotated_image = sprite_cache.rotated(self.image, angle)
+        y = self.previous_y + (self.y - self.previous_y) * alpha
+        rotated_rect = rotated_image.get_rect(center=(self.x + self.image.get_width() // 2, y + self.image.get_height() // 2))
 
         # Render the rotated image on the screen
-        screen.blit(rotated_image, rotated_rect.topleft)
-
+        bird_rect = screen.blit(rotated_image, rotated_rect.topleft)
+        return bird_rect.unionall(drawn)
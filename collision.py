@@ -0,0 +1,62 @@
+import pygame
+from assets import assets
+from simulation import SCREEN_HEIGHT, BIRD_WIDTH, BIRD_HEIGHT, bird_angle
+from sprite_cache import SpriteCache, BIRD_ANGLES
+
+
+POSE_SPRITES = {"rising": "bird_rising", "neutral": "bird_neutral", "falling": "bird_falling"}
+
+
+class PixelCollider:
+    """Pixel-accurate bird/pipe collision using masks built once per sprite and per cached rotation.
+
+    The bird is tested exactly as Bitcoin.render draws it: the pose sprite rotated by the quantized
+    angle and centered on the bird. Pipes are tested as render_pipe draws them. Only pygame.mask and
+    the asset registry are used, so it also works in a headless Simulation.
+    """
+
+    def __init__(self):
+        top_image = assets.get("top_pipe")
+        bottom_image = assets.get("bottom_pipe")
+        self.top_mask = pygame.mask.from_surface(top_image)
+        self.bottom_mask = pygame.mask.from_surface(bottom_image)
+        self.top_image_height = top_image.get_height()
+        self.bird_masks = {}  # (pose, quantized angle) -> (mask, size)
+        for pose in POSE_SPRITES:
+            for angle in BIRD_ANGLES:  # The same rotations the sprite cache prebuilds
+                self.bird_mask(pose, angle)
+
+    def bird_mask(self, pose, angle):
+        angle = SpriteCache.quantize(angle)
+        key = (pose, angle)
+        entry = self.bird_masks.get(key)
+        if entry is None:
+            rotated = pygame.transform.rotate(assets.get(POSE_SPRITES[pose]), angle)
+            entry = self.bird_masks[key] = (pygame.mask.from_surface(rotated), rotated.get_size())
+        return entry
+
+    def placed_bird(self, bird):
+        """Return the rotated bird's mask and its screen rect, positioned exactly as Bitcoin.render places it."""
+        mask, size = self.bird_mask(bird.pose, bird_angle(bird.velocity))
+        rect = pygame.Rect((0, 0), size)
+        rect.center = (bird.x + BIRD_WIDTH // 2, bird.y + BIRD_HEIGHT // 2)
+        return mask, rect
+
+    def bird_rect(self, bird):
+        """Screen rect of the rotated bird sprite."""
+        return self.placed_bird(bird)[1]
+
+    def x_span(self, bird):
+        """Return the (left, right) screen columns covered by the rotated bird, for the broadphase."""
+        rect = self.bird_rect(bird)
+        return rect.left, rect.right
+
+    def hits(self, bird, pipe):
+        """Return True if any opaque bird pixel overlaps an opaque pixel of the top or bottom pipe."""
+        mask, bird_rect = self.placed_bird(bird)  # One mask lookup per bird and pipe
+        pipe_x = int(pipe.x)  # Truncated like the pygame.Rect the pipe is drawn at
+        top_offset = (pipe_x - bird_rect.x, pipe.top_height - self.top_image_height - bird_rect.y)
+        if mask.overlap(self.top_mask, top_offset):
+            return True
+        bottom_offset = (pipe_x - bird_rect.x, SCREEN_HEIGHT - pipe.bottom_height - bird_rect.y)
+        return mask.overlap(self.bottom_mask, bottom_offset) is not None
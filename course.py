@@ -0,0 +1,91 @@
+"""Seeded pipe courses and the difficulty table, shared by the game, replays and batch simulations.
+
+A course is a pure function of its seed, so the seed is all that needs to be stored or sent to replay a
+course, share it as a daily challenge, or cache anything derived from it.
+"""
+import datetime
+import hashlib
+import random
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+# Pipe gaps, matching the Pipe entity
+PIPE_GAP = int(SCREEN_HEIGHT * 0.25)
+PIPE_MIN_HEIGHT = 50  # Smallest top pipe and smallest bottom pipe
+PIPE_SPAWN_X = SCREEN_WIDTH - 500  # Spawn a new pipe once the last one has moved past this x
+
+# Difficulty ramp
+BASE_SPEED = 3
+SPEED_INCREASE_FACTOR = 1.4
+SPEED_STEP = 15  # Points needed for each speed increase
+SPEED_TIERS = 64  # Far beyond any playable speed; later tiers keep the last one's speed
+
+# Pipe speed for each difficulty tier, computed once with the same float arithmetic the game used
+SPEED_TABLE = tuple(BASE_SPEED * (SPEED_INCREASE_FACTOR ** tier) for tier in range(SPEED_TIERS))
+
+COURSE_CHUNK = 64  # Gap heights generated at a time
+
+
+def speed_tier(score):
+    return min(score // SPEED_STEP, SPEED_TIERS - 1)
+
+
+def speed_for_score(score):
+    """Pipe speed once score points have been scored."""
+    return SPEED_TABLE[speed_tier(score)]
+
+
+def daily_seed(date=None):
+    """Seed of the course everyone plays on date (default: today, UTC)."""
+    date = date or datetime.datetime.now(datetime.timezone.utc).date()
+    return int.from_bytes(hashlib.sha256(f"bitcoin-bird-{date.isoformat()}".encode()).digest()[:4], "little")
+
+
+class Course:
+    """The endless sequence of pipe gap heights for one seed, generated lazily in chunks.
+
+    gap(index) returns the top pipe height of the index-th pipe. Only the gaps from the oldest one
+    not yet released onwards are kept, so memory stays constant however long a run lasts, while
+    lookahead(index, count) can still see any number of pipes ahead. Pipes are spaced evenly, every
+    time the last one passes PIPE_SPAWN_X.
+    """
+
+    def __init__(self, seed=None, chunk_size=COURSE_CHUNK):
+        self.seed = random.getrandbits(32) if seed is None else seed  # A random course can be replayed too
+        self.chunk_size = chunk_size
+        self.rng = random.Random()
+        self.reset()
+
+    def reset(self, seed=None):
+        """Go back to the first pipe, of a new course when a seed is given and of the same one otherwise."""
+        if seed is not None:
+            self.seed = seed
+        self.rng.seed(self.seed)
+        self.gaps = []
+        self.start = 0  # Index of the pipe in gaps[0]
+
+    def _generate(self):
+        randint = self.rng.randint
+        low, high = PIPE_MIN_HEIGHT, SCREEN_HEIGHT - PIPE_GAP - PIPE_MIN_HEIGHT
+        self.gaps.extend(randint(low, high) for _ in range(self.chunk_size))
+
+    def gap(self, index):
+        """Top pipe height of pipe number index, counting from 0."""
+        if index < self.start:
+            raise IndexError(f"Pipe {index} of the course has already been released")
+        while index >= self.start + len(self.gaps):
+            self._generate()
+        return self.gaps[index - self.start]
+
+    def lookahead(self, index, count):
+        """Top pipe heights of the count pipes from index on."""
+        if count > 0:
+            self.gap(index + count - 1)
+        return self.gaps[index - self.start:index - self.start + count]
+
+    def release(self, index):
+        """Let go of every pipe before index; they can no longer be looked up."""
+        released = index - self.start
+        if released >= self.chunk_size:  # Trim a chunk at a time rather than on every pipe
+            del self.gaps[:released]
+            self.start = index
@@ -0,0 +1,181 @@
+import math
+import pygame
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT, render_size
+from sprite_cache import SpriteCache
+
+
+SCROLL_STEP = 8  # Dirty mode redraws the backdrop once the background has scrolled this many pixels
+
+class ScaledSurface:
+    """Draw target that takes positions in the logical resolution and draws into a smaller surface.
+
+    Entities blit to it exactly as they would to the screen. Each sprite is resized once and cached,
+    and the rects returned are in logical coordinates, as the DirtyRenderer expects.
+    """
+
+    def __init__(self, surface, scale):
+        self.surface = surface
+        self.scale = scale
+        self.sprites = SpriteCache(max_entries=512)
+
+    def _to_surface(self, rect):
+        # Edges are rounded, so rects that touch in logical coordinates still touch once scaled
+        scale = self.scale
+        left, top = round(rect[0] * scale), round(rect[1] * scale)
+        return pygame.Rect(left, top, round((rect[0] + rect[2]) * scale) - left,
+                           round((rect[1] + rect[3]) * scale) - top)
+
+    def _to_logical(self, rect):
+        scale = self.scale
+        left, top = math.floor(rect.x / scale), math.floor(rect.y / scale)
+        return pygame.Rect(left, top, math.ceil(rect.right / scale) - left, math.ceil(rect.bottom / scale) - top)
+
+    def _blit_args(self, source, dest, area=None):
+        image = self.sprites.scaled(source, self.scale)
+        position = (round(dest[0] * self.scale), round(dest[1] * self.scale))
+        return image, position, None if area is None else self._to_surface(area)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        return self._to_logical(self.surface.blit(*self._blit_args(source, dest, area), special_flags))
+
+    def blits(self, blit_sequence, doreturn=True):
+        drawn = self.surface.blits([self._blit_args(*args) for args in blit_sequence], doreturn)
+        return [self._to_logical(rect) for rect in drawn] if doreturn else None
+
+    def fill(self, color, rect=None):
+        return self._to_logical(self.surface.fill(color, None if rect is None else self._to_surface(rect)))
+
+    def get_size(self):
+        return SCREEN_WIDTH, SCREEN_HEIGHT
+
+    def get_width(self):
+        return SCREEN_WIDTH
+
+    def get_height(self):
+        return SCREEN_HEIGHT
+
+    def get_rect(self):
+        return pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+
+class DirtyRenderer:
+    """Presents frames either with full flips or by updating only the regions that changed.
+
+    In "full" mode every frame redraws the scrolling background and flips the whole display.
+    In "dirty" mode the background is kept in an off-screen backdrop. Each frame only the areas
+    drawn last frame are restored from it, and only those areas plus this frame's are presented
+    with pygame.display.update(rects). Because a scrolling background changes every pixel, the
+    backdrop is only redrawn, with a full flip, once the background has scrolled scroll_step pixels
+    in the simulation's ticks. The background then moves in steps of at least that size, at most once
+    per tick however high the frame rate; 0 or None keeps it still.
+    An optional lighting overlay flickers over the scene in full mode and is baked into the
+    backdrop in dirty mode.
+
+    In full mode the frame can also be drawn at a lower internal resolution (set_render_scale) and
+    scaled up to the screen once when it is presented. Entities then draw to target instead of the
+    screen, which is a ScaledSurface that takes the same logical coordinates.
+    """
+
+    def __init__(self, screen, background, mode="full", scroll_step=SCROLL_STEP, lighting=None):
+        if mode not in ("full", "dirty"):
+            raise ValueError(f"Unknown render mode: {mode}")
+        self.screen = screen
+        self.background = background
+        self.mode = mode
+        self.scroll_step = scroll_step
+        self.lighting = lighting
+        self.backdrop = None
+        self.previous_rects = []
+        self.current_rects = []
+        self.backdrop_distance = 0.0  # Background.distance when the backdrop was drawn
+        self.full_redraws = 0
+        self.needs_full_redraw = True
+        self.target = screen  # Where entities draw this frame
+        self.render_scale = 1.0
+        self.lighting_effect = lighting  # Kept while the quality settings turn the lighting off
+
+    def apply_quality(self, settings):
+        """Follow the render scale and lighting of a quality.QualitySettings."""
+        self.set_render_scale(settings.render_scale)
+        lighting = self.lighting_effect if settings.lighting else None
+        if lighting is not self.lighting:
+            self.lighting = lighting
+            self.needs_full_redraw = True  # The dirty mode backdrop has the lighting baked in
+
+    def set_render_scale(self, scale):
+        """Draw frames at scale times the logical resolution. Dirty mode always draws at full size."""
+        if self.mode == "dirty" or scale == self.render_scale:
+            return
+        self.render_scale = scale
+        if scale == 1.0:
+            self.target = self.screen
+        else:
+            internal = pygame.Surface(render_size(scale), 0, self.screen)  # Same pixel format as the screen
+            self.target = ScaledSurface(internal, scale)
+        self.needs_full_redraw = True
+
+    def invalidate(self):
+        """Redraw and present the whole screen next frame, e.g. after another screen was shown."""
+        self.needs_full_redraw = True
+
+    def begin_frame(self, alpha=1.0):
+        """Clear the screen for a new frame: either the whole background or only the stale areas.
+
+        alpha is passed to Background.render to interpolate the scroll position in full mode.
+        """
+        self.current_rects = []
+        if self.mode == "full":
+            self.background.render(self.target, alpha)
+            return
+
+        if self.scroll_step and self.background.distance - self.backdrop_distance >= self.scroll_step:
+            self.needs_full_redraw = True
+        if self.needs_full_redraw:
+            if self.backdrop is None:
+                self.backdrop = pygame.Surface(self.screen.get_size(), 0, self.screen)  # Same pixel format as the screen
+            self.background.render(self.backdrop)  # At its position on the last tick, which distance measures
+            if self.lighting:
+                self.lighting.render(self.backdrop)  # Lighting is baked into the still backdrop
+            self.screen.blit(self.backdrop, (0, 0))
+            self.backdrop_distance = self.background.distance
+            self.full_redraws += 1
+        else:
+            for rect in self.previous_rects:
+                self.screen.blit(self.backdrop, rect, area=rect)
+
+    def apply_lighting(self, flicker=True):
+        """Draw the flickering lighting over the scene. In dirty mode it is part of the backdrop instead.
+
+        flicker=False redraws the current flicker level, so the flicker rate need not follow the frame rate.
+        """
+        if self.lighting and self.mode == "full":
+            if flicker:
+                self.lighting.update()
+            # Straight onto the internal surface, so the lightmap is scaled once to its size
+            self.lighting.render(self.screen if self.target is self.screen else self.target.surface)
+
+    def add(self, drawn):
+        """Record what an entity drew: a Rect, None, or an iterable of those."""
+        if drawn is None:
+            return
+        if isinstance(drawn, pygame.Rect):
+            if drawn.width and drawn.height:
+                self.current_rects.append(drawn)
+        else:
+            for rect in drawn:
+                self.add(rect)
+
+    def present(self):
+        """Show the frame: a full flip, or an update of the old and new dirty regions."""
+        if self.target is not self.screen:
+            pygame.transform.scale(self.target.surface, self.screen.get_size(), self.screen)  # The one upscale
+        if self.mode == "full" or self.needs_full_redraw:
+            pygame.display.flip()
+            self.needs_full_redraw = False
+        else:
+            pygame.display.update(self.previous_rects + self.current_rects)
+        self.previous_rects = self.current_rects
+
+    def dirty_area(self):
+        """Return the number of pixels covered by this frame's dirty rects (overlaps counted twice)."""
+        return sum(rect.width * rect.height for rect in self.current_rects)
@@ -0,0 +1,59 @@
+import time
+from simulation import TICK_RATE
+
+
+class FixedTimestep:
+    """Converts variable frame times into a whole number of fixed-length simulation ticks.
+
+    Each frame, call advance() and run that many ticks, then draw with alpha: the fraction of a tick
+    left over in the accumulator, used to interpolate between the previous and the current tick.
+    Two catch-up limits keep a slow frame from snowballing: a single frame counts for at most
+    max_frame_time seconds, and at most max_ticks_per_frame ticks run per frame. Time cut by
+    either limit is dropped (the game briefly slows down) and added to dropped_time.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks_per_frame=5, max_frame_time=0.25):
+        self.dt = 1 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.last_time = None
+        self.dropped_time = 0.0  # Seconds of game time skipped by the catch-up limits
+        self.tick_start = None  # perf_counter() time simulated by the start of this frame's first tick
+
+    def reset(self):
+        """Forget the time since the last frame, e.g. after the game waited on another screen."""
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self, now=None):
+        """Add the time since the previous call and return how many ticks to run this frame."""
+        now = time.perf_counter() if now is None else now
+        if self.last_time is None:
+            self.last_time = self.tick_start = now
+            return 0
+        frame_time = now - self.last_time
+        self.last_time = now
+        if frame_time > self.max_frame_time:
+            self.dropped_time += frame_time - self.max_frame_time
+            frame_time = self.max_frame_time
+
+        self.accumulator += frame_time
+        ticks = int(self.accumulator // self.dt)
+        if ticks > self.max_ticks_per_frame:
+            self.dropped_time += (ticks - self.max_ticks_per_frame) * self.dt
+            ticks = self.max_ticks_per_frame
+            self.accumulator = self.accumulator % self.dt
+        else:
+            self.accumulator = max(0.0, self.accumulator - ticks * self.dt)
+        self.tick_start = now - self.accumulator - ticks * self.dt
+        return ticks
+
+    def tick_time(self, index):
+        """perf_counter() time at which the index-th tick of this frame starts."""
+        return self.tick_start + index * self.dt
+
+    @property
+    def alpha(self):
+        """How far the displayed frame is between the previous tick (0.0) and the current one (1.0)."""
+        return min(1.0, self.accumulator / self.dt)
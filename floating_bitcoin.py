@@ -1,40 +1,50 @@
-import pygame
+from assets import assets
+from sprite_cache import sprite_cache
+from quality import settings as quality
+from simulation import TICK_RATE
 
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+RISE_SPEED = 2  # Pixels the coin floats up per update
+FADE_TICKS = TICK_RATE  # The coin fades out over 1 second of game time
 
 class FloatingBitcoin:
+    __slots__ = ("image", "x", "y", "age", "alpha")
+
     def __init__(self, x, y):
         """Initialize the floating Bitcoin image."""
-        self.image = pygame.image.load("static/bitcoin.png").convert_alpha()
-        scaled_width = int(SCREEN_WIDTH * 0.045)
-        scaled_height = int(scaled_width * self.image.get_height() / self.image.get_width())
-        self.image = pygame.transform.smoothscale(self.image, (scaled_width, scaled_height))
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Start a recycled coin over at a new position."""
+        self.image = assets.get("bitcoin")  # Shared, pre-scaled coin sprite
 
         self.x = x
         self.y = y - 40
-        self.start_time = pygame.time.get_ticks()  # Record the start time
-        self.duration = 1000  # Duration in milliseconds (1 second)
+        self.age = 0  # Updates since the coin appeared, one per simulation tick
         self.alpha = 255  # Initial alpha value for full opacity
 
     def update(self):
         """Move the floating Bitcoin image upwards and decrease alpha for fade effect."""
-        self.y -= 2  # Move the image upwards
+        self.y -= RISE_SPEED  # Move the image upwards
 
-        # Calculate the fade-out effect based on time
-        elapsed_time = pygame.time.get_ticks() - self.start_time
-        if elapsed_time > self.duration:
+        # Calculate the fade-out effect from the game ticks, so it does not depend on the frame timing
+        self.age += 1
+        if self.age >= FADE_TICKS:
             self.alpha = 0
         else:
-            self.alpha = max(0, 255 - int((elapsed_time / self.duration) * 255))
+            self.alpha = 255 - int((self.age / FADE_TICKS) * 255)
 
     def is_expired(self):
         """Check if the floating Bitcoin should disappear."""
         return self.alpha == 0
 
-    def render(self, screen):
-        """Render the floating Bitcoin on the screen with fading effect."""
+    def render(self, screen, alpha=1.0):
+        """Render the floating Bitcoin on the screen with fading effect and return the drawn rect.
+
+        alpha between 0 and 1 draws the coin between its previous and current update positions.
+        """
         if self.alpha > 0:
-            faded_image = self.image.copy()
-            faded_image.set_alpha(self.alpha)
-            screen.blit(faded_image, (self.x, self.y))
+            # Shared by every coin at this alpha; without fades the coin stays opaque until it expires
+            image = sprite_cache.faded(self.image, self.alpha) if quality.coin_fade else self.image
+            return screen.blit(image, (self.x, self.y + RISE_SPEED * (1 - alpha)))
+        return None
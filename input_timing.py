@@ -0,0 +1,113 @@
+import time
+from collections import deque
+import pygame
+from profiler import percentile
+from simulation import PHASE_STEPS
+
+
+POLL_INTERVAL = 0.001  # Seconds between event polls while waiting for the next frame
+LATENCY_STAGES = ("poll", "present")
+
+
+class InputTimer:
+    """Polls pygame events between frames and timestamps each one, so flaps land on the right sub-tick.
+
+    pygame does not say when an event happened, only that it arrived before the poll that returned it,
+    so each event is stamped halfway between that poll and the previous one. Polling every millisecond
+    while waiting for the next frame keeps that uncertainty small instead of a whole frame.
+
+    SPACE presses are queued by timestamp. flap_for_tick() hands each one to the tick whose time span
+    contains it, with the phase within the tick at which it happened. presented() then records how
+    long each applied flap took to reach the screen.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, window=1000):
+        self.poll_interval = poll_interval
+        self.last_poll = time.perf_counter()
+        self.events = []  # (event, timestamp) not yet handled by the frame
+        self.flaps = deque()  # Timestamps of SPACE presses not yet applied to a tick
+        self.applied = []  # Timestamps of flaps applied since the last presented frame
+        self.merged = 0  # Presses that landed on a tick that already had a flap
+        self.on_flap = None  # Called with the timestamp as soon as SPACE is seen, e.g. to play a sound
+        self.latency = {stage: deque(maxlen=window) for stage in LATENCY_STAGES}  # Milliseconds
+
+    def poll(self):
+        now = time.perf_counter()
+        stamp = (self.last_poll + now) / 2
+        self.last_poll = now
+        for event in pygame.event.get():
+            self.events.append((event, stamp))
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                self.flaps.append(stamp)
+                self.latency["poll"].append((now - stamp) * 1000)
+                if self.on_flap:
+                    self.on_flap(stamp)
+
+    def take_events(self):
+        """Poll once more and return every (event, timestamp) since the last call."""
+        self.poll()
+        events, self.events = self.events, []
+        return events
+
+    def wait_until(self, deadline):
+        """Keep polling until time.perf_counter() reaches deadline."""
+        while True:
+            self.poll()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.poll_interval, remaining))
+
+    def flap_for_tick(self, start, dt):
+        """Return (flap, phase) for the tick that simulates the time from start to start + dt.
+
+        phase is how far into the tick the press happened, in 1/PHASE_STEPS of a tick. Presses from
+        before start (time that was already simulated) apply at the beginning of the tick.
+        """
+        end = start + dt
+        if not self.flaps or self.flaps[0] >= end:
+            return False, 0
+        pressed = self.flaps.popleft()
+        self.applied.append(pressed)
+        while self.flaps and self.flaps[0] < end:
+            self.applied.append(self.flaps.popleft())
+            self.merged += 1
+        phase = int((pressed - start) / dt * PHASE_STEPS)
+        return True, min(PHASE_STEPS - 1, max(0, phase))
+
+    def presented(self, now=None):
+        """Call right after a frame is presented."""
+        if self.applied:
+            now = time.perf_counter() if now is None else now
+            for pressed in self.applied:
+                self.latency["present"].append((now - pressed) * 1000)
+            self.applied.clear()
+
+    def clear(self):
+        """Drop presses that have not been applied, e.g. after the game over screen."""
+        self.flaps.clear()
+        self.applied.clear()
+        self.events.clear()
+        self.last_poll = time.perf_counter()
+
+    def report(self):
+        """Return {stage: {"count", "p50", "p95", "p99", "max"}} of the latencies in milliseconds."""
+        report = {}
+        for stage, samples in self.latency.items():
+            values = sorted(samples)
+            if not values:
+                continue
+            report[stage] = {"count": len(values), "max": round(values[-1], 2)}
+            for p in (50, 95, 99):
+                report[stage][f"p{p}"] = round(percentile(values, p), 2)
+        return report
+
+    def format_report(self):
+        lines = ["Input latency (ms):"]
+        for stage, stats in self.report().items():
+            label = {"poll": "press to poll", "present": "press to present"}[stage]
+            lines.append(f"  {label:<18}p50 {stats['p50']:>7.2f}  p95 {stats['p95']:>7.2f}  "
+                         f"p99 {stats['p99']:>7.2f}  max {stats['max']:>7.2f}  ({stats['count']} presses)")
+        if len(lines) == 1:
+            lines.append("  no presses")
+        return "\n".join(lines)
@@ -0,0 +1,302 @@
+"""Persistent leaderboard, plus a load generator for the server's score endpoints.
+
+Measure throughput with:  python leaderboard.py --clients 8 --seconds 10 [--url http://127.0.0.1:5000]
+Without --url a server is started on a temporary database and stopped afterwards.
+"""
+import argparse
+import atexit
+import http.client
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_PATH = "leaderboard.db"
+MAX_NAME_LENGTH = 32
+MAX_SCORE = 2**63 - 1  # Largest INTEGER SQLite stores
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    best INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_by_best ON players (best DESC, updated);
+"""
+
+
+class Leaderboard:
+    """Persistent best scores in SQLite, written in batches by a background thread.
+
+    submit() only puts the score on an in-memory queue, so the game loop and request handlers never
+    wait on the disk. The writer thread commits whatever has queued up, up to batch_size scores, in
+    one transaction. The database runs in WAL mode so reads are never blocked by that writer. The
+    top cache_size entries are cached in memory until the database changes, which SQLite's data_version
+    reports for commits from any connection, so scores written by other processes (such as the streamed
+    games of the server) show up too.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, batch_size=512, flush_interval=0.05, cache_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.pending = queue.SimpleQueue()
+        self.submit_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0  # Scores the database refused, counted in written so flush() still returns
+        self.written_changed = threading.Condition()
+        self.local = threading.local()  # One reading connection per thread
+        self.cache_lock = threading.Lock()
+        self.top_cache = None
+        self.cache_version = None  # data_version of the database when top_cache was read
+        self.closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.version_connection = self._connect()  # Used under cache_lock to check for changes
+
+        self.writer = threading.Thread(target=self._write_batches, name="leaderboard-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)  # Queued scores are written even when the game exits abruptly
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips an fsync per commit
+        return connection
+
+    def _reader(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        return connection
+
+    @staticmethod
+    def validate(player, score):
+        """Return (player, score) cleaned up, or raise ValueError."""
+        if not isinstance(player, str) or not player.strip() or len(player.strip()) > MAX_NAME_LENGTH:
+            raise ValueError(f"player must be 1 to {MAX_NAME_LENGTH} characters")
+        if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= MAX_SCORE:
+            raise ValueError(f"score must be an integer from 0 to {MAX_SCORE}")
+        return player.strip(), score
+
+    def submit(self, player, score):
+        """Queue a finished game's score. Returns immediately."""
+        if self.closed:
+            raise RuntimeError("The leaderboard is closed")
+        player, score = self.validate(player, score)
+        with self.submit_lock:
+            self.submitted += 1
+            self.pending.put((player, score, time.time()))
+
+    def _write_batches(self):
+        connection = self._connect()
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.pending.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(connection, batch)
+            except Exception:  # Write the rows one at a time, so a bad one cannot stop the others
+                for row in batch:
+                    try:
+                        self._write(connection, [row])
+                    except Exception as error:
+                        print(f"Dropped leaderboard score {row[1]} of {row[0]!r}: {error}")
+                        self.dropped += 1
+            with self.written_changed:
+                self.written += len(batch)
+                self.batches += 1
+                self.written_changed.notify_all()
+            if stop:
+                break
+        connection.close()
+
+    @staticmethod
+    def _write(connection, batch):
+        with connection:  # One transaction per batch
+            connection.executemany("INSERT INTO scores (player, score, created) VALUES (?, ?, ?)", batch)
+            connection.executemany(
+                "INSERT INTO players (player, best, games, updated) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (player) DO UPDATE SET games = games + 1, "
+                "updated = CASE WHEN excluded.best > best THEN excluded.updated ELSE updated END, "
+                "best = max(best, excluded.best)", batch)
+
+    def flush(self, timeout=None):
+        """Wait until every score submitted so far is in the database. Returns False on timeout."""
+        target = self.submitted
+        with self.written_changed:
+            return self.written_changed.wait_for(lambda: self.written >= target, timeout)
+
+    def close(self):
+        """Write the remaining scores and stop the writer thread."""
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)  # Otherwise atexit keeps every closed leaderboard alive
+        self.pending.put(None)
+        self.writer.join()
+        with self.cache_lock:
+            self.version_connection.close()
+
+    def top(self, n=10):
+        """Return the n best players as [{"rank", "player", "score", "games"}], highest first."""
+        if n <= self.cache_size:
+            with self.cache_lock:
+                # Read before the query, so a commit during it makes the next call query again
+                version = self.version_connection.execute("PRAGMA data_version").fetchone()[0]
+                if self.top_cache is None or version != self.cache_version:
+                    self.top_cache = self._query_top(self.cache_size)
+                    self.cache_version = version
+                return self.top_cache[:n]
+        return self._query_top(n)
+
+    def _query_top(self, n):
+        rows = self._reader().execute(
+            "SELECT player, best, games FROM players ORDER BY best DESC, updated LIMIT ?", (n,)).fetchall()
+        entries = []
+        for position, (player, best, games) in enumerate(rows, start=1):
+            # Equal scores share a rank, as in rank()
+            rank = entries[-1]["rank"] if entries and entries[-1]["score"] == best else position
+            entries.append({"rank": rank, "player": player, "score": best, "games": games})
+        return entries
+
+    def rank(self, player):
+        """Return {"rank", "player", "score", "games"} for player, or None if they have no score yet.
+
+        Players with the same best score share a rank.
+        """
+        connection = self._reader()
+        row = connection.execute("SELECT best, games FROM players WHERE player = ?", (player,)).fetchone()
+        if row is None:
+            return None
+        best, games = row
+        (better,) = connection.execute("SELECT COUNT(*) FROM players WHERE best > ?", (best,)).fetchone()
+        return {"rank": better + 1, "player": player, "score": best, "games": games}
+
+    def best(self, player):
+        """Return player's best written score, or 0."""
+        entry = self.rank(player)
+        return entry["score"] if entry else 0
+
+    def stats(self):
+        return {"submitted": self.submitted, "written": self.written, "batches": self.batches,
+                "pending": self.submitted - self.written}
+
+
+def submit_load(url, seconds, batch, client):
+    """Submit scores to url over one keep-alive connection for seconds. Returns (scores, latencies in ms)."""
+    host = url.split("://", 1)[-1].rstrip("/")
+    connection = http.client.HTTPConnection(host, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    latencies = []
+    submitted = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        entries = [{"player": f"load-{client}-{(submitted + i) % 1000}", "score": (submitted + i) % 500}
+                   for i in range(batch)]
+        body = json.dumps(entries if batch > 1 else entries[0])
+        start = time.perf_counter()
+        connection.request("POST", "/scores", body, headers)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 202:
+            raise RuntimeError(f"Submission failed with HTTP {response.status}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        submitted += batch
+    connection.close()
+    return submitted, latencies
+
+
+def start_server(port, path):
+    import subprocess
+    import sys
+    server = subprocess.Popen([sys.executable, "server.py", "--port", str(port), "--leaderboard", path],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/leaderboard?n=1")
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The server did not start")
+
+
+def main(argv=None):
+    from multiprocessing import Pool
+    import tempfile
+    parser = argparse.ArgumentParser(description="Load test the leaderboard's score submissions")
+    parser.add_argument("--url", help="server to test (default: start one on a temporary database)")
+    parser.add_argument("--port", type=int, default=5057, help="port for the server started without --url")
+    parser.add_argument("--clients", type=int, default=8, help="client processes, each with one connection")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1, help="scores per request")
+    args = parser.parse_args(argv)
+
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "leaderboard.db")
+        url = args.url
+        if url is None:
+            server = start_server(args.port, path)
+            url = f"http://127.0.0.1:{args.port}"
+        try:
+            with Pool(args.clients) as pool:
+                results = pool.starmap(submit_load, [(url, args.seconds, args.batch, client)
+                                                     for client in range(args.clients)])
+        finally:
+            if server:
+                server.terminate()  # The server writes its queued scores before exiting
+                server.wait()
+
+        submitted = sum(count for count, _ in results)
+        latencies = sorted(latency for _, client_latencies in results for latency in client_latencies)
+        print(f"{submitted} scores in {len(latencies)} requests from {args.clients} clients over {args.seconds:g} s: "
+              f"{submitted / args.seconds:.0f} scores/s")
+        print(f"request latency p50 {latencies[len(latencies) // 2]:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)]:.2f} ms")
+        if server:
+            with sqlite3.connect(path) as connection:
+                (written,) = connection.execute("SELECT COUNT(*) FROM scores").fetchone()
+            print(f"{written} of {submitted} scores written to the database")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -1,33 +1,105 @@
-import pygame
+import hashlib
+import os
 import random
+import numpy as np
+import pygame
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
 
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+CACHE_DIR = "cache"  # Generated gradients are stored here, keyed by resolution and parameters
+LIGHTMAP_SCALE = 8  # The gradient is computed at 1/8 of the resolution; a vignette has no fine detail
+
 
 class LightingEffect:
-    def __init__(self):
-        """Create a lighting effect overlay with a gradient."""
-        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        self.create_gradient()
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), color=(30, 30, 30), inner_radius=0.35,
+                 base_alpha=150, flicker_levels=4, use_cache=True, lazy=False):
+        """Create a lighting effect with a radial gradient that darkens towards the edges.
+
+        inner_radius is the fraction of the center-to-corner distance that stays fully lit, and color is
+        the light left at the edges at full strength. The gradient is a low-resolution lightmap, scaled
+        up once for each size it is drawn at into flicker_levels opaque frames. Each frame is then one
+        multiplying blit instead of an alpha blend over the screen.
+        With lazy=True nothing is built yet: call load_gradient() (safe on a background thread)
+        and then build_frames() on the main thread.
+        """
+        self.size = size
+        self.lightmap_size = (max(1, size[0] // LIGHTMAP_SCALE), max(1, size[1] // LIGHTMAP_SCALE))
+        self.color = color
+        self.inner_radius = inner_radius
+        self.base_alpha = base_alpha
+        self.use_cache = use_cache
+        self.flicker_values = [round(-10 + 20 * i / max(flicker_levels - 1, 1)) for i in range(flicker_levels)]
+        self.gradient = None
+        self.frames = []
+        self.scaled_frames = {}  # Target size -> flicker frames scaled up to it
+        if not lazy:
+            self.create_gradient()
         self.flicker_intensity = 0  # Variable to simulate dynamic lighting
+        self.frame_index = 0
+
+    def cache_path(self):
+        key = f"{self.lightmap_size}-{self.color}-{self.inner_radius}".encode()
+        width, height = self.lightmap_size
+        return os.path.join(CACHE_DIR, f"lighting_{width}x{height}_{hashlib.sha1(key).hexdigest()[:12]}.npy")
+
+    def compute_gradient(self):
+        """Return the lightmap's darkening as a (width, height) uint8 array, computed in one NumPy pass."""
+        width, height = self.size
+        map_width, map_height = self.lightmap_size
+        # Sample the center of each lightmap pixel in screen coordinates
+        xs = (np.arange(map_width, dtype=np.float32) + 0.5) * width / map_width - width / 2
+        ys = (np.arange(map_height, dtype=np.float32) + 0.5) * height / map_height - height / 2
+        distance = np.sqrt(xs[:, None] ** 2 + ys[None, :] ** 2) / np.hypot(width / 2, height / 2)
+        falloff = np.clip((distance - self.inner_radius) / (1 - self.inner_radius), 0, 1)
+        return (falloff ** 2 * 255).astype(np.uint8)
 
     def create_gradient(self):
-        """Create a radial gradient effect on the overlay surface."""
-        center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-        max_radius = max(SCREEN_WIDTH, SCREEN_HEIGHT)
+        """Load the gradient from the disk cache, or compute and cache it, then build the overlay frames."""
+        self.load_gradient()
+        self.build_frames()
+
+    def load_gradient(self):
+        """Load the gradient from the disk cache, or compute and cache it. Needs no display."""
+        path = self.cache_path()
+        gradient = None
+        if self.use_cache and os.path.exists(path):
+            try:
+                gradient = np.load(path)
+            except (OSError, ValueError):
+                gradient = None  # A damaged cache file is simply rebuilt
+        if gradient is None or gradient.shape != self.lightmap_size:
+            gradient = self.compute_gradient()
+            if self.use_cache:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                np.save(path, gradient)
+        self.gradient = gradient
+
+    def build_frames(self, size=None):
+        """Build and return the flicker frames for a target size (default the full size). Needs pygame."""
+        size = size or self.size
+        frames = self.scaled_frames[size] = [
+            self.build_frame(max(0, min(255, self.base_alpha + flicker)), size) for flicker in self.flicker_values]
+        if size == self.size:
+            self.frames = frames
+        return frames
 
-        for i in range(max_radius):
-            alpha = max(0, 255 - (i // 2))  # Gradient effect
-            color = (30, 30, 30, alpha)  # Dark gray with variable alpha
-            pygame.draw.circle(self.overlay, color, (center_x, center_y), i)
+    def build_frame(self, alpha, size):
+        """Return an opaque frame of the light left at each pixel, for the gradient scaled by alpha."""
+        strength = self.gradient.astype(np.uint16) * alpha // 255
+        light = np.empty(self.lightmap_size + (3,), np.uint8)
+        for channel, color in enumerate(self.color):
+            light[..., channel] = 255 - strength * (255 - color) // 255
+        frame = pygame.transform.smoothscale(pygame.surfarray.make_surface(light), size)
+        if pygame.display.get_surface() is not None:
+            frame = frame.convert()
+        return frame
 
     def update(self):
         """Update the overlay effect to simulate flickering."""
-        self.flicker_intensity = random.randint(-10, 10)
+        self.frame_index = random.randrange(len(self.flicker_values))
+        self.flicker_intensity = self.flicker_values[self.frame_index]
 
     def render(self, screen):
-        """Render the overlay with dynamic lighting effects on the screen."""
-        # Apply flickering effect by modifying the alpha value
-        flicker_alpha = max(0, min(255, 150 + self.flicker_intensity))
-        self.overlay.set_alpha(flicker_alpha)
-        screen.blit(self.overlay, (0, 0))
+        """Darken the screen with the current flicker frame, scaled to the screen's size on first use."""
+        frames = self.scaled_frames.get(screen.get_size()) or self.build_frames(screen.get_size())
+        screen.blit(frames[self.frame_index], (0, 0), special_flags=pygame.BLEND_RGB_MULT)
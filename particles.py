@@ -0,0 +1,97 @@
+import numpy as np
+import pygame
+
+
+class ParticleSystem:
+    """Fixed-capacity pool of wind particles stored as NumPy arrays.
+
+    Behaves like a list of wind particles, but updates and culls every particle with array
+    operations and draws them with one blits() call from pre-rendered ellipse sprites.
+    """
+
+    _sprites = {}  # Pre-rendered ellipse per (integer size, color), shared by every pool
+
+    def __init__(self, capacity=128, max_emit_per_tick=2, color=(255, 255, 255), seed=None):
+        self.capacity = capacity
+        self.limit = capacity  # Live particles allowed, lowered by the quality settings
+        self.max_emit_per_tick = max_emit_per_tick  # Emission budget, on top of the capacity limit
+        self.color = color
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.size = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.lifetime = np.zeros(capacity)
+        self.count = 0  # Live particles occupy the first count slots
+        self.emitted_this_tick = 0
+        self.dropped = 0  # Emissions refused because of the budget or capacity
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, probability=1.0):
+        """Spawn one particle at (x, y) with the given probability, if the budget allows it."""
+        if probability < 1.0 and self.rng.random() >= probability:
+            return False
+        if self.count >= min(self.capacity, self.limit) or self.emitted_this_tick >= self.max_emit_per_tick:
+            self.dropped += 1
+            return False
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y + self.rng.integers(-2, 3)  # Slight random vertical offset for variation
+        self.size[i] = self.rng.integers(2, 5)
+        self.speed[i] = self.rng.uniform(4, 6)
+        self.lifetime[i] = self.rng.integers(30, 61)
+        self.count += 1
+        self.emitted_this_tick += 1
+        return True
+
+    def update(self, speed_factor=0):
+        """Move, age and shrink every particle, then compact the pool to drop dead ones.
+
+        Also starts a new emission budget for the next tick.
+        """
+        n = self.count
+        self.emitted_this_tick = 0
+        if n == 0:
+            return
+        self.x[:n] -= self.speed[:n] + abs(speed_factor) * 0.15
+        self.y[:n] += self.rng.uniform(-0.2, 0.2, n)
+        self.lifetime[:n] -= 1
+        self.size[:n] -= np.where(self.lifetime[:n] < 0, 0.1, 0.0)
+
+        keep = self.size[:n] > 0
+        live = int(keep.sum())
+        if live != n:
+            for array in (self.x, self.y, self.size, self.speed, self.lifetime):
+                array[:live] = array[:n][keep]
+            self.count = live
+
+    def clear(self):
+        self.count = 0
+        self.emitted_this_tick = 0
+
+    @classmethod
+    def sprite(cls, size, color):
+        key = (size, color)
+        sprite = cls._sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((size * 2, size), pygame.SRCALPHA)
+            pygame.draw.ellipse(sprite, color, (0, 0, size * 2, size))  # Elongated ellipse
+            cls._sprites[key] = sprite
+        return sprite
+
+    def render(self, screen):
+        """Draw every particle with a single batched blit and return their bounding rect, or None."""
+        n = self.count
+        if n == 0:
+            return None
+        sizes = self.size[:n].astype(int)
+        xs = self.x[:n].astype(int)
+        ys = self.y[:n].astype(int)
+        sprites = {int(size): self.sprite(int(size), self.color) for size in np.unique(sizes) if size > 0}
+        screen.blits([(sprites[s], (x, y)) for s, x, y in zip(sizes.tolist(), xs.tolist(), ys.tolist()) if s > 0],
+                     doreturn=False)
+        left, top = int(xs.min()), int(ys.min())
+        right, bottom = int((xs + 2 * sizes).max()), int((ys + sizes).max())
+        return pygame.Rect(left, top, right - left, bottom - top).clip(screen.get_rect())
@@ -1,30 +1,31 @@
 import pygame
 import random
+from assets import assets
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_WIDTH
 
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
-
 class Pipe:
-    def __init__(self, speed):
-        # Load and scale separate images for the top and bottom pipes
-        self.top_image = pygame.image.load("static/top_pipe.png")
-        self.bottom_image = pygame.image.load("static/bottom_pipe.png")
+    __slots__ = ("scaled_top_image", "scaled_bottom_image", "width", "gap", "x", "speed",
+                 "top_height", "bottom_height", "passed")
 
-        self.width = int(SCREEN_WIDTH * 0.15)  # 10% of screen width for the pipe width
-        self.gap = int(SCREEN_HEIGHT * 0.25)  # 25% of screen height for the gap between pipes
+    def __init__(self, speed, rng=random):
+        """Create a pipe at the right edge. Pass a random.Random as rng for a reproducible gap."""
+        self.reset(speed, rng)
 
-        # Scale the images based on the desired width and their original aspect ratios
-        self.top_height = self.top_image.get_height()
-        self.scaled_top_image = pygame.transform.scale(self.top_image, (self.width, self.top_height))
+    def reset(self, speed, rng=random):
+        """Move a recycled pipe back to the right edge with a new gap."""
+        # Share the pre-scaled pipe images from the asset registry
+        self.scaled_top_image = assets.get("top_pipe")
+        self.scaled_bottom_image = assets.get("bottom_pipe")
 
-        self.bottom_height = self.bottom_image.get_height()
-        self.scaled_bottom_image = pygame.transform.scale(self.bottom_image, (self.width, self.bottom_height))
+        self.width = PIPE_WIDTH
+        self.gap = int(SCREEN_HEIGHT * 0.25)  # 25% of screen height for the gap between pipes
 
         self.x = SCREEN_WIDTH
         self.speed = speed  # Set initial pipe speed
 
         # Set random top height and calculate bottom height dynamically
-        self.top_height = random.randint(50, SCREEN_HEIGHT - self.gap - 50)
+        self.top_height = rng.randint(50, SCREEN_HEIGHT - self.gap - 50)
         self.bottom_height = SCREEN_HEIGHT - self.top_height - self.gap
         self.passed = False  # To check if the pipe has been passed by the player for scoring
 
@@ -37,11 +38,25 @@ class Pipe:
         bottom_rect = pygame.Rect(self.x, SCREEN_HEIGHT - self.bottom_height, self.width, self.bottom_height - 25)
         return top_rect, bottom_rect
 
-    def render(self, screen):
-        # Draw the top pipe image
-        top_pipe_rect = pygame.Rect(self.x, self.top_height - self.scaled_top_image.get_height(), self.width, self.scaled_top_image.get_height())
-        screen.blit(self.scaled_top_image, top_pipe_rect)
+    def render(self, screen, alpha=1.0):
+        return render_pipe(screen, self, alpha)
+
+
+def render_pipe(screen, pipe, alpha=1.0):
+    """Draw any pipe-like object with x, speed, width, top_height and bottom_height, such as a simulated pipe.
+
+    alpha between 0 and 1 draws the pipe between its previous and current positions, which are one
+    speed apart. Returns the rects drawn for the top and bottom pipes.
+    """
+    top_image = assets.get("top_pipe")
+    bottom_image = assets.get("bottom_pipe")
+    x = pipe.x + pipe.speed * (1 - alpha)
+
+    # Draw the top pipe image
+    top_pipe_rect = pygame.Rect(x, pipe.top_height - top_image.get_height(), pipe.width, top_image.get_height())
+    top_drawn = screen.blit(top_image, top_pipe_rect)
 
-        # Draw the bottom pipe image
-        bottom_pipe_rect = pygame.Rect(self.x, SCREEN_HEIGHT - self.bottom_height, self.width, self.scaled_bottom_image.get_height())
-        screen.blit(self.scaled_bottom_image, bottom_pipe_rect)
+    # Draw the bottom pipe image
+    bottom_pipe_rect = pygame.Rect(x, SCREEN_HEIGHT - pipe.bottom_height, pipe.width, bottom_image.get_height())
+    bottom_drawn = screen.blit(bottom_image, bottom_pipe_rect)
+    return top_drawn, bottom_drawn
@@ -0,0 +1,72 @@
+from collections import deque
+
+
+class ObjectPool:
+    """Recycles instances of cls so the steady-state game loop does not allocate new entities.
+
+    acquire(*args) reuses a released object by calling its reset(*args), or builds a new one with
+    cls(*args) when none is free. At most max_free released objects are kept for reuse.
+    """
+
+    def __init__(self, cls, max_free=32):
+        self.cls = cls
+        self.max_free = max_free
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.cls(*args)
+
+    def release(self, obj):
+        """Return obj to the pool. The caller must not use it again after this."""
+        if len(self.free) < self.max_free:
+            self.free.append(obj)
+
+    def __len__(self):
+        return len(self.free)
+
+
+class EntityQueue:
+    """Live entities that expire in the order they were spawned, such as pipes or floating coins.
+
+    They are kept in a deque so expired ones come off the front in O(1), and are recycled through an
+    ObjectPool instead of being rebuilt.
+    """
+
+    def __init__(self, cls, max_free=32):
+        self.pool = ObjectPool(cls, max_free)
+        self.entities = deque()
+
+    def spawn(self, *args):
+        entity = self.pool.acquire(*args)
+        self.entities.append(entity)
+        return entity
+
+    def expire(self, is_expired):
+        """Recycle entities from the front while is_expired(entity) is true, and return how many were."""
+        entities = self.entities
+        count = 0
+        while entities and is_expired(entities[0]):
+            self.pool.release(entities.popleft())
+            count += 1
+        return count
+
+    def clear(self):
+        while self.entities:
+            self.pool.release(self.entities.popleft())
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __getitem__(self, index):
+        return self.entities[index]
@@ -0,0 +1,143 @@
+import csv
+import json
+import time
+import tracemalloc
+from collections import deque
+
+
+# Allocations that are not the game's: tracemalloc's own, the profiler's sample buffers and imports
+TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "*/profiler.py"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0-100) of values by the nearest-rank method: a value of the sample itself.
+
+    Every timing and score report uses this one definition, so their p50s and p95s can be compared.
+    """
+    ordered = sorted(values)  # Linear for values that are already sorted
+    if not ordered:
+        raise ValueError("percentile of an empty sample")
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class FrameProfiler:
+    """Times each stage of a frame and keeps rolling percentiles, entity counts and an optional trace.
+
+    Call begin_frame(), then mark(stage) at the end of every stage, count(name, value) for entity
+    counts, and end_frame(). Each mark records the time since the previous mark, so the overhead is
+    one perf_counter() call per stage.
+    """
+
+    def __init__(self, window=300, trace=False, max_trace_frames=100000):
+        self.window = window
+        self.trace_enabled = trace
+        self.max_trace_frames = max_trace_frames
+        self.stages = []  # Stage names in the order they were first seen
+        self.samples = {}  # Stage name -> deque of recent durations in milliseconds
+        self.counts = {}
+        self.trace = []
+        self.frame = 0
+        self.frame_times = {}
+        self.last_mark = None
+        self.frame_start = None
+        self.overlay_visible = False
+        self.overlay_lines = []
+        self.overlay_refresh = 15  # Frames between overlay text refreshes
+
+    def begin_frame(self):
+        self.frame_times = {}
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, stage):
+        """Record the time since the previous mark (or begin_frame) under stage."""
+        if self.last_mark is None:
+            return
+        now = time.perf_counter()
+        self.frame_times[stage] = self.frame_times.get(stage, 0.0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def skip(self, *stages):
+        """Record zero time for stages that did not run this frame, such as the ticks of a frame that
+        needed none, so their percentiles still cover every frame."""
+        for stage in stages:
+            self.frame_times.setdefault(stage, 0.0)
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        self.frame_times["total"] = (time.perf_counter() - self.frame_start) * 1000
+        for stage, duration in self.frame_times.items():
+            if stage not in self.samples:
+                self.stages.append(stage)
+                self.samples[stage] = deque(maxlen=self.window)
+            self.samples[stage].append(duration)
+        if self.trace_enabled and len(self.trace) < self.max_trace_frames:
+            record = {"frame": self.frame}
+            record.update(self.frame_times)
+            record.update(self.counts)
+            self.trace.append(record)
+        self.frame += 1
+        self.frame_start = self.last_mark = None
+
+    def percentiles(self, stage, points=(50, 95, 99)):
+        """Return the requested percentiles of the recent durations of stage, in milliseconds."""
+        samples = sorted(self.samples.get(stage, ()))
+        if not samples:
+            return tuple(0.0 for _ in points)
+        return tuple(percentile(samples, p) for p in points)
+
+    def summary(self):
+        """Return {stage: {"p50": ..., "p95": ..., "p99": ...}} for every stage seen so far."""
+        result = {}
+        for stage in self.stages:
+            p50, p95, p99 = self.percentiles(stage)
+            result[stage] = {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3)}
+        return result
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def render_overlay(self, screen, font, position=(10, 10)):
+        """Draw the stage percentiles and entity counts, and return the drawn rect (None when hidden)."""
+        if not self.overlay_visible:
+            return None
+        if self.frame % self.overlay_refresh == 0 or not self.overlay_lines:
+            lines = [f"{'stage':<10}{'p50':>8}{'p95':>8}{'p99':>8}"]
+            for stage in self.stages:
+                p50, p95, p99 = self.percentiles(stage)
+                lines.append(f"{stage:<10}{p50:8.2f}{p95:8.2f}{p99:8.2f}")
+            lines.append("  ".join(f"{name}={value}" for name, value in self.counts.items()))
+            self.overlay_lines = [font.render(line, True, (255, 255, 0), (0, 0, 0)) for line in lines]
+        x, y = position
+        drawn = []
+        for line in self.overlay_lines:
+            drawn.append(screen.blit(line, (x, y)))
+            y += line.get_height()
+        return drawn[0].unionall(drawn[1:])
+
+    def export(self, path):
+        """Write the per-frame trace to path, as JSON when it ends in .json and as CSV otherwise."""
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump({"summary": self.summary(), "frames": self.trace}, file)
+            return
+        columns = ["frame"] + self.stages + list(self.counts)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.trace)
+
+
+def load_overlay_font(size=18):
+    """Return a monospace font so the overlay columns line up."""
+    import pygame  # Only the overlay needs pygame, so the server and tournaments can use percentile without it
+    return pygame.font.SysFont("monospace", size)
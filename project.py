@@ -1,35 +1,37 @@
+import argparse
+import os
+import random
+import time
 from bitcoin import Bitcoin
-from pipe import Pipe
+from pipe import render_pipe
 from floating_bitcoin import FloatingBitcoin
 from background import Background
+from assets import assets
+from audio import sound_bank, MIXER_BUFFER
+from simulation import Simulation, TICK_RATE
+from course import daily_seed
+from fixed_timestep import FixedTimestep
+from input_timing import InputTimer
+from quality import QualityGovernor, TIERS, TIER_NAMES, settings as quality_settings
+from dirty_renderer import DirtyRenderer, SCROLL_STEP
+from lighting_effect import LightingEffect
+from profiler import FrameProfiler, load_overlay_font
+from replay import Recorder
+from pool import EntityQueue
+from startup import Startup, show_splash
+from leaderboard import Leaderboard, DEFAULT_PATH as DEFAULT_LEADERBOARD, MAX_NAME_LENGTH
 from utils import *
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
 
 
-# Screen settings
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+MAX_FPS = 144  # Rendering frame cap; the game logic always runs at the simulation's TICK_RATE
 
-# Initialize Pygame and the sound mixer
-pygame.init()
-pygame.mixer.init()
 
-bitconnect_sound = pygame.mixer.Sound("static/bitconnect.wav")  # Make sure you have this file
-cash_sound = pygame.mixer.Sound("static/cash.wav")  # Make sure you have this file
-flap_sound = pygame.mixer.Sound("static/flapp.wav")  # Make sure you have this file
+def game_over_screen(screen, font, score, best_score, on_frame=None):
+    """Displays the game over screen with the current and best score, and waits for a key press to restart.
 
-# Set sound volumes
-bitconnect_sound.set_volume(0.05)
-cash_sound.set_volume(0.18)  # Adjust the volume for the cash sound if necessary
-flap_sound.set_volume(0.3)  # Adjust the volume for the flap sound
-
-def reset_game(initial_speed):
-    """Resets the game and returns a new Bitcoin, pipes, and initial score."""
-    bitcoin = Bitcoin()
-    pipes = [Pipe(initial_speed)]
-    score = 0
-    return bitcoin, pipes, score
-
-def game_over_screen(screen, font, score, best_score):
-    """Displays the game over screen with the current and best score, and waits for a key press to restart."""
+    on_frame, if given, is called with the screen while waiting, e.g. to keep a stream going.
+    """
     screen.fill((0, 0, 0))  # Clear the screen with a black background
 
     # Display "Game Over"
@@ -59,116 +61,329 @@ def game_over_screen(screen, font, score, best_score):
                 exit()
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 waiting = False
+        if on_frame:
+            on_frame(screen)
+        pygame.time.wait(10)  # Do not spin a whole core while waiting
+
+
+
+
+def player_name(value):
+    """argparse type for --player: the name as the leaderboard stores it, checked before the game starts."""
+    try:
+        return Leaderboard.validate(value, 0)[0]
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def save_recording(record_dir, recording):
+    """Write a finished game to record_dir, named after its time, score and seed."""
+    os.makedirs(record_dir, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-score{recording.score}-seed{recording.seed}.bbr"
+    recording.save(os.path.join(record_dir, name))
+
+
+SCORE_ANIMATION_SCALE = 1.3  # The score text grows to this scale when a point is scored
+SCORE_ANIMATION_TICKS = int(0.3 * TICK_RATE)  # and shrinks back over 0.3 seconds of game time
+
+
+class Game:
+    """The simulation and the entities that draw it, and the work of every frame.
+
+    main, benchmark.py and soak.py all run their frames through update(ticks, controls), which runs the
+    frame's simulation ticks, and draw(alpha), which draws and presents the frame. After update, callers
+    deal with a game over and then call restart(seed).
+    """
+
+    def __init__(self, screen, font, seed=None, render_mode="full", scroll_step=SCROLL_STEP,
+                 lighting_effect=None, profiler=None, record=False, particle_seed=None):
+        self.font = font
+        self.sim = Simulation(seed, pixel_collision=True)
+        self.record = record
+        self.recorder = Recorder(self.sim.seed) if record else None
+        self.background = Background(self.sim.current_speed)
+        self.renderer = DirtyRenderer(screen, self.background, render_mode, scroll_step, lighting_effect)
+        self.bitcoin = Bitcoin(seed=particle_seed)
+        self.floating_bitcoins = EntityQueue(FloatingBitcoin)  # Recycled once they fade out
+        self.profiler = profiler or FrameProfiler()
+        self.sim.profiler = self.profiler
+        self.score_tick = None  # Tick of the latest point, for the score animation
+
+    def update(self, ticks, controls):
+        """Run up to ticks simulation ticks, stopping at game over, and move the entities along.
+
+        controls(index) returns the (flap, phase) of the frame's index-th tick.
+        """
+        sim, profiler = self.sim, self.profiler
+        for index in range(ticks):
+            flap, phase = controls(index)
+            if self.recorder:
+                self.recorder.record(sim.tick, flap, phase)
+            profiler.mark("events")
+            scored = sim.step(flap, phase)  # Marks the bird, pipes and collision stages
+            self.bitcoin.sync(sim.bird)
+            self.background.update(sim.current_speed, sim.bird.velocity)
+            for fb in self.floating_bitcoins:
+                fb.update()
+            self.floating_bitcoins.expire(FloatingBitcoin.is_expired)  # Every coin lasts equally long
+
+            if scored:
+                # Play cash sound when the score increases
+                sound_bank.play("cash")
+                # Trigger score animation, rendering its frames once up front
+                self.score_tick = sim.tick
+                prepare_score(self.font, sim.score, SCORE_ANIMATION_SCALE)
 
-
-
-
-def main():
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    clock = pygame.time.Clock()
-
-    # Load a custom font
-    font = load_custom_font(54)  # Adjust font size as needed
-
-    base_speed = 3
-    speed_increase_factor = 1.4
-    current_speed = base_speed
-
-    background = Background(current_speed)
-    bitcoin, pipes, score = reset_game(current_speed)
-    best_score = 0
-
-    # Variables for score animation
-    score_animation_time = 0
-    score_animation_factor = 1.0
-
-    # List to store floating bitcoins
-    floating_bitcoins = []
+                # Add a floating Bitcoin image above the bird
+                self.floating_bitcoins.spawn(sim.bird.x, sim.bird.y - 20)
+            profiler.mark("effects")  # Ends this tick, so the next tick's bird stage starts clean
+            if sim.game_over:
+                break
+        if not ticks:
+            profiler.skip("bird", "pipes", "collision")
+
+    def restart(self, seed=None):
+        """Start the next game on seed's course, keeping the bird's sprites, the pools and the caches."""
+        self.sim.reset(seed)
+        self.recorder = Recorder(self.sim.seed) if self.record else None
+        self.bitcoin.reset()
+        self.score_tick = None
+        self.renderer.invalidate()
+        self.profiler.mark("game_over")
+
+    def score_animation_factor(self, alpha=1.0):
+        """Scale of the score text alpha of the way from the previous tick to the current one."""
+        if self.score_tick is None:
+            return 1.0
+        elapsed = max(0.0, self.sim.tick - self.score_tick - 1 + alpha)
+        if elapsed >= SCORE_ANIMATION_TICKS:
+            return 1.0
+        return SCORE_ANIMATION_SCALE - (SCORE_ANIMATION_SCALE - 1) * elapsed / SCORE_ANIMATION_TICKS
+
+    def draw(self, alpha=1.0, flicker=True, overlay_font=None):
+        """Draw the frame alpha of the way from the previous tick to the current one, and present it.
+
+        flicker=False keeps the lighting at its current flicker level. overlay_font draws the profiler overlay.
+        """
+        renderer, profiler = self.renderer, self.profiler
+        target = renderer.target  # At the quality's internal resolution
+        renderer.begin_frame(alpha)
+        profiler.mark("background")
+        renderer.add(self.bitcoin.render(target, alpha))
+        for pipe in self.sim.pipes:
+            renderer.add(render_pipe(target, pipe, alpha))
+
+        # Render floating bitcoins
+        for fb in self.floating_bitcoins:
+            renderer.add(fb.render(target, alpha))
+        profiler.mark("entities")
+
+        renderer.apply_lighting(flicker)
+        profiler.mark("lighting")
+
+        # Display the animated, glowing score, building one more of its queued frames
+        text_cache.build_pending()
+        renderer.add(display_score(target, self.sim.score, self.font, self.score_animation_factor(alpha)))
+        if overlay_font:
+            renderer.add(profiler.render_overlay(target, overlay_font))
+        profiler.mark("score")
+        renderer.present()
+
+    def count_entities(self):
+        """Record the live pipes, wind particles and coins with the profiler."""
+        self.profiler.count("pipe_count", len(self.sim.pipes))
+        self.profiler.count("particle_count", len(self.bitcoin.wind_particles))
+        self.profiler.count("coin_count", len(self.floating_bitcoins))
+
+
+def main(render_mode="full", scroll_step=SCROLL_STEP, lighting=True, profile_trace=None, record_dir=None,
+         max_fps=MAX_FPS, frame_callback=None, player="player", leaderboard_path=DEFAULT_LEADERBOARD,
+         course_seed=None, audio_buffer=MIXER_BUFFER, input_latency=False, quality="auto", frame_budget_ms=None,
+         audio_latency=False):
+    """Run the game. render_mode "dirty" presents only changed regions instead of full flips.
+
+    F3 toggles the frame profiler overlay; profile_trace is a .csv or .json path for the per-frame trace.
+    With record_dir set, every game is saved there as a replayable recording.
+    The game logic runs in fixed ticks while frames are drawn at up to max_fps (0 for uncapped),
+    interpolated between the last two ticks.
+    frame_callback, if given, is called with the screen after every presented frame (see streaming.py).
+    Every finished game is submitted to the leaderboard at leaderboard_path (None to turn it off) as player.
+    With course_seed set, every game is played on that course (such as the daily challenge) instead of a random one.
+    audio_buffer is the mixer's buffer in samples; smaller buffers make the flap sound follow SPACE sooner.
+    Flaps apply at the time within a tick that SPACE was pressed; input_latency prints how long presses
+    took to reach the screen when the game exits, and audio_latency how long they took to reach the speakers.
+    quality is a tier name from quality.TIERS, or "auto" to step between tiers whenever frames take
+    longer than frame_budget_ms (by default one frame at 60 fps, or at max_fps when that is lower).
+    """
+    startup = Startup()
+    with startup.phase("init"):
+        # Initialize Pygame and the sound mixer, with a small buffer so sounds start soon after input
+        sound_bank.configure(buffer=audio_buffer)
+        pygame.init()
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error as error:
+                print(f"Sound disabled: {error}")
+    with startup.phase("display"):
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        clock = pygame.time.Clock()
+    with startup.phase("splash"):
+        show_splash(screen)
+
+    # Decode the sprites, load the sounds and the lighting gradient while the splash stays up
+    lighting_effect = LightingEffect(lazy=True) if lighting else None
+    jobs = [("sprites", assets.decode), ("sounds", sound_bank.load_sounds)]
+    if lighting_effect:
+        jobs.append(("lighting", lighting_effect.load_gradient))
+    startup.start_background(jobs)
+    with startup.phase("loading"):
+        while not startup.background_done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return
+            clock.tick(30)
+        startup.finish_background()
+
+    with startup.phase("convert"):
+        # Convert every sprite and overlay once, now that the display format is known
+        assets.convert()
+        sound_bank.reserve_channels()  # The mixer channels are set up from the main thread
+        if lighting_effect:
+            lighting_effect.build_frames()
+    with startup.phase("sprite_cache"):
+        Bitcoin.warm_sprite_cache()
+    with startup.phase("fonts"):
+        font = load_custom_font(54)  # Adjust font size as needed
+        profiler_font = load_overlay_font()
+
+    # The simulation owns all game logic; the Game only draws its state
+    seed = random.getrandbits(32) if course_seed is None else course_seed
+    profiler = FrameProfiler(trace=profile_trace is not None)  # Per-stage frame timing, shown with F3
+    game = Game(screen, font, seed, render_mode, scroll_step, lighting_effect, profiler,
+                record=record_dir is not None)
+    sim, renderer = game.sim, game.renderer
+    leaderboard = Leaderboard(leaderboard_path) if leaderboard_path else None
+    best_score = leaderboard.best(player) if leaderboard else 0  # The player's best across every session
+    timestep = FixedTimestep()
+    inputs = InputTimer()
+    # Play the flap as soon as SPACE is seen, not when its tick runs
+    inputs.on_flap = lambda pressed_at: sound_bank.play("flap", pressed_at=pressed_at)
+
+    # SPACE presses land on the tick, and the point within it, at which they happened
+    def controls(index):
+        return inputs.flap_for_tick(timestep.tick_time(index), timestep.dt)
+
+    # Effect quality, adjusted to the frame times when automatic
+    governor = None
+    if quality == "auto":
+        governor = QualityGovernor(frame_budget_ms or 1000 / min(max_fps or 60, 60))
+        quality_settings.apply(governor.settings)
+    else:
+        quality_settings.apply(TIERS[TIER_NAMES.index(quality)])
+    renderer.apply_quality(quality_settings)
 
     # Play the Bitconnect sound at the start of the game
-    bitconnect_sound.play(1000)
+    sound_bank.play("bitconnect", loops=1000)
 
+    next_frame = time.perf_counter()
     running = True
     while running:
-        for event in pygame.event.get():
+        profiler.begin_frame()
+        for event, _ in inputs.take_events():
             if event.type == pygame.QUIT:
                 running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    bitcoin.jump()
-
-        bitcoin.update()
-        background.update(current_speed, bitcoin.velocity)
-
-        if pipes[-1].x < SCREEN_WIDTH - 500:
-            pipes.append(Pipe(current_speed))
-
-        for pipe in pipes:
-            pipe.update()
-
-        pipes = [pipe for pipe in pipes if pipe.x + pipe.width > 0]
-
-        bitcoin_rect = bitcoin.get_rect()
-        collision = False
-        for pipe in pipes:
-            top_rect, bottom_rect = pipe.get_rects()
-            pipe_midpoint_x = pipe.x + (pipe.width // 2)  # Calculate midpoint of the pipe width
-
-            # Check for collisions if the bird's x position is near the midpoint of the pipe
-            if bitcoin_rect.colliderect(top_rect) or bitcoin_rect.colliderect(bottom_rect):
-                collision = True
-
-            # Update score if the bird has passed the midpoint of the pipe and hasn't already scored for it
-            if not pipe.passed and bitcoin.x > pipe_midpoint_x:
-                score += 1
-                pipe.passed = True
-                # Play cash sound when the score increases
-                cash_sound.play()
-                # Trigger score animation
-                score_animation_time = pygame.time.get_ticks()
-                score_animation_factor = 1.3
-
-                # Add a floating Bitcoin image above the bird
-                floating_bitcoin = FloatingBitcoin(bitcoin.x, bitcoin.y - 20)
-                floating_bitcoins.append(floating_bitcoin)
-
-        # Animate score text for 0.3 seconds when it increases
-        if pygame.time.get_ticks() - score_animation_time < 300:
-            score_animation_factor = 1.3 - ((pygame.time.get_ticks() - score_animation_time) / 300) * 0.3
-        else:
-            score_animation_factor = 1.0
-
-        if score % 15 == 0 and score != 0:
-            if current_speed == base_speed or score % 15 == 0:
-                current_speed = base_speed * (speed_increase_factor ** (score // 15))
-
-        if bitcoin.y < 0 or bitcoin.y > SCREEN_HEIGHT or collision:
-            if score > best_score:
-                best_score = score
-            game_over_screen(screen, font, score, best_score)
-            current_speed = base_speed
-            bitcoin, pipes, score = reset_game(current_speed)
-
-        background.render(screen)
-        bitcoin.render(screen)
-        for pipe in pipes:
-            pipe.render(screen)
-
-        # Update and render floating bitcoins
-        for fb in floating_bitcoins[:]:
-            fb.update()
-            if fb.is_expired():
-                floating_bitcoins.remove(fb)
-            else:
-                fb.render(screen)
-
-        # Display the animated, glowing score
-        display_score(screen, score, font, score_animation_factor)
-
-        pygame.display.flip()
-        clock.tick(30)
-
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+        profiler.mark("events")
+
+        # Run as many fixed ticks as the elapsed time calls for
+        ticks = timestep.advance()
+        game.update(ticks, controls)
+
+        if sim.game_over:
+            if game.recorder:
+                save_recording(record_dir, game.recorder.finish(sim))
+            if leaderboard:
+                leaderboard.submit(player, sim.score)  # Written in the background
+            if sim.score > best_score:
+                best_score = sim.score
+            game_over_screen(screen, font, sim.score, best_score, frame_callback)
+            game.restart(random.getrandbits(32) if course_seed is None else course_seed)
+            inputs.clear()
+            timestep.reset()  # Do not count the time spent on the game over screen
+
+        # Draw between the previous and the current tick; the lighting only flickers when a tick ran
+        game.draw(timestep.alpha, flicker=ticks > 0, overlay_font=profiler_font)
+        inputs.presented()
+        if frame_callback:
+            frame_callback(screen)
+        if startup.first_frame_time is None:
+            startup.first_frame()
+            print(startup.format_report())
+            print(assets.format_report())
+        profiler.mark("present")
+        if governor and governor.record((time.perf_counter() - profiler.frame_start) * 1000):
+            quality_settings.apply(governor.settings)
+            renderer.apply_quality(quality_settings)
+        # Wait for the next frame while polling input, so presses are timed to the millisecond
+        if max_fps:
+            next_frame = max(next_frame + 1 / max_fps, time.perf_counter())
+            inputs.wait_until(next_frame)
+        profiler.mark("idle")
+
+        profiler.count("ticks", ticks)
+        game.count_entities()
+        profiler.count("quality", quality_settings.name)
+        profiler.end_frame()
+
+    if game.recorder and sim.tick:
+        save_recording(record_dir, game.recorder.finish(sim))  # The unfinished game can be verified too
+    if profile_trace:
+        profiler.export(profile_trace)
+    if audio_latency:
+        print(sound_bank.format_latency_report())
+    if input_latency:
+        print(inputs.format_report())
+    if governor and governor.changes:
+        print("Quality changes: " + ", ".join(f"{name} at frame {frame} (p90 {p90} ms)"
+                                              for frame, name, p90 in governor.changes))
+    if leaderboard:
+        leaderboard.close()  # Writes any scores still queued
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Bitcoin Bird")
+    parser.add_argument("--render-mode", choices=("full", "dirty"), default="full",
+                        help="full flips every frame, dirty updates only the regions that changed and "
+                             "scrolls the background in steps (see --scroll-step)")
+    parser.add_argument("--scroll-step", type=int, default=SCROLL_STEP, metavar="PX",
+                        help="in dirty mode, redraw the scrolled background once it has moved PX pixels; "
+                             "higher saves more drawing but scrolls less smoothly, 0 keeps it still")
+    parser.add_argument("--no-lighting", action="store_true", help="turn off the dynamic lighting overlay")
+    parser.add_argument("--profile-trace", metavar="PATH",
+                        help="write per-frame stage timings to PATH (.csv or .json) on exit")
+    parser.add_argument("--record", metavar="DIR", help="save every game to DIR as a replayable recording")
+    parser.add_argument("--player", type=player_name, default=os.environ.get("USER", "player"),
+                        help=f"name on the leaderboard, up to {MAX_NAME_LENGTH} characters")
+    parser.add_argument("--leaderboard", default=DEFAULT_LEADERBOARD, help="SQLite file for the leaderboard")
+    parser.add_argument("--daily", action="store_true", help="play today's challenge course, the same for everyone")
+    parser.add_argument("--audio-buffer", type=int, default=MIXER_BUFFER,
+                        help="mixer buffer in samples; lower starts sounds sooner but may crackle on slow machines")
+    parser.add_argument("--input-latency", action="store_true",
+                        help="print the SPACE to screen latency distribution on exit")
+    parser.add_argument("--audio-latency", action="store_true",
+                        help="print the SPACE to flap sound latency distribution on exit")
+    parser.add_argument("--quality", choices=["auto"] + TIER_NAMES, default="auto",
+                        help="effect quality tier, or auto to lower and raise it with the frame times")
+    parser.add_argument("--frame-budget", type=float, default=None, metavar="MS",
+                        help="frame time the auto quality aims for (default: one frame at 60 fps or --max-fps if lower)")
+    parser.add_argument("--max-fps", type=int, default=MAX_FPS,
+                        help="cap on rendered frames per second, 0 for uncapped (the game speed does not change)")
+    args = parser.parse_args()
+    main(render_mode=args.render_mode, scroll_step=args.scroll_step, lighting=not args.no_lighting,
+         profile_trace=args.profile_trace, record_dir=args.record, max_fps=args.max_fps, player=args.player,
+         leaderboard_path=args.leaderboard, course_seed=daily_seed() if args.daily else None,
+         audio_buffer=args.audio_buffer, input_latency=args.input_latency,
+         quality=args.quality, frame_budget_ms=args.frame_budget, audio_latency=args.audio_latency)
@@ -0,0 +1,103 @@
+"""Quality tiers for the costly effects, and a governor that picks one from the measured frame times."""
+
+
+class QualityTier:
+    """How much of each costly effect to draw."""
+
+    def __init__(self, name, blur_copies, max_particles, glow, coin_fade, render_scale, lighting=True):
+        self.name = name
+        self.blur_copies = blur_copies  # Motion blur copies behind the bird (up to 3)
+        self.max_particles = max_particles  # Live wind particles per bird
+        self.glow = glow  # Glow around the score text
+        self.coin_fade = coin_fade  # Floating coins fade out instead of vanishing at the end
+        self.render_scale = render_scale  # Fraction of the logical resolution the frame is drawn at
+        self.lighting = lighting  # The full-screen lighting, one multiplying blit per frame
+
+
+# From the full effects down to the cheapest frame; the governor steps through them in order
+TIERS = [
+    QualityTier("high", blur_copies=3, max_particles=128, glow=True, coin_fade=True, render_scale=1.0),
+    QualityTier("medium", blur_copies=1, max_particles=48, glow=True, coin_fade=True, render_scale=1.0),
+    QualityTier("low", blur_copies=0, max_particles=16, glow=False, coin_fade=False, render_scale=1.0),
+    QualityTier("minimum", blur_copies=0, max_particles=0, glow=False, coin_fade=False, render_scale=0.5,
+                lighting=False),
+]
+TIER_NAMES = [tier.name for tier in TIERS]
+
+
+class QualitySettings:
+    """The tier in effect, read by the entities when they update and draw."""
+
+    def __init__(self, tier=TIERS[0]):
+        self.apply(tier)
+
+    def apply(self, tier):
+        self.tier = tier
+        self.name = tier.name
+        self.blur_copies = tier.blur_copies
+        self.max_particles = tier.max_particles
+        self.glow = tier.glow
+        self.coin_fade = tier.coin_fade
+        self.render_scale = tier.render_scale
+        self.lighting = tier.lighting
+
+
+class QualityGovernor:
+    """Steps through TIERS to keep the time spent on each frame within budget_ms.
+
+    Frame work times (without the wait for the next frame) are judged every window frames by their
+    90th percentile. Over budget, quality drops one tier straight away. Under upgrade_below of the
+    budget for upgrade_windows windows in a row, it rises one tier. Each time a tier has to be left
+    for being too slow, returning to it takes twice as many good windows, so the governor does not
+    keep bouncing between a tier that is just too slow and the one below it.
+    """
+
+    def __init__(self, budget_ms, tier=0, window=60, upgrade_below=0.6, upgrade_windows=3, tiers=TIERS):
+        self.budget_ms = budget_ms
+        self.tiers = tiers
+        self.tier = tier
+        self.window = window
+        self.upgrade_below = upgrade_below
+        self.upgrade_windows = upgrade_windows
+        self.samples = []
+        self.good_windows = 0
+        self.failures = [0] * len(tiers)  # Times each tier was left for being over budget
+        self.frames = 0
+        self.changes = []  # (frame, tier name, p90 ms) for every change
+
+    @property
+    def settings(self):
+        return self.tiers[self.tier]
+
+    def record(self, work_ms):
+        """Add one frame's work time. Returns True when the tier changed."""
+        self.frames += 1
+        self.samples.append(work_ms)
+        if len(self.samples) < self.window:
+            return False
+        ordered = sorted(self.samples)
+        p90 = ordered[int(len(ordered) * 0.9)]
+        self.samples.clear()
+
+        if p90 > self.budget_ms:
+            self.good_windows = 0
+            if self.tier < len(self.tiers) - 1:
+                self.failures[self.tier] += 1
+                return self._change(self.tier + 1, p90)
+        elif p90 < self.budget_ms * self.upgrade_below and self.tier > 0:
+            self.good_windows += 1
+            if self.good_windows >= self.upgrade_windows * 2 ** self.failures[self.tier - 1]:
+                self.good_windows = 0
+                return self._change(self.tier - 1, p90)
+        else:
+            self.good_windows = 0
+        return False
+
+    def _change(self, tier, p90):
+        self.tier = tier
+        self.changes.append((self.frames, self.tiers[tier].name, round(p90, 2)))
+        return True
+
+
+# Shared settings read by every entity
+settings = QualitySettings()
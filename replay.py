@@ -0,0 +1,173 @@
+"""Record games as a seed plus the ticks on which SPACE was pressed, and verify them headlessly.
+
+Verify recordings with:  python replay.py run1.bbr run2.bbr ...
+"""
+import argparse
+import os
+import struct
+import sys
+from multiprocessing import Pool
+from simulation import Simulation
+
+
+MAGIC = b"BBR2"
+# Magic, seed, ticks played, final score, SHA-256 of the final state, number of flaps, flags
+HEADER = struct.Struct("<4sQII32sIB")
+FLAG_PIXEL_COLLISION = 1
+FLAG_FLAP_PHASES = 2  # A byte per flap follows the flap ticks, with the phase of each flap within its tick
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varints(data, offset, count):
+    values = []
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return values, offset
+
+
+class Recording:
+    """A finished game: its seed, the ticks with a flap, and the expected final score and state hash."""
+
+    def __init__(self, seed, flaps, ticks, score, state_hash, pixel_collision=False, phases=None):
+        self.seed = seed
+        self.flaps = flaps  # Sorted tick numbers on which the player flapped
+        self.ticks = ticks
+        self.score = score
+        self.state_hash = state_hash
+        self.pixel_collision = pixel_collision  # The collision mode the game was played with
+        self.phases = phases or [0] * len(flaps)  # Phase of each flap within its tick, see Simulation.step
+
+    def to_bytes(self):
+        """Encode as a fixed header followed by the flap ticks as varint deltas (about a byte per flap),
+        and the flap phases when any is not 0."""
+        flags = FLAG_PIXEL_COLLISION if self.pixel_collision else 0
+        if any(self.phases):
+            flags |= FLAG_FLAP_PHASES
+        out = bytearray(HEADER.pack(MAGIC, self.seed, self.ticks, self.score,
+                                    bytes.fromhex(self.state_hash), len(self.flaps), flags))
+        previous = 0
+        for tick in self.flaps:
+            encode_varint(tick - previous, out)
+            previous = tick
+        if flags & FLAG_FLAP_PHASES:
+            out += bytes(self.phases)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, seed, ticks, score, state_hash, flap_count, flags = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a Bitcoin Bird recording")
+        deltas, offset = decode_varints(data, HEADER.size, flap_count)
+        flaps, tick = [], 0
+        for delta in deltas:
+            tick += delta
+            flaps.append(tick)
+        phases = None
+        if flags & FLAG_FLAP_PHASES:
+            phases = list(data[offset:offset + flap_count])
+            if len(phases) != flap_count:
+                raise ValueError("Recording is truncated")
+        return cls(seed, flaps, ticks, score, state_hash.hex(), bool(flags & FLAG_PIXEL_COLLISION), phases)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+class Recorder:
+    """Collects the flaps of one game as the simulation is stepped."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.flaps = []
+        self.phases = []
+
+    def record(self, tick, flap, phase=0):
+        """Call before Simulation.step(flap, phase) with the simulation's current tick."""
+        if flap:
+            self.flaps.append(tick)
+            self.phases.append(phase)
+
+    def finish(self, sim):
+        return Recording(self.seed, self.flaps, sim.tick, sim.score, sim.state_hash(), sim.pixel_collision,
+                         self.phases)
+
+
+def replay(recording):
+    """Re-run a recording headlessly and return the finished Simulation.
+
+    The replay stops at game over, so sim.tick is less than recording.ticks if the game ended early.
+    """
+    sim = Simulation(recording.seed, pixel_collision=recording.pixel_collision)
+    phases = dict(zip(recording.flaps, recording.phases))
+    step = sim.step
+    for tick in range(recording.ticks):
+        phase = phases.get(tick)
+        step(phase is not None, phase or 0)
+        if sim.game_over:
+            break
+    return sim
+
+
+def verify(recording):
+    """Return True when replaying the recording reproduces its final score and state hash.
+
+    The game must last exactly recording.ticks, and every flap must come before it ended.
+    """
+    sim = replay(recording)
+    if sim.tick != recording.ticks or (recording.flaps and recording.flaps[-1] >= sim.tick):
+        return False
+    return sim.score == recording.score and sim.state_hash() == recording.state_hash
+
+
+def verify_file(path):
+    try:
+        return path, verify(Recording.load(path))
+    except (OSError, ValueError, struct.error, IndexError):
+        return path, False
+
+
+def verify_files(paths, processes=None):
+    """Verify many recordings in parallel and return {path: ok}."""
+    if len(paths) < 2:
+        return dict(map(verify_file, paths))
+    with Pool(processes) as pool:
+        return dict(pool.map(verify_file, paths, chunksize=max(1, len(paths) // ((processes or os.cpu_count()) * 4))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify Bitcoin Bird recordings headlessly")
+    parser.add_argument("paths", nargs="+", help="recording files (.bbr)")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    results = verify_files(args.paths, args.processes)
+    for path, ok in results.items():
+        print(f"{'OK  ' if ok else 'FAIL'} {path}")
+    failed = sum(not ok for ok in results.values())
+    print(f"{len(results) - failed}/{len(results)} recordings verified")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""The game's resolution, shared by every module.
+
+Everything is positioned in this logical resolution. The frame may be drawn at a fraction of it (see
+quality.py) and is scaled up to the window once when it is presented.
+"""
+
+SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+
+# Sprite sizes follow the resolution. The asset registry scales the images to them, and the headless
+# simulations collide with boxes of the same size.
+BIRD_WIDTH = int(SCREEN_WIDTH * 0.075)  # Bird sprites are 7.5% of the screen width
+BIRD_ART_SIZE = (2016, 1604)  # Size of static/bird_rising.png, whose aspect ratio every bird pose keeps
+BIRD_HEIGHT = int(BIRD_WIDTH * BIRD_ART_SIZE[1] / BIRD_ART_SIZE[0])
+COIN_WIDTH = int(SCREEN_WIDTH * 0.045)  # Floating coins are 4.5% of the screen width
+PIPE_WIDTH = int(SCREEN_WIDTH * 0.15)  # Pipes are 15% of the screen width
+
+
+def render_size(scale):
+    """Size of the internal frame drawn at scale times the logical resolution."""
+    return max(1, round(SCREEN_WIDTH * scale)), max(1, round(SCREEN_HEIGHT * scale))
@@ -0,0 +1,196 @@
+"""Serve Bitcoin Bird to browsers: every visitor gets a headless game whose frames stream to the page.
+It also serves the leaderboard: POST /scores, GET /leaderboard?n=10 and GET /leaderboard/<player>.
+
+Run with:  python server.py [--port 5000] [--max-sessions 8]
+"""
+import argparse
+import atexit
+import itertools
+import signal
+import struct
+import sys
+import threading
+from flask import Flask, Response, abort, jsonify, render_template, request
+from werkzeug.serving import WSGIRequestHandler
+from leaderboard import Leaderboard, DEFAULT_PATH
+from streaming import GameSession, create_encoder, IDLE_TIMEOUT, STREAM_FPS, STREAM_SIZE
+
+
+FRAME_HEADER = struct.Struct(">I")  # Each streamed frame is its byte length followed by the image
+MAX_TOP = 1000  # Largest n accepted by /leaderboard
+REAP_INTERVAL = 5.0  # Seconds between checks for abandoned sessions
+
+
+def create_app(max_sessions=8, encoder_workers=None, size=STREAM_SIZE, fps=STREAM_FPS, image_format="jpg",
+               game_options=None, leaderboard_path=DEFAULT_PATH, idle_timeout=IDLE_TIMEOUT):
+    """Build the Flask app. game_options are passed on to project.main in every game process.
+
+    Streamed games submit their scores to the leaderboard at leaderboard_path themselves. Sessions whose
+    game died, or that neither streamed nor received input for idle_timeout seconds, are closed by a
+    background reaper so they do not keep a slot of max_sessions.
+    """
+    app = Flask(__name__)
+    encoder = create_encoder(encoder_workers)
+    leaderboard = Leaderboard(leaderboard_path)
+    app.leaderboard = leaderboard
+    sessions = {}
+    sessions_lock = threading.Lock()
+    session_ids = itertools.count(1)
+
+    def get_session(session_id):
+        session = sessions.get(session_id)
+        if session is None:
+            abort(404)
+        return session
+
+    def reap_sessions():
+        """Close every abandoned session and return how many there were."""
+        with sessions_lock:
+            abandoned = [session_id for session_id, session in sessions.items() if session.is_abandoned(idle_timeout)]
+            closing = [sessions.pop(session_id) for session_id in abandoned]
+        for session in closing:
+            session.close()
+        return len(closing)
+
+    stop_reaper = threading.Event()
+
+    def reap_periodically():
+        while not stop_reaper.wait(REAP_INTERVAL):
+            reap_sessions()
+
+    threading.Thread(target=reap_periodically, name="session-reaper", daemon=True).start()
+    app.reap_sessions = reap_sessions
+
+    def close_all():
+        stop_reaper.set()
+        with sessions_lock:
+            for session in sessions.values():
+                session.close()
+            sessions.clear()
+        encoder.shutdown(wait=False, cancel_futures=True)
+        leaderboard.close()
+
+    app.close_all = close_all
+    atexit.register(close_all)
+
+    @app.route("/")
+    def index():
+        return render_template("index.html", width=size[0], height=size[1])
+
+    @app.route("/session", methods=["POST"])
+    def start_session():
+        reap_sessions()
+        with sessions_lock:
+            if len(sessions) >= max_sessions:
+                return jsonify({"error": "The server is full, try again later"}), 503
+            session_id = str(next(session_ids))
+            player = (request.get_json(silent=True) or {}).get("player") or f"guest-{session_id}"
+            try:
+                player, _ = Leaderboard.validate(player, 0)
+            except ValueError as error:
+                return jsonify({"error": str(error)}), 400
+            options = dict(game_options or {}, player=player, leaderboard_path=leaderboard_path)
+            session = sessions[session_id] = GameSession(session_id, encoder, size, fps, image_format, options)
+        # Spawning the game process is slow, so the other routes are not kept waiting on the lock for it
+        try:
+            session.start()
+        except Exception:
+            with sessions_lock:
+                sessions.pop(session_id, None)
+            raise
+        return jsonify({"id": session_id, "width": size[0], "height": size[1], "format": image_format})
+
+    @app.route("/session/<session_id>/close", methods=["POST"])
+    def close_session(session_id):
+        with sessions_lock:
+            session = sessions.pop(session_id, None)
+        if session:
+            session.close()
+        return "", 204
+
+    @app.route("/session/<session_id>/input", methods=["POST"])
+    def send_input(session_id):
+        key = (request.get_json(silent=True) or {}).get("key", "space")
+        if key != "space":
+            abort(400)
+        get_session(session_id).flap()
+        return "", 204
+
+    @app.route("/session/<session_id>/stream")
+    def stream(session_id):
+        session = get_session(session_id)
+
+        def frames():
+            try:
+                while session.running:
+                    image = session.next_frame()
+                    if image is None:
+                        continue
+                    yield FRAME_HEADER.pack(len(image)) + image
+                    session.record_sent(FRAME_HEADER.size + len(image))
+            finally:
+                # The client went away (or the game ended), so the game is no longer needed
+                with sessions_lock:
+                    sessions.pop(session_id, None)
+                session.close()
+
+        return Response(frames(), mimetype="application/octet-stream", headers={"Cache-Control": "no-store"})
+
+    @app.route("/scores", methods=["POST"])
+    def submit_scores():
+        """Accept {"player": ..., "score": ...} or a list of them. Scores are written in the background."""
+        body = request.get_json(silent=True)
+        entries = body if isinstance(body, list) else [body]
+        try:
+            checked = [Leaderboard.validate(entry.get("player"), entry.get("score"))
+                       for entry in entries if isinstance(entry, dict)]
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+        if not checked or len(checked) != len(entries):
+            return jsonify({"error": "expected {\"player\": ..., \"score\": ...} or a list of them"}), 400
+        for player, score in checked:
+            leaderboard.submit(player, score)
+        return jsonify({"accepted": len(checked)}), 202
+
+    @app.route("/leaderboard")
+    def top_scores():
+        n = max(1, min(request.args.get("n", 10, type=int), MAX_TOP))
+        return jsonify({"top": leaderboard.top(n)})
+
+    @app.route("/leaderboard/<player>")
+    def player_rank(player):
+        entry = leaderboard.rank(player)
+        if entry is None:
+            abort(404)
+        return jsonify(entry)
+
+    @app.route("/metrics")
+    def metrics():
+        with sessions_lock:
+            current = dict(sessions)
+        return jsonify({session_id: session.metrics() for session_id, session in current.items()})
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream headless Bitcoin Bird games to browsers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-sessions", type=int, default=8, help="games that may run at once")
+    parser.add_argument("--encoders", type=int, default=None, help="encoder processes (default: one per core)")
+    parser.add_argument("--format", choices=("jpg", "png"), default="jpg", help="image format of streamed frames")
+    parser.add_argument("--leaderboard", default=DEFAULT_PATH, help="SQLite file for the leaderboard")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, metavar="SECONDS",
+                        help="close sessions that stream no frames and get no input for this long")
+    args = parser.parse_args(argv)
+
+    app = create_app(args.max_sessions, args.encoders, image_format=args.format, leaderboard_path=args.leaderboard,
+                     idle_timeout=args.idle_timeout)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # Run the atexit cleanup on SIGTERM too
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"  # Keep connections alive between requests
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import hashlib
+import struct
+from array import array
+from pool import EntityQueue
+from course import Course, speed_for_score, PIPE_GAP, PIPE_SPAWN_X, SPEED_TABLE
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH
+
+
+# Bird physics, matching the Bitcoin entity
+BIRD_X = 50
+GRAVITY = 0.6
+LIFT = -8
+POSE_TICKS = 15  # 0.5 seconds at 30 ticks per second for the rising and neutral poses
+
+# Pipe geometry, matching the Pipe entity
+TOP_PIPE_TRIM = 15  # Collision boxes are trimmed to follow the pipe caps
+BOTTOM_PIPE_TRIM = 25
+
+TICK_RATE = 30  # Simulation ticks per second of game time
+PHASE_STEPS = 256  # A flap can happen at any 1/256th of a tick
+
+POSES = ("rising", "neutral", "falling")
+SNAPSHOT_MAGIC = b"BBS1"
+# Magic, seed, tick, score, pipes spawned, game over, bird x, y, velocity, last jump tick (-1 for none),
+# pose index, number of pipes
+SNAPSHOT_HEADER = struct.Struct("<4sQIII?dddiBB")
+SNAPSHOT_PIPE = struct.Struct("<ddi?")  # x, speed, top height, passed
+
+
+def bird_angle(velocity):
+    """Rotation in degrees that the bird sprite is drawn with for a given velocity."""
+    if velocity < 0:
+        return max(30, velocity * 3)
+    return min(-30, velocity * 3)
+
+
+def rects_overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    """Same test as pygame.Rect.colliderect for integer rectangles."""
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+class BirdState:
+    __slots__ = ("x", "y", "velocity", "last_jump_tick", "pose")
+
+    def __init__(self):
+        self.x = BIRD_X
+        self.y = SCREEN_HEIGHT // 2
+        self.velocity = 0
+        self.last_jump_tick = None
+        self.pose = "neutral"  # One of "rising", "neutral" or "falling"
+
+
+class PipeState:
+    __slots__ = ("x", "speed", "top_height", "bottom_height", "passed")
+
+    def __init__(self, speed, top_height):
+        self.reset(speed, top_height)
+
+    def reset(self, speed, top_height):
+        self.x = SCREEN_WIDTH
+        self.speed = speed
+        self.top_height = top_height
+        self.bottom_height = SCREEN_HEIGHT - top_height - PIPE_GAP
+        self.passed = False
+
+    @property
+    def width(self):
+        return PIPE_WIDTH
+
+    def is_offscreen(self):
+        return self.x + PIPE_WIDTH <= 0
+
+    def get_rects(self):
+        """Returns the collision boxes of the top and bottom pipes as (x, y, width, height) tuples."""
+        x = int(self.x)
+        top = (x, 0, PIPE_WIDTH, self.top_height - TOP_PIPE_TRIM)
+        bottom = (x, SCREEN_HEIGHT - self.bottom_height, PIPE_WIDTH, self.bottom_height - BOTTOM_PIPE_TRIM)
+        return top, bottom
+
+
+class Snapshot:
+    """The complete state of a Simulation at one tick, kept in a few flat fields.
+
+    The course is not copied: it is a pure function of the seed, so the seed and the number of pipes
+    spawned are enough to carry on from the same pipe. Taking or restoring a snapshot copies a handful
+    of numbers and one small array, so planners can branch and rewind thousands of times per second.
+    """
+
+    __slots__ = ("seed", "tick", "score", "pipes_spawned", "game_over", "bird", "pipes")
+
+    def __init__(self, seed, tick, score, pipes_spawned, game_over, bird, pipes):
+        self.seed = seed
+        self.tick = tick
+        self.score = score
+        self.pipes_spawned = pipes_spawned
+        self.game_over = game_over
+        self.bird = bird  # (x, y, velocity, last jump tick or None, pose)
+        self.pipes = pipes  # array("d") of x, speed, top height, passed for each pipe, oldest first
+
+    def to_bytes(self):
+        """Encode as a fixed header followed by one record per pipe (about 100 bytes in all)."""
+        x, y, velocity, last_jump_tick, pose = self.bird
+        pipes = self.pipes
+        out = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.seed, self.tick, self.score, self.pipes_spawned,
+                                             self.game_over, x, y, velocity,
+                                             -1 if last_jump_tick is None else last_jump_tick,
+                                             POSES.index(pose), len(pipes) // 4))
+        for i in range(0, len(pipes), 4):
+            out += SNAPSHOT_PIPE.pack(pipes[i], pipes[i + 1], int(pipes[i + 2]), bool(pipes[i + 3]))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        (magic, seed, tick, score, pipes_spawned, game_over, x, y, velocity, last_jump_tick, pose,
+         pipe_count) = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a Bitcoin Bird snapshot")
+        if len(data) < SNAPSHOT_HEADER.size + pipe_count * SNAPSHOT_PIPE.size:
+            raise ValueError("Snapshot is truncated")
+        pipes = array("d")
+        for pipe in SNAPSHOT_PIPE.iter_unpack(data[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size
+                                                   + pipe_count * SNAPSHOT_PIPE.size]):
+            pipes.extend(pipe)
+        bird = (x, y, velocity, None if last_jump_tick < 0 else last_jump_tick, POSES[pose])
+        return cls(seed, tick, score, pipes_spawned, game_over, bird, pipes)
+
+
+class Simulation:
+    """Headless game logic that advances one fixed tick at a time.
+
+    It has no display, audio or clock dependency, so games can be stepped as fast as the CPU allows.
+    The pipes come from the seeded Course, so a seed always gives the same course and speeds.
+    By default collisions use the trimmed pipe boxes. With pixel_collision=True they are tested
+    against the sprite masks instead (see collision.py), which needs pygame but still no display.
+    """
+
+    def __init__(self, seed=None, pixel_collision=False):
+        self.course = Course(seed)
+        self.pixel_collision = pixel_collision
+        self.collider = None
+        if pixel_collision:
+            from collision import PixelCollider  # Only pixel collision needs pygame
+            self.collider = PixelCollider()
+        self.profiler = None  # Optional FrameProfiler that times the stages of each step
+        self.pipes = EntityQueue(PipeState)  # Recycled PipeStates, oldest (leftmost) first
+        self.reset()
+
+    def reset(self, seed=None):
+        """Start a new game, on the course of seed when one is given and on the same course otherwise."""
+        self.course.reset(seed)
+        self.bird = BirdState()
+        self.current_speed = SPEED_TABLE[0]
+        self.pipes.clear()
+        self.pipes_spawned = 0
+        self.score = 0
+        self.tick = 0
+        self.game_over = False
+        self.spawn_pipe()
+
+    @property
+    def seed(self):
+        return self.course.seed
+
+    def spawn_pipe(self):
+        self.pipes.spawn(self.current_speed, self.course.gap(self.pipes_spawned))
+        self.pipes_spawned += 1
+        self.course.release(self.pipes_spawned)
+
+    def upcoming_gaps(self, count):
+        """Top pipe heights of the next count pipes that have not spawned yet, for controllers that plan ahead."""
+        return self.course.lookahead(self.pipes_spawned, count)
+
+    def step(self, flap=False, phase=0):
+        """Advance the game by one tick and return the number of points scored during it.
+
+        phase is how far into the tick the flap happened, in 1/PHASE_STEPS of a tick. The bird moves
+        on its old course for that part of the tick, so a late press does not count as an early one.
+        """
+        if self.game_over:
+            return 0
+        bird = self.bird
+        velocity = bird.velocity
+        if flap:
+            bird.velocity = LIFT
+            bird.last_jump_tick = self.tick
+
+        bird.velocity += GRAVITY
+        if flap and phase:
+            before = phase / PHASE_STEPS
+            bird.y += before * (velocity + GRAVITY) + (1 - before) * bird.velocity
+        else:
+            bird.y += bird.velocity
+        self._update_pose()
+        if self.profiler:
+            self.profiler.mark("bird")
+
+        if self.pipes[-1].x < PIPE_SPAWN_X:
+            self.spawn_pipe()
+        for pipe in self.pipes:
+            pipe.x -= pipe.speed
+        # Pipes leave the screen in the order they spawned, so only the front can have expired
+        self.pipes.expire(PipeState.is_offscreen)
+        if self.profiler:
+            self.profiler.mark("pipes")
+
+        # Pipes stay sorted by x (they spawn at the right edge and never overtake each other),
+        # so only the pipes overlapping the bird's x-span are tested for collision
+        bird_x, bird_y = int(bird.x), int(bird.y)
+        if self.collider:
+            span_left, span_right = self.collider.x_span(bird)  # The rotated sprite is wider
+        else:
+            span_left, span_right = bird_x, bird_x + BIRD_WIDTH
+        collision = False
+        scored = 0
+        for pipe in self.pipes:
+            pipe_x = int(pipe.x)
+            if pipe_x >= span_right:
+                break  # This pipe and every later one are still ahead of the bird
+            # Score once the bird has passed the midpoint of the pipe
+            if not pipe.passed and bird.x > pipe.x + PIPE_WIDTH // 2:
+                pipe.passed = True
+                scored += 1
+            if pipe_x + PIPE_WIDTH <= span_left or collision:
+                continue
+            if self.collider:
+                collision = self.collider.hits(bird, pipe)
+            else:
+                top, bottom = pipe.get_rects()
+                collision = (rects_overlap(bird_x, bird_y, BIRD_WIDTH, BIRD_HEIGHT, *top)
+                             or rects_overlap(bird_x, bird_y, BIRD_WIDTH, BIRD_HEIGHT, *bottom))
+
+        if scored:
+            self.score += scored
+            self.current_speed = speed_for_score(self.score)
+
+        if bird.y < 0 or bird.y > SCREEN_HEIGHT or collision:
+            self.game_over = True
+        if self.profiler:
+            self.profiler.mark("collision")
+        self.tick += 1
+        return scored
+
+    def _update_pose(self):
+        bird = self.bird
+        if bird.velocity < 0:
+            if bird.last_jump_tick is not None:
+                elapsed = self.tick - bird.last_jump_tick
+                if elapsed < POSE_TICKS:
+                    bird.pose = "rising"
+                elif elapsed < 2 * POSE_TICKS:
+                    bird.pose = "neutral"
+        else:
+            bird.pose = "falling"
+
+    def snapshot(self):
+        """Return a Snapshot of the current state, to restore() later or to send elsewhere."""
+        bird = self.bird
+        pipes = array("d")
+        for pipe in self.pipes:
+            pipes.extend((pipe.x, pipe.speed, pipe.top_height, pipe.passed))
+        return Snapshot(self.course.seed, self.tick, self.score, self.pipes_spawned, self.game_over,
+                        (bird.x, bird.y, bird.velocity, bird.last_jump_tick, bird.pose), pipes)
+
+    def restore(self, snapshot):
+        """Go back (or forward) to a snapshot's state. Stepping on then plays out exactly as it did after
+        the snapshot was taken, whichever Simulation it came from."""
+        course = self.course
+        if course.seed != snapshot.seed or snapshot.pipes_spawned < course.start:
+            course.reset(snapshot.seed)  # The gaps before the snapshot's next pipe were already released
+        bird = self.bird
+        bird.x, bird.y, bird.velocity, bird.last_jump_tick, bird.pose = snapshot.bird
+        self.pipes.clear()
+        pipes = snapshot.pipes
+        for i in range(0, len(pipes), 4):
+            pipe = self.pipes.spawn(pipes[i + 1], int(pipes[i + 2]))
+            pipe.x = pipes[i]
+            pipe.passed = bool(pipes[i + 3])
+        self.pipes_spawned = snapshot.pipes_spawned
+        self.score = snapshot.score
+        self.current_speed = speed_for_score(snapshot.score)
+        self.tick = snapshot.tick
+        self.game_over = snapshot.game_over
+
+    def state_hash(self):
+        """Return a SHA-256 hex digest of the game state, for checking that two runs ended identically."""
+        bird = self.bird
+        digest = hashlib.sha256(struct.pack("<IIddd?", self.tick, self.score, bird.y, bird.velocity,
+                                            self.current_speed, self.game_over))
+        for pipe in self.pipes:
+            digest.update(struct.pack("<ddi?", pipe.x, pipe.speed, pipe.top_height, pipe.passed))
+        return digest.hexdigest()
+
+    def play(self, controller, max_ticks=None):
+        """Run one game to the end with controller(simulation) -> bool deciding each flap.
+
+        Returns the final score.
+        """
+        while not self.game_over and (max_ticks is None or self.tick < max_ticks):
+            self.step(controller(self))
+        return self.score
@@ -0,0 +1,247 @@
+"""Soak test: hours of game time played by a scripted player, to show that memory stays flat.
+
+Run with:  python soak.py --hours 4 [--sample-minutes 10] [--max-growth 64]
+The game runs headlessly (SDL dummy drivers) as fast as it can, through many game over and restart
+cycles. At every sample interval of game time, tracemalloc measures the traced memory, and the live
+entities, cache entries and Surfaces are counted. The report shows how each of them trends and which
+source lines allocated the memory gained since the first sample.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import pygame
+from assets import assets
+from bitcoin import Bitcoin
+from lighting_effect import LightingEffect
+from profiler import FrameProfiler, TRACE_FILTERS
+from project import Game
+from quality import settings as quality_settings
+from simulation import TICK_RATE
+from sprite_cache import sprite_cache
+from tournament import follow_gap
+from utils import load_custom_font, text_cache
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+MISTAKE_RATE = 0.01  # Chance per tick that the scripted player gets its decision wrong
+
+
+def scripted_player(seed=0, mistake_rate=MISTAKE_RATE):
+    """follow_gap that now and then gets a tick wrong, so games end and restart regularly."""
+    rng = random.Random(seed)
+
+    def player(sim):
+        return follow_gap(sim) != (rng.random() < mistake_rate)
+    return player
+
+
+def count_surfaces():
+    """Count the Surfaces held by any object the garbage collector tracks.
+
+    Surfaces are not tracked themselves, but every one the game keeps is held by an entity, a cache,
+    a list or a dict, which are.
+    """
+    seen = set()
+    for obj in gc.get_objects():
+        for referent in gc.get_referents(obj):
+            if isinstance(referent, pygame.Surface):
+                seen.add(id(referent))
+    return len(seen)
+
+
+def live_counts(sim, bitcoin, coins):
+    """Return the number of live entities, pooled entities, cache entries, Surfaces and GC objects."""
+    return {
+        "pipes": len(sim.pipes),
+        "pooled_pipes": len(sim.pipes.pool),
+        "coins": len(coins),
+        "pooled_coins": len(coins.pool),
+        "particles": len(bitcoin.wind_particles),
+        "course_gaps": len(sim.course.gaps),
+        "sprite_cache": len(sprite_cache.entries),
+        "text_cache": len(text_cache.entries),
+        "surfaces": count_surfaces(),
+        "gc_objects": len(gc.get_objects()),
+    }
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs, 0 with fewer than two points."""
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def run_soak(screen, font, hours=1.0, sample_minutes=5.0, seed=0, render_every=1, lighting_effect=None,
+             mistake_rate=MISTAKE_RATE, top=10, warmup_minutes=10.0):
+    """Play hours of game time and return the samples, growth trends and top allocation sites.
+
+    One tick is simulated, and one frame drawn, per loop, through the same project.Game as the game;
+    render_every=N draws every Nth tick only.
+    The pools and caches fill up during the first warmup_minutes of game time, so the trends only
+    use the samples from then on, and allocation sites are compared with the first of them.
+    """
+    total_ticks = int(hours * 3600 * TICK_RATE)
+    sample_ticks = max(1, int(sample_minutes * 60 * TICK_RATE))
+    warmup_ticks = int(warmup_minutes * 60 * TICK_RATE)
+    player = scripted_player(seed, mistake_rate)
+    course_seeds = random.Random(seed)
+
+    profiler = FrameProfiler()
+    game = Game(screen, font, course_seeds.getrandbits(32), lighting_effect=lighting_effect, profiler=profiler,
+                record=True)
+    game.renderer.apply_quality(quality_settings)
+    sim, bitcoin, coins = game.sim, game.bitcoin, game.floating_bitcoins
+
+    def controls(index):
+        return player(sim), 0
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    games = 0
+    best_score = 0
+    samples = []
+    baseline = None
+    held_bytes = held_blocks = 0
+    steady = len(samples)
+    interval_start = time.perf_counter()
+    for tick in range(1, total_ticks + 1):
+        profiler.begin_frame()
+        game.update(1, controls)
+        if sim.game_over:
+            game.recorder.finish(sim)  # Built as when it is saved, then dropped
+            games += 1
+            best_score = max(best_score, sim.score)
+            game.restart(course_seeds.getrandbits(32))
+
+        if tick % render_every == 0:
+            game.draw()
+            profiler.mark("present")
+        game.count_entities()
+        profiler.end_frame()
+
+        if tick % sample_ticks == 0:
+            ms_per_tick = (time.perf_counter() - interval_start) * 1000 / sample_ticks
+            gc.collect()  # Unreachable cycles are not growth
+            sample = {
+                "game_minutes": round(tick / TICK_RATE / 60, 2),
+                "games": games,
+                "ms_per_tick": round(ms_per_tick, 3),
+                "traced_kib": round((tracemalloc.get_traced_memory()[0] - held_bytes) / 1024, 1),
+                "blocks": sys.getallocatedblocks() - held_blocks,
+            }
+            sample.update(live_counts(sim, bitcoin, coins))
+            samples.append(sample)
+            if baseline is None and tick >= warmup_ticks:
+                # The baseline snapshot stays alive until the end; leave its own memory out of later samples
+                traced_before, blocks_before = tracemalloc.get_traced_memory()[0], sys.getallocatedblocks()
+                baseline = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+                held_bytes = tracemalloc.get_traced_memory()[0] - traced_before
+                held_blocks = sys.getallocatedblocks() - blocks_before
+                steady = len(samples) - 1  # Index of the first sample after the warm-up
+            interval_start = time.perf_counter()
+
+    sites = []
+    if baseline is not None and len(samples) > steady + 1:
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        for stat in snapshot.compare_to(baseline, "lineno")[:top]:
+            frame = stat.traceback[0]
+            sites.append({"site": f"{frame.filename}:{frame.lineno}",
+                          "size_diff_kib": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff})
+    if started_tracing:
+        tracemalloc.stop()
+
+    trended = samples[steady:]
+    hours_axis = [sample["game_minutes"] / 60 for sample in trended]
+    growth = {name: round(slope(hours_axis, [sample[name] for sample in trended]), 2)
+              for name in trended[0] if name not in ("game_minutes", "games", "ms_per_tick")} if trended else {}
+    return {
+        "game_hours": round(total_ticks / TICK_RATE / 3600, 3),
+        "ticks": total_ticks,
+        "games": games,
+        "best_score": best_score,
+        "samples": samples,
+        "growth_per_hour": growth,  # Least-squares trend of every sampled value, per hour of game time
+        "ms_per_tick_trend": round(slope(hours_axis, [sample["ms_per_tick"] for sample in trended]), 4),
+        "top_sites": sites,  # Lines whose traced memory changed most since the warm-up
+        "warmup_minutes": warmup_minutes,
+    }
+
+
+def format_report(report, max_growth_kib=None):
+    columns = ["game_minutes", "games", "ms_per_tick", "traced_kib", "blocks", "pipes", "coins", "particles",
+               "sprite_cache", "text_cache", "surfaces", "gc_objects"]
+    lines = [f"Soak: {report['game_hours']} h of game time, {report['ticks']} ticks, {report['games']} games "
+             f"(best score {report['best_score']})",
+             "".join(f"{name:>14}" for name in columns)]
+    for sample in report["samples"]:
+        lines.append("".join(f"{sample[name]:>14}" for name in columns))
+    growth = report["growth_per_hour"]
+    if growth:
+        lines.append(f"Growth per hour of game time after {report['warmup_minutes']} min of warm-up: " + ", ".join(
+            f"{name} {growth[name]:+}" for name in columns if name in growth))
+        lines.append(f"Time per tick trend: {report['ms_per_tick_trend']:+} ms per hour")
+    if report["top_sites"]:
+        lines.append("Top allocation changes since the warm-up:")
+        for site in report["top_sites"]:
+            lines.append(f"  {site['size_diff_kib']:>+10.1f} KiB {site['count_diff']:>+8} blocks  {site['site']}")
+    if max_growth_kib is not None and growth:
+        verdict = "flat" if is_flat(report, max_growth_kib) else "GROWING"
+        lines.append(f"Memory {verdict}: {growth['traced_kib']:+} KiB per hour (limit {max_growth_kib} KiB)")
+    return "\n".join(lines)
+
+
+def is_flat(report, max_growth_kib):
+    """True when traced memory grew by at most max_growth_kib per hour of game time."""
+    return report["growth_per_hour"].get("traced_kib", 0.0) <= max_growth_kib
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test Bitcoin Bird for memory growth")
+    parser.add_argument("--hours", type=float, default=1.0, help="hours of game time to play")
+    parser.add_argument("--sample-minutes", type=float, default=5.0, help="game minutes between samples")
+    parser.add_argument("--warmup-minutes", type=float, default=10.0,
+                        help="game minutes for the pools and caches to fill before growth is measured")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the scripted player and its courses")
+    parser.add_argument("--render-every", type=int, default=1, help="draw a frame every N ticks")
+    parser.add_argument("--mistake-rate", type=float, default=MISTAKE_RATE,
+                        help="chance per tick that the player gets it wrong; higher means shorter games")
+    parser.add_argument("--no-lighting", action="store_true", help="leave out the lighting overlay")
+    parser.add_argument("--top", type=int, default=10, help="allocation sites to list")
+    parser.add_argument("--max-growth", type=float, default=64.0, metavar="KIB",
+                        help="fail if traced memory grows by more than this many KiB per hour of game time")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    assets.load()
+    lighting_effect = None if args.no_lighting else LightingEffect()
+    Bitcoin.warm_sprite_cache()
+    font = load_custom_font(54)
+
+    report = run_soak(screen, font, args.hours, args.sample_minutes, args.seed, args.render_every,
+                      lighting_effect, args.mistake_rate, args.top,
+                      args.warmup_minutes)
+    pygame.quit()
+    print(format_report(report, args.max_growth))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 0 if is_flat(report, args.max_growth) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import pygame
+from simulation import LIFT, bird_angle
+
+
+ANGLE_STEP = 2  # Rotations are cached in steps of this many degrees
+BLUR_STRETCH = 1.1  # Motion blur copies are 10% wider than the sprite
+FADE_STEP = 8  # Faded copies are cached in steps of this much alpha
+
+# Every rotation the bird is prebuilt at. bird_angle never tilts a rising bird by more or less than
+# 30 degrees, so that is the only rising angle; falling angles run from -30 down to -90 in ANGLE_STEP steps.
+RISING_ANGLE = bird_angle(LIFT)
+BIRD_ANGLES = (RISING_ANGLE,) + tuple(range(-30, -90 - ANGLE_STEP, -ANGLE_STEP))
+
+
+class SpriteCache:
+    """Bounded LRU cache of rotated sprites, pre-scaled, pre-alpha'd motion blur frames and faded copies.
+
+    Entries are keyed by the source surface (one per bird pose in the asset registry), so the
+    bird draw path never calls pygame.transform once the cache is warm.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def quantize(angle):
+        return int(round(angle / ANGLE_STEP)) * ANGLE_STEP
+
+    def _get(self, key, build):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def rotated(self, image, angle):
+        """Return image rotated by angle, rounded to the nearest ANGLE_STEP degrees."""
+        angle = self.quantize(angle)
+        return self._get(("rotated", image, angle), lambda: pygame.transform.rotate(image, angle))
+
+    def blur_frame(self, image, alpha):
+        """Return the stretched, translucent copy of image used for one motion blur step."""
+        def build():
+            frame = pygame.transform.scale(image, (int(image.get_width() * BLUR_STRETCH), image.get_height()))
+            frame.set_alpha(alpha)
+            return frame
+        return self._get(("blur", image, alpha), build)
+
+    def faded(self, image, alpha):
+        """Return a copy of image with its alpha set, rounded to the nearest FADE_STEP.
+
+        Fading entities such as the floating coins share these instead of copying the image each frame.
+        """
+        alpha = min(255, int(round(alpha / FADE_STEP)) * FADE_STEP)
+
+        def build():
+            frame = image.copy()
+            frame.set_alpha(alpha)
+            return frame
+        return self._get(("faded", image, alpha), build)
+
+    def scaled(self, image, scale):
+        """Return image resized by scale, for drawing into a frame smaller than the logical resolution."""
+        def build():
+            size = (max(1, round(image.get_width() * scale)), max(1, round(image.get_height() * scale)))
+            if image.get_bitsize() in (24, 32):
+                frame = pygame.transform.smoothscale(image, size)
+            else:
+                frame = pygame.transform.scale(image, size)
+            if image.get_alpha() is not None and not image.get_flags() & pygame.SRCALPHA:
+                frame.set_alpha(image.get_alpha())  # Keep the surface alpha of blur frames and faded copies
+            return frame
+        return self._get(("scaled", image, scale), build)
+
+    def prebuild(self, images, angles, alphas):
+        """Warm the cache at load time so the first frames do not pay for the transforms."""
+        for image in images:
+            for angle in angles:
+                self.rotated(image, angle)
+            for alpha in alphas:
+                self.blur_frame(image, alpha)
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Shared cache used by every Bitcoin
+sprite_cache = SpriteCache()
@@ -0,0 +1,91 @@
+import threading
+import time
+from contextlib import contextmanager
+import pygame
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT
+
+
+class Startup:
+    """Times each phase of start-up, from launch to the first presented frame.
+
+    Phases on the main thread are timed with phase(name). Slow loading that needs no display runs on
+    a background thread via start_background(jobs) while the splash screen stays responsive, and each
+    job is reported as its own phase.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (name, seconds, ran in the background)
+        self.first_frame_time = None
+        self.lock = threading.Lock()
+        self.thread = None
+        self.error = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds, background=False):
+        with self.lock:
+            self.phases.append((name, seconds, background))
+
+    def start_background(self, jobs):
+        """Run each (name, function) of jobs in order on a daemon thread, timing each one."""
+        def run():
+            try:
+                for name, job in jobs:
+                    start = time.perf_counter()
+                    job()
+                    self.record(name, time.perf_counter() - start, background=True)
+            except Exception as error:  # Re-raised on the main thread by finish_background()
+                self.error = error
+
+        self.thread = threading.Thread(target=run, name="startup-loader", daemon=True)
+        self.thread.start()
+
+    def background_done(self):
+        return self.thread is None or not self.thread.is_alive()
+
+    def finish_background(self):
+        """Wait for the background jobs and re-raise the first error one of them hit."""
+        if self.thread is not None:
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def first_frame(self):
+        """Call once the first game frame has been presented."""
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - self.start
+
+    def report(self):
+        """Return {"phases": {name: ms}, "background": [names], "first_frame_ms": ms or None}."""
+        with self.lock:
+            phases = list(self.phases)
+        return {
+            "phases": {name: round(seconds * 1000, 2) for name, seconds, _ in phases},
+            "background": [name for name, _, background in phases if background],
+            "first_frame_ms": None if self.first_frame_time is None else round(self.first_frame_time * 1000, 2),
+        }
+
+    def format_report(self):
+        report = self.report()
+        lines = ["Startup:"]
+        for name, ms in report["phases"].items():
+            where = " (background)" if name in report["background"] else ""
+            lines.append(f"  {name:<16}{ms:>9.2f} ms{where}")
+        if report["first_frame_ms"] is not None:
+            lines.append(f"  {'first frame':<16}{report['first_frame_ms']:>9.2f} ms after launch")
+        return "\n".join(lines)
+
+
+def show_splash(screen, text="Loading..."):
+    """Draw a plain loading screen with the default font, which needs no assets from disk."""
+    screen.fill((0, 0, 0))
+    label = pygame.font.Font(None, 64).render(text, True, (255, 255, 255))
+    screen.blit(label, label.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+    pygame.display.flip()
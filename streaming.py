@@ -0,0 +1,217 @@
+"""Run games headless in their own processes and stream their frames to browsers.
+
+Each GameSession owns one game process, because pygame has a single display per process. The game
+hands every frame to a FrameSender, which scales it down and passes the raw pixels on through a
+bounded queue. Encoding to JPEG holds the GIL for several milliseconds, so it runs in a shared
+process pool instead, and neither the game's ticks nor the web server wait on it. Frames are dropped
+rather than queued whenever the next stage is busy: in the game process when the encoder falls
+behind, and in the session when a client reads slower than the game draws.
+"""
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from profiler import percentile
+
+
+STREAM_SIZE = (640, 360)  # Frames are sent at half the game resolution
+STREAM_FPS = 30
+RAW_QUEUE_SIZE = 2  # Raw frames waiting for the encoder, per game
+CLIENT_QUEUE_SIZE = 3  # Encoded frames waiting for the client, per session
+METRICS_WINDOW = 2.0  # Seconds over which the frame and byte rates are measured
+IDLE_TIMEOUT = 60.0  # Seconds without a streamed frame or an input after which a session is dropped
+
+
+class FrameSender:
+    """Frame callback for project.main: hands scaled raw frames to another process without blocking."""
+
+    def __init__(self, frame_queue, size=STREAM_SIZE):
+        self.frame_queue = frame_queue
+        self.size = size
+        self.frame_id = 0
+        self.dropped = 0  # Frames skipped because the encoder had not caught up
+
+    def __call__(self, screen):
+        import pygame
+        self.frame_id += 1
+        if self.frame_queue.full():
+            self.dropped += 1  # Skip the scaling work too
+            return
+        data = pygame.image.tobytes(pygame.transform.scale(screen, self.size), "RGB")
+        try:
+            self.frame_queue.put_nowait((self.frame_id, self.dropped, data))
+        except queue.Full:
+            self.dropped += 1
+
+
+def forward_input(input_queue):
+    """Turn "flap" and "quit" messages into pygame events once the game's display exists."""
+    import pygame
+    while True:
+        message = input_queue.get()
+        while not pygame.display.get_init() or pygame.display.get_surface() is None:
+            time.sleep(0.01)  # The game is still starting up
+        if message == "flap":
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        elif message == "quit":
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+
+
+def run_game(input_queue, frame_queue, size=STREAM_SIZE, fps=STREAM_FPS, options=None):
+    """Entry point of a game process: run project.main headless and stream its frames."""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    import project
+    frame_queue.cancel_join_thread()  # Exit without waiting for a reader that may already be gone
+    threading.Thread(target=forward_input, args=(input_queue,), daemon=True).start()
+    project.main(max_fps=fps, frame_callback=FrameSender(frame_queue, size), **(options or {}))
+
+
+def encode_frame(data, size, image_format="jpg"):
+    """Encode raw RGB pixels as a JPEG or PNG and return (bytes, milliseconds spent)."""
+    import pygame
+    start = time.perf_counter()
+    surface = pygame.image.frombytes(data, size, "RGB")
+    buffer = io.BytesIO()
+    pygame.image.save(surface, buffer, f"frame.{image_format}")
+    return buffer.getvalue(), (time.perf_counter() - start) * 1000
+
+
+class GameSession:
+    """One streamed game: its process, its bounded frame queues and its throughput metrics.
+
+    start() launches the game process, which takes a few hundred milliseconds with the spawn method.
+    """
+
+    def __init__(self, session_id, encoder, size=STREAM_SIZE, fps=STREAM_FPS, image_format="jpg", options=None):
+        self.id = session_id
+        self.encoder = encoder
+        self.size = size
+        self.image_format = image_format
+        context = multiprocessing.get_context("spawn")  # Never fork the web server's threads
+        self.input_queue = context.Queue()
+        self.raw_frames = context.Queue(maxsize=RAW_QUEUE_SIZE)
+        self.frames = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.process = context.Process(target=run_game, args=(self.input_queue, self.raw_frames, size, fps, options),
+                                       daemon=True)
+        self.running = True
+        self.started = time.time()
+        self.last_active = time.monotonic()  # When a frame was last streamed or an input received
+
+        # Throughput metrics
+        self.lock = threading.Lock()
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.dropped_in_game = 0  # Reported by the game's FrameSender
+        self.dropped_for_client = 0  # Encoded frames replaced by newer ones before the client read them
+        self.encode_ms = deque(maxlen=120)
+        self.sent = deque()  # (time, bytes) of frames sent within METRICS_WINDOW
+        self.inputs = 0
+        self.reader = threading.Thread(target=self._encode_frames, name=f"session-{session_id}", daemon=True)
+
+    def start(self):
+        self.last_active = time.monotonic()
+        self.process.start()
+        self.reader.start()
+
+    def is_abandoned(self, idle_timeout=IDLE_TIMEOUT):
+        """True once the game process has died, or nothing was streamed and no input came for idle_timeout seconds."""
+        if self.process.pid is not None and not self.process.is_alive():
+            return True
+        return time.monotonic() - self.last_active > idle_timeout
+
+    def _encode_frames(self):
+        while self.running:
+            try:
+                frame_id, dropped, data = self.raw_frames.get(timeout=0.5)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    self.running = False
+                continue
+            except (EOFError, OSError):
+                break
+            try:
+                image, encode_ms = self.encoder.submit(encode_frame, data, self.size, self.image_format).result()
+            except RuntimeError:
+                break  # The encoder pool was shut down
+            with self.lock:
+                self.frames_encoded += 1
+                self.dropped_in_game = dropped
+                self.encode_ms.append(encode_ms)
+            # Keep only the newest frames when the client falls behind
+            while True:
+                try:
+                    self.frames.put_nowait((frame_id, image))
+                    break
+                except queue.Full:
+                    try:
+                        self.frames.get_nowait()
+                        with self.lock:
+                            self.dropped_for_client += 1
+                    except queue.Empty:
+                        pass
+
+    def flap(self):
+        self.inputs += 1
+        self.last_active = time.monotonic()
+        self.input_queue.put("flap")
+
+    def next_frame(self, timeout=1.0):
+        """Return the next encoded frame, or None if none arrived within timeout."""
+        try:
+            return self.frames.get(timeout=timeout)[1]
+        except queue.Empty:
+            return None
+
+    def record_sent(self, size):
+        now = time.time()
+        self.last_active = time.monotonic()
+        with self.lock:
+            self.frames_sent += 1
+            self.bytes_sent += size
+            self.sent.append((now, size))
+            while self.sent and self.sent[0][0] < now - METRICS_WINDOW:
+                self.sent.popleft()
+
+    def metrics(self):
+        now = time.time()
+        with self.lock:
+            recent = [size for sent_at, size in self.sent if sent_at >= now - METRICS_WINDOW]
+            encode_ms = list(self.encode_ms)
+            return {
+                "uptime_s": round(now - self.started, 1),
+                "alive": self.process.is_alive(),
+                "frames_encoded": self.frames_encoded,
+                "frames_sent": self.frames_sent,
+                "bytes_sent": self.bytes_sent,
+                "dropped_in_game": self.dropped_in_game,
+                "dropped_for_client": self.dropped_for_client,
+                "fps": round(len(recent) / METRICS_WINDOW, 1),
+                "kbps": round(sum(recent) * 8 / 1000 / METRICS_WINDOW, 1),
+                "encode_ms_p50": round(percentile(encode_ms, 50), 2) if encode_ms else None,
+                "inputs": self.inputs,
+            }
+
+    def close(self, timeout=2.0):
+        """Ask the game to quit, and stop its process if it does not."""
+        if not self.running and not self.process.is_alive():
+            return
+        self.running = False
+        if self.process.pid is None:
+            return  # Never started
+        self.input_queue.put("quit")
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+def create_encoder(workers=None):
+    """Return the process pool shared by every session for frame encoding."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
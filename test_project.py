@@ -1,12 +1,58 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
 import unittest
+import weakref
+
+# The tests run headless, without a window or sound device
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
 import pygame
 from bitcoin import Bitcoin
 from pipe import Pipe
 from background import Background
 from floating_bitcoin import FloatingBitcoin
+import assets as assets_module
+from assets import assets, AssetRegistry
+from audio import SoundBank, CHANNELS
+from simulation import Simulation, BIRD_WIDTH, BIRD_HEIGHT, LIFT, GRAVITY, TICK_RATE, bird_angle
+from batch_simulation import BatchSimulation
+from course import Course, COURSE_CHUNK, SPEED_TABLE, speed_for_score, daily_seed
+from particles import ParticleSystem
+from sprite_cache import SpriteCache, sprite_cache, BIRD_ANGLES
+from utils import TextCache, display_score, prepare_score, text_cache
+from dirty_renderer import DirtyRenderer, ScaledSurface
+from quality import QualityGovernor, QualitySettings, TIERS, settings as quality_settings
+import lighting_effect
+from lighting_effect import LightingEffect
+from profiler import FrameProfiler, percentile
+from fixed_timestep import FixedTimestep
+from input_timing import InputTimer
+from pool import ObjectPool, EntityQueue
+from startup import Startup
+from streaming import FrameSender, encode_frame
+from server import create_app, FRAME_HEADER
+from leaderboard import Leaderboard
+import tournament
+import benchmark
+import soak
+from replay import Recorder, Recording, replay, verify
+from collision import PixelCollider
+from simulation import BirdState, PipeState, Snapshot, PIPE_GAP, PHASE_STEPS, POSES
 from project import *
+from resolution import SCREEN_WIDTH, SCREEN_HEIGHT, BIRD_ART_SIZE
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
 
 class TestBitcoin(unittest.TestCase):
     def setUp(self):
@@ -16,6 +62,39 @@ class TestBitcoin(unittest.TestCase):
     def tearDown(self):
         pygame.quit()
 
+    def test_history_keeps_the_last_four_positions(self):
+        for _ in range(10):
+            self.bitcoin.update()
+        self.assertEqual(len(self.bitcoin.history), 4)
+        self.assertEqual(self.bitcoin.history[-1][1], self.bitcoin.y)
+
+    def test_render_interpolates_with_blur_history(self):
+        class RecordingSurface(pygame.Surface):
+            def blit(self, source, dest, *args, **kwargs):
+                self.last_blit = (source, dest)
+                return super().blit(source, dest, *args, **kwargs)
+
+        screen = RecordingSurface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.bitcoin.history.extend([(50, 200, 0), (50, 250, 0), (50, 300, 0), (50, 340, 0)])
+        self.bitcoin.previous_y, self.bitcoin.y, self.bitcoin.velocity = 300, 340, 0
+        self.bitcoin.render(screen, alpha=0.25)
+        image, position = screen.last_blit  # The bird is drawn last, over its blur copies
+        expected = image.get_rect(center=(50 + self.bitcoin.image.get_width() // 2,
+                                          310 + self.bitcoin.image.get_height() // 2))
+        self.assertEqual(tuple(position), expected.topleft)
+
+    def test_reset_restarts_the_bird_without_new_particles(self):
+        particles = self.bitcoin.wind_particles
+        for _ in range(10):
+            self.bitcoin.jump()
+            self.bitcoin.update()
+        self.bitcoin.reset()
+        self.assertEqual(self.bitcoin.y, SCREEN_HEIGHT // 2)
+        self.assertEqual(self.bitcoin.velocity, 0)
+        self.assertEqual(len(self.bitcoin.history), 0)
+        self.assertIs(self.bitcoin.wind_particles, particles)
+        self.assertEqual(len(particles), 0)
+
 class TestPipe(unittest.TestCase):
     def setUp(self):
         pygame.init()
@@ -50,6 +129,1208 @@ class TestFloatingBitcoin(unittest.TestCase):
     def tearDown(self):
         pygame.quit()
 
+    def test_fade_follows_ticks(self):
+        for _ in range(TICK_RATE // 2):
+            self.floating_bitcoin.update()
+        self.assertEqual(self.floating_bitcoin.alpha, 128)
+        for _ in range(TICK_RATE // 2):
+            self.floating_bitcoin.update()
+        self.assertTrue(self.floating_bitcoin.is_expired())
+
+
+class TestAssetRegistry(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_entities_share_surfaces(self):
+        # Every spawn should reuse the registry surfaces instead of loading new ones
+        first, second = Pipe(speed=3), Pipe(speed=3)
+        self.assertIs(first.scaled_top_image, second.scaled_top_image)
+        self.assertIs(FloatingBitcoin(0, 0).image, assets.get("bitcoin"))
+
+    def test_report_includes_load_time_and_memory(self):
+        assets.get("background")
+        report = assets.report()
+        self.assertGreater(report["sprites"], 0)
+        self.assertGreater(report["memory_bytes"], 0)
+        self.assertGreaterEqual(report["load_time_ms"], 0)
+
+    def test_scaled_sprites_are_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            original_cache_dir = assets_module.CACHE_DIR
+            assets_module.CACHE_DIR = cache_dir
+            try:
+                cold, warm = AssetRegistry(), AssetRegistry()
+                cold.decode()
+                self.assertEqual(len(os.listdir(cache_dir)), len(cold.images))
+                warm.decode()
+            finally:
+                assets_module.CACHE_DIR = original_cache_dir
+        for name, image in cold.images.items():
+            self.assertEqual(pygame.image.tobytes(image, "RGBA"), pygame.image.tobytes(warm.images[name], "RGBA"))
+
+    def test_stale_cached_sprites_are_removed(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            original_cache_dir = assets_module.CACHE_DIR
+            assets_module.CACHE_DIR = cache_dir
+            try:
+                stale = os.path.join(cache_dir, "sprite_bitcoin_000000000000.rgba")
+                other = os.path.join(cache_dir, "sprite_bitcoin_glow_000000000000.rgba")
+                for path in (stale, other):
+                    with open(path, "wb") as file:
+                        file.write(b"old")
+                registry = AssetRegistry()
+                registry.decode()
+                self.assertFalse(os.path.exists(stale))
+                self.assertTrue(os.path.exists(other))  # Another sprite's entry is kept
+                self.assertEqual(len(os.listdir(cache_dir)), len(registry.images) + 1)
+            finally:
+                assets_module.CACHE_DIR = original_cache_dir
+
+    def test_decode_then_convert(self):
+        registry = AssetRegistry(use_cache=False)
+        registry.decode()
+        self.assertFalse(registry.converted)
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        registry.convert()
+        self.assertTrue(registry.converted)
+        self.assertEqual(registry.get("bird_neutral").get_size(), (BIRD_WIDTH, BIRD_HEIGHT))
+
+
+class TestSoundBank(unittest.TestCase):
+    def setUp(self):
+        try:
+            pygame.mixer.init()
+        except pygame.error as error:
+            self.skipTest(f"No audio device: {error}")
+
+    def tearDown(self):
+        pygame.mixer.quit()
+
+    def test_missing_mixer_leaves_sounds_silent(self):
+        pygame.mixer.quit()
+        bank = SoundBank()
+        bank.play("flap")  # Must not raise
+        self.assertIsNone(bank.sound("flap"))
+
+    def test_sounds_load_once_the_mixer_is_up(self):
+        pygame.mixer.quit()
+        bank = SoundBank()
+        bank.load_sounds()
+        self.assertIsNone(bank.sound("flap"))
+        self.assertFalse(bank.loaded)
+        pygame.mixer.init()
+        self.assertIsNotNone(bank.sound("flap"))
+        self.assertEqual(set(bank.voices), set(CHANNELS))
+
+    def test_spamming_a_sound_only_reuses_its_own_channels(self):
+        bank = SoundBank()
+        bank.play("bitconnect", loops=-1)
+        music = bank.voices["music"][0]
+        for _ in range(CHANNELS["flap"] + 5):
+            bank.play("flap", pressed_at=time.perf_counter())
+        self.assertIs(music.get_sound(), bank.sound("bitconnect"))
+        self.assertTrue(all(channel.get_sound() is bank.sound("flap") for channel in bank.voices["flap"]))
+        self.assertEqual(bank.skipped, 5)  # Left out rather than cutting off a flap that is still playing
+        self.assertEqual(bank.plays, 1 + CHANNELS["flap"])
+        self.assertIsNone(bank.voices["score"][0].get_sound())
+        bank.stop()
+
+    def test_channels_are_reserved_again_after_a_mixer_restart(self):
+        bank = SoundBank()
+        bank.play("flap")
+        pygame.mixer.quit()
+        pygame.mixer.init()  # Back to the default number of channels, fewer than the bank reserved
+        bank.play("flap")
+        self.assertGreaterEqual(pygame.mixer.get_num_channels(), sum(CHANNELS.values()))
+        self.assertEqual(bank.plays, 2)
+        bank.stop()
+
+    def test_latency_report(self):
+        bank = SoundBank(buffer=512)
+        bank.play("flap", pressed_at=time.perf_counter() - 0.01)
+        report = bank.latency_report()
+        self.assertGreaterEqual(report["dispatch_ms_max"], 10)
+        self.assertAlmostEqual(report["latency_ms_p50"] - report["dispatch_ms_p50"], report["buffer_ms"], places=1)
+        bank.stop()
+
+
+class TestStartup(unittest.TestCase):
+    def test_importing_the_game_has_no_side_effects(self):
+        code = "import pygame, project; print(pygame.get_init(), pygame.mixer.get_init())"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        self.assertEqual(output.split()[-2:], ["False", "None"])
+
+    def test_phases_are_timed_on_both_threads(self):
+        startup = Startup()
+        with startup.phase("main"):
+            pass
+        startup.start_background([("load", lambda: None)])
+        startup.finish_background()
+        startup.first_frame()
+        report = startup.report()
+        self.assertEqual(set(report["phases"]), {"main", "load"})
+        self.assertEqual(report["background"], ["load"])
+        self.assertIsNotNone(report["first_frame_ms"])
+        self.assertIn("load", startup.format_report())
+
+    def test_background_errors_reach_the_main_thread(self):
+        startup = Startup()
+        startup.start_background([("broken", lambda: 1 / 0)])
+        with self.assertRaises(ZeroDivisionError):
+            startup.finish_background()
+
+
+class TestSimulation(unittest.TestCase):
+    def test_bird_size_matches_sprites(self):
+        pygame.init()
+        self.assertEqual(assets.get("bird_neutral").get_size(), (BIRD_WIDTH, BIRD_HEIGHT))
+        self.assertEqual(pygame.image.load("static/bird_rising.png").get_size(), BIRD_ART_SIZE)
+        self.assertEqual(assets.get("top_pipe").get_width(), Simulation().pipes[0].width)
+        pygame.quit()
+
+    def test_same_seed_gives_same_course(self):
+        first, second = Simulation(seed=7), Simulation(seed=7)
+        for tick in range(600):
+            first.step(tick % 12 == 0)
+            second.step(tick % 12 == 0)
+        self.assertEqual([p.top_height for p in first.pipes], [p.top_height for p in second.pipes])
+        self.assertEqual(first.score, second.score)
+
+    def test_flap_applies_lift_then_gravity(self):
+        sim = Simulation(seed=1)
+        sim.step(flap=True)
+        self.assertAlmostEqual(sim.bird.velocity, LIFT + GRAVITY)
+        self.assertEqual(sim.bird.pose, "rising")
+
+    def test_falling_bird_ends_the_game(self):
+        sim = Simulation(seed=1)
+        sim.play(lambda s: False, max_ticks=1000)
+        self.assertTrue(sim.game_over)
+        self.assertEqual(sim.score, 0)
+
+    def test_pipe_rects_match_pipe_entity(self):
+        pygame.init()
+        sim = Simulation(seed=3)
+        pipe = Pipe(speed=3)
+        pipe.top_height = sim.pipes[0].top_height
+        pipe.bottom_height = sim.pipes[0].bottom_height
+        self.assertEqual([tuple(r) for r in pipe.get_rects()], list(sim.pipes[0].get_rects()))
+        pygame.quit()
+
+    def test_restored_snapshot_plays_out_tick_for_tick(self):
+        sim = Simulation(seed=5)
+        for _ in range(400):
+            sim.step(tournament.follow_gap(sim))
+        snapshot = sim.snapshot()
+        hashes = []
+        for _ in range(600):
+            sim.step(tournament.follow_gap(sim))
+            hashes.append(sim.state_hash())
+        for other in (sim, Simulation(seed=9)):  # Rewound, or taken over by another simulation
+            other.restore(snapshot)
+            replayed = []
+            for _ in range(600):
+                other.step(tournament.follow_gap(other))
+                replayed.append(other.state_hash())
+            self.assertEqual(replayed, hashes)
+
+    def test_snapshot_bytes_round_trip(self):
+        sim = Simulation(seed=2)
+        for tick in range(300):
+            sim.step(tick % 11 == 0)
+        data = sim.snapshot().to_bytes()
+        copy = Simulation(seed=0)
+        copy.restore(Snapshot.from_bytes(data))
+        self.assertEqual(copy.state_hash(), sim.state_hash())
+        self.assertEqual(copy.seed, 2)
+        self.assertEqual(copy.bird.pose, sim.bird.pose)
+        self.assertEqual(copy.bird.last_jump_tick, sim.bird.last_jump_tick)
+        with self.assertRaises(ValueError):
+            Snapshot.from_bytes(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            Snapshot.from_bytes(data[:-1])
+
+    def test_restore_regenerates_released_course(self):
+        sim = Simulation(seed=4)
+        sim.course.chunk_size = 1  # Release every pipe as soon as the next one spawns
+        snapshot = sim.snapshot()
+        for _ in range(400):
+            sim.step(tournament.follow_gap(sim))
+        self.assertGreater(sim.course.start, 0)
+        sim.restore(snapshot)
+        fresh = Simulation(seed=4)
+        for _ in range(400):
+            sim.step(tournament.follow_gap(sim))
+            fresh.step(tournament.follow_gap(fresh))
+        self.assertEqual(sim.state_hash(), fresh.state_hash())
+
+
+class TestBatchSimulation(unittest.TestCase):
+    @staticmethod
+    def controller(batch):
+        # Flap when falling below the middle of the next gap, with a different offset per bird
+        _, top, _ = batch.next_pipes()
+        return (batch.y > top + 80 + 5 * (np.arange(batch.n) % 4)) & (batch.velocity >= 0)
+
+    def assert_matches_scalar(self, batch, sims):
+        for _ in range(1500):
+            flaps = self.controller(batch)
+            batch.step(flaps)
+            for i, sim in enumerate(sims):
+                sim.step(flaps[i])
+                self.assertEqual(sim.bird.y, batch.y[i])
+                self.assertEqual(sim.score, batch.score[i])
+                self.assertEqual(sim.game_over, batch.done[i])
+        self.assertGreater(batch.score.max(), 0)
+
+    def test_shared_course_matches_scalar(self):
+        self.assert_matches_scalar(BatchSimulation(8, seed=11), [Simulation(seed=11) for _ in range(8)])
+
+    def test_separate_courses_match_scalar(self):
+        seeds = list(range(8))
+        self.assert_matches_scalar(BatchSimulation(8, seeds=seeds), [Simulation(seed=s) for s in seeds])
+
+    def test_pixel_collision_matches_scalar(self):
+        pygame.init()
+        self.addCleanup(pygame.quit)
+        seeds = list(range(8))
+        batch = BatchSimulation(8, seeds=seeds, pixel_collision=True)
+        sims = [Simulation(seed=s, pixel_collision=True) for s in seeds]
+        self.assert_matches_scalar(batch, sims)
+        self.assertEqual([sim.bird.pose for sim in sims], [POSES[pose] for pose in batch.pose])
+        # The masks end games on other ticks than the boxes do
+        boxes = BatchSimulation(8, seeds=seeds)
+        boxes.run(self.controller, max_ticks=1500)
+        self.assertNotEqual(boxes.ticks.tolist(), batch.ticks.tolist())
+
+    def test_done_birds_stop_moving(self):
+        batch = BatchSimulation(4, seed=1)
+        batch.run(lambda b: [True, False, False, False], max_ticks=200)
+        self.assertTrue(batch.done.all())
+        frozen = batch.y.copy()
+        batch.step(True)
+        self.assertTrue((batch.y == frozen).all())
+
+
+class TestCourse(unittest.TestCase):
+    def test_gaps_are_reproducible_and_in_range(self):
+        first, second = Course(21), Course(21)
+        gaps = first.lookahead(0, 500)
+        self.assertEqual(gaps, [second.gap(i) for i in range(500)])
+        self.assertTrue(all(50 <= gap <= 720 - PIPE_GAP - 50 for gap in gaps))
+        first.reset()
+        self.assertEqual(first.gap(499), gaps[499])
+
+    def test_released_gaps_free_memory(self):
+        course = Course(3)
+        for index in range(10000):
+            course.gap(index)
+            course.release(index + 1)
+        self.assertLessEqual(len(course.gaps), 2 * COURSE_CHUNK)
+        with self.assertRaises(IndexError):
+            course.gap(0)
+
+    def test_simulation_follows_the_course(self):
+        sim = Simulation(seed=9)
+        self.assertEqual(sim.upcoming_gaps(3), Course(9).lookahead(1, 3))
+        sim.play(tournament.follow_gap, max_ticks=600)
+        live = [pipe.top_height for pipe in sim.pipes]
+        self.assertEqual(live, Course(9).lookahead(sim.pipes_spawned - len(live), len(live)))
+
+    def test_speed_table(self):
+        self.assertEqual(speed_for_score(14), SPEED_TABLE[0])
+        self.assertEqual(speed_for_score(15), 3 * 1.4)
+        self.assertEqual(speed_for_score(10 ** 6), SPEED_TABLE[-1])
+
+    def test_daily_seed(self):
+        today = datetime.date(2024, 5, 1)
+        self.assertEqual(daily_seed(today), daily_seed(today))
+        self.assertNotEqual(daily_seed(today), daily_seed(datetime.date(2024, 5, 2)))
+
+    def test_batch_keeps_only_the_live_stretch_of_course(self):
+        batch = BatchSimulation(2, seed=5)
+        batch.pipes_spawned[:] = [300, 400]
+        batch._extend_course(401)
+        self.assertEqual(batch.course_start, 300)  # The gaps of pipes both birds have passed are gone
+        self.assertEqual(batch.course[0, 400 - batch.course_start], Course(5).gap(400))
+
+
+class TestParticleSystem(unittest.TestCase):
+    def test_capacity_bounds_particle_count(self):
+        particles = ParticleSystem(capacity=16, max_emit_per_tick=4, seed=0)
+        for _ in range(100):
+            for _ in range(10):
+                particles.emit(100, 100)
+            particles.update(speed_factor=-8)
+        self.assertLessEqual(len(particles), 16)
+        self.assertGreater(particles.dropped, 0)
+
+    def test_particles_shrink_and_are_culled(self):
+        particles = ParticleSystem(seed=0)
+        particles.emit(100, 100)
+        for _ in range(200):  # Longer than the maximum lifetime plus the shrink time
+            particles.update()
+        self.assertEqual(len(particles), 0)
+
+    def test_render_draws_on_screen(self):
+        pygame.init()
+        screen = pygame.Surface((200, 200))
+        particles = ParticleSystem(seed=0)
+        particles.emit(100, 100)
+        particles.render(screen)
+        self.assertTrue(pygame.surfarray.array3d(screen).any())
+        pygame.quit()
+
+
+class TestSpriteCache(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_rotations_are_quantized_and_reused(self):
+        cache = SpriteCache()
+        image = assets.get("bird_neutral")
+        self.assertIs(cache.rotated(image, 30.4), cache.rotated(image, 29.8))
+        self.assertEqual(cache.misses, 1)
+
+    def test_cache_is_bounded(self):
+        cache = SpriteCache(max_entries=4)
+        image = assets.get("bird_neutral")
+        for angle in range(0, 40, 2):
+            cache.rotated(image, angle)
+        self.assertEqual(len(cache.entries), 4)
+
+    def test_warm_cache_covers_bird_render(self):
+        Bitcoin.warm_sprite_cache()
+        bitcoin = Bitcoin()
+        screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        misses = sprite_cache.misses
+        for tick in range(20):
+            if tick % 6 == 0:
+                bitcoin.jump()
+            bitcoin.update()
+            bitcoin.render(screen)
+        self.assertEqual(sprite_cache.misses, misses)
+
+    def test_prebuilt_angles_cover_every_velocity(self):
+        self.assertEqual(BIRD_ANGLES[0], 30)  # The only rising angle
+        self.assertEqual(BIRD_ANGLES[1:], tuple(range(-30, -92, -2)))
+        for velocity in range(-20, 31):
+            self.assertIn(SpriteCache.quantize(bird_angle(velocity / 2)), BIRD_ANGLES)
+
+    def test_warm_cache_covers_a_full_fall(self):
+        Bitcoin.warm_sprite_cache()
+        bitcoin = Bitcoin()
+        bitcoin.y = 0
+        screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        misses = sprite_cache.misses
+        bitcoin.jump()
+        while bitcoin.y < SCREEN_HEIGHT:
+            bitcoin.update()
+            bitcoin.render(screen)
+        self.assertEqual(sprite_cache.misses, misses)
+
+
+class TestTextCache(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+        self.font = pygame.font.Font(None, 54)
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_glow_is_baked_once_per_string(self):
+        cache = TextCache()
+        first = cache.glowing(self.font, "Wallet: 1.00 BTC", (0, 0, 0), (255, 255, 255), 5)
+        second = cache.glowing(self.font, "Wallet: 1.00 BTC", (0, 0, 0), (255, 255, 255), 5)
+        self.assertIs(first, second)
+        text_width = self.font.size("Wallet: 1.00 BTC")[0]
+        self.assertEqual(first.get_width(), text_width + 10)
+
+    def test_glow_is_drawn_around_the_text(self):
+        surface = TextCache().glowing(self.font, "1", (0, 0, 0), (255, 255, 255), 5)
+        # Left of the text, where only the glow reaches
+        alphas = [surface.get_at((x, y)).a for x in range(5) for y in range(surface.get_height())]
+        self.assertGreater(max(alphas), 0)
+
+    def test_animation_scales_are_quantized(self):
+        cache = TextCache()
+        cache.prerender_scales(self.font, "Wallet: 2.00 BTC", (255, 255, 255), 1.3)
+        entries = len(cache.entries)
+        cache.scaled(self.font, "Wallet: 2.00 BTC", (255, 255, 255), 1.2345)
+        self.assertEqual(len(cache.entries), entries)
+
+    def test_score_frames_are_built_over_later_frames(self):
+        text_cache.clear()
+        prepare_score(self.font, 7)
+        self.assertEqual(len([key for key in text_cache.entries if key[0] == "scaled"]), 1)
+        queued = len(text_cache.pending)
+        for _ in range(queued):
+            text_cache.build_pending()
+        self.assertFalse(text_cache.pending)
+        self.assertTrue(any(key[0] == "glow" for key in text_cache.entries))
+        entries = len(text_cache.entries)
+        display_score(pygame.Surface((SCREEN_WIDTH, 100)), 7, self.font, 1.15)
+        self.assertEqual(len(text_cache.entries), entries)  # Every animation frame was already built
+        text_cache.clear()
+
+    def test_cache_is_bounded(self):
+        cache = TextCache(max_entries=8)
+        for score in range(20):
+            cache.render(self.font, str(score), (255, 255, 255))
+        self.assertEqual(len(cache.entries), 8)
+
+
+class TestDirtyRenderer(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.background = Background(speed=3)
+
+    def tearDown(self):
+        pygame.quit()
+
+    def test_dirty_mode_tracks_entity_rects(self):
+        renderer = DirtyRenderer(self.screen, self.background, mode="dirty")
+        renderer.begin_frame()
+        renderer.present()  # The first frame is always a full redraw
+        renderer.begin_frame()
+        pipe = Pipe(speed=3)
+        pipe.x = 600
+        renderer.add(pipe.render(self.screen))
+        renderer.add(None)
+        self.assertEqual(len(renderer.current_rects), 2)
+        self.assertLess(renderer.dirty_area(), SCREEN_WIDTH * SCREEN_HEIGHT)
+        renderer.present()
+        self.assertEqual(len(renderer.previous_rects), 2)
+
+    def test_dirty_mode_restores_stale_areas(self):
+        renderer = DirtyRenderer(self.screen, self.background, mode="dirty")
+        renderer.begin_frame()
+        renderer.present()
+        clean = self.screen.copy()
+        renderer.begin_frame()
+        renderer.add(FloatingBitcoin(100, 200).render(self.screen))
+        renderer.present()
+        renderer.begin_frame()  # Nothing drawn this frame, so the coin must be erased
+        self.assertEqual(pygame.image.tobytes(self.screen, "RGB"), pygame.image.tobytes(clean, "RGB"))
+
+    def test_dirty_mode_scrolls_the_background_by_ticks(self):
+        renderer = DirtyRenderer(self.screen, self.background, mode="dirty")
+        for tick in range(12):
+            self.background.update(5, 0)  # 6 pixels per tick
+            for frame in range(4):  # Frames without a tick never redraw the backdrop
+                renderer.begin_frame()
+                self.assertTrue(frame == 0 or not renderer.needs_full_redraw)
+                renderer.present()
+        self.assertEqual(renderer.full_redraws, 6)  # Once every SCROLL_STEP (8) pixels, on whole ticks
+
+    def test_invalid_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            DirtyRenderer(self.screen, self.background, mode="partial")
+
+
+class TestQuality(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    def tearDown(self):
+        quality_settings.apply(TIERS[0])
+        pygame.quit()
+
+    def test_governor_steps_down_then_back_up_with_hysteresis(self):
+        governor = QualityGovernor(budget_ms=10, window=10, upgrade_windows=2)
+        for _ in range(9):
+            self.assertFalse(governor.record(15))
+        self.assertTrue(governor.record(15))
+        self.assertEqual(governor.tier, 1)  # One slow window costs a tier straight away
+        for _ in range(30):
+            governor.record(8)  # Under budget but not by enough to risk the tier above
+        self.assertEqual(governor.tier, 1)
+        for window in range(4):
+            for _ in range(10):
+                governor.record(2)
+            # Tier 0 was left for being slow once, so it takes twice the 2 good windows to return
+            self.assertEqual(governor.tier, 0 if window == 3 else 1)
+        for _ in range(100):
+            governor.record(100)
+        self.assertEqual(governor.settings, TIERS[-1])
+        self.assertEqual([name for _, name, _ in governor.changes][:2], ["medium", "high"])
+
+    def test_scaled_surface_takes_logical_coordinates(self):
+        internal = pygame.Surface((SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+        target = ScaledSurface(internal, 0.5)
+        sprite = pygame.Surface((40, 20))
+        sprite.fill((255, 0, 0))
+        self.assertEqual(target.blit(sprite, (100, 60)), pygame.Rect(100, 60, 40, 20))
+        self.assertEqual(internal.get_at((50, 30))[:3], (255, 0, 0))
+        self.assertEqual(internal.get_at((70, 40))[:3], (0, 0, 0))
+        self.assertEqual(target.get_size(), (SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    def test_low_resolution_frames_are_scaled_up_once(self):
+        renderer = DirtyRenderer(self.screen, Background(speed=3))
+        renderer.apply_quality(QualitySettings(TIERS[-1]))
+        self.assertIsInstance(renderer.target, ScaledSurface)
+        renderer.begin_frame()
+        renderer.target.fill((0, 255, 0), pygame.Rect(600, 300, 80, 80))
+        renderer.present()
+        self.assertEqual(self.screen.get_at((640, 340))[:3], (0, 255, 0))
+        renderer.apply_quality(QualitySettings(TIERS[0]))
+        self.assertIs(renderer.target, self.screen)
+
+        dirty = DirtyRenderer(self.screen, Background(speed=3), mode="dirty")
+        dirty.apply_quality(QualitySettings(TIERS[-1]))
+        self.assertIs(dirty.target, self.screen)  # Dirty rectangles are always drawn at full size
+
+    def test_lower_tiers_cut_effects(self):
+        font = load_custom_font(54)
+        glowing = display_score(self.screen, 12, font)
+        bitcoin = Bitcoin(seed=1)
+        for _ in range(40):
+            bitcoin.update()
+        full_particles = len(bitcoin.wind_particles)
+
+        quality_settings.apply(TIERS[-1])
+        self.assertLess(display_score(self.screen, 12, font).width, glowing.width)
+        bitcoin = Bitcoin(seed=1)
+        for _ in range(40):
+            bitcoin.update()
+        self.assertLess(len(bitcoin.wind_particles), full_particles)
+        coin = FloatingBitcoin(100, 100)
+        coin.alpha = 100
+        coin.render(self.screen)
+        self.assertNotIn(("faded", coin.image, 96), sprite_cache.entries)
+
+
+class TestLightingEffect(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.original_cache_dir = lighting_effect.CACHE_DIR
+        lighting_effect.CACHE_DIR = self.cache_dir.name
+
+    def tearDown(self):
+        lighting_effect.CACHE_DIR = self.original_cache_dir
+        self.cache_dir.cleanup()
+        pygame.quit()
+
+    def test_gradient_darkens_towards_the_edges(self):
+        lighting = LightingEffect(size=(320, 180))
+        self.assertEqual(lighting.gradient.shape, (40, 22))  # A low-resolution lightmap
+        self.assertEqual(lighting.gradient[20, 11], 0)
+        self.assertGreater(lighting.gradient[0, 0], 220)  # Sampled at the corner pixel's center
+        screen = pygame.Surface((320, 180))
+        screen.fill((200, 200, 200))
+        lighting.render(screen)
+        self.assertEqual(tuple(screen.get_at((160, 90)))[:3], (200, 200, 200))  # The center stays lit
+        self.assertLess(screen.get_at((0, 0)).r, 120)
+
+    def test_lightmap_is_scaled_once_per_size(self):
+        lighting = LightingEffect(size=(320, 180))
+        half = pygame.Surface((160, 90))
+        lighting.render(half)
+        frames = lighting.scaled_frames[(160, 90)]
+        self.assertEqual(frames[0].get_size(), (160, 90))
+        lighting.render(half)
+        self.assertIs(lighting.scaled_frames[(160, 90)], frames)
+
+    def test_gradient_is_cached_on_disk(self):
+        lighting = LightingEffect(size=(320, 180))
+        self.assertTrue(os.path.exists(lighting.cache_path()))
+        cached = LightingEffect(size=(320, 180))
+        self.assertTrue((cached.gradient == lighting.gradient).all())
+        self.assertNotEqual(LightingEffect(size=(320, 180), inner_radius=0.5).cache_path(), lighting.cache_path())
+
+    def test_flicker_uses_precomputed_frames(self):
+        lighting = LightingEffect(size=(320, 180), flicker_levels=3)
+        self.assertEqual(len(lighting.frames), 3)
+        for _ in range(20):
+            lighting.update()
+            self.assertIn(lighting.flicker_intensity, (-10, 0, 10))
+        lighting.render(pygame.Surface((320, 180)))
+
+
+class TestFrameProfiler(unittest.TestCase):
+    def run_frames(self, profiler, frames=50):
+        sim = Simulation(seed=1)
+        sim.profiler = profiler
+        for tick in range(frames):
+            profiler.begin_frame()
+            sim.step(tick % 10 == 0)
+            profiler.mark("render")
+            profiler.count("pipe_count", len(sim.pipes))
+            profiler.end_frame()
+
+    def test_stages_and_percentiles(self):
+        profiler = FrameProfiler(window=20)
+        self.run_frames(profiler)
+        self.assertEqual(profiler.stages, ["bird", "pipes", "collision", "render", "total"])
+        self.assertEqual(len(profiler.samples["bird"]), 20)
+        p50, p95, p99 = profiler.percentiles("total")
+        self.assertLessEqual(p50, p95)
+        self.assertLessEqual(p95, p99)
+
+    def test_percentile_is_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual([percentile(values, q) for q in (0, 50, 95, 100)], [1, 3, 5, 5])
+        with self.assertRaises(ValueError):
+            percentile([], 50)
+
+    def test_skipped_stages_record_zero(self):
+        profiler = FrameProfiler()
+        self.run_frames(profiler, frames=3)
+        profiler.begin_frame()
+        profiler.skip("bird", "pipes")
+        profiler.mark("render")
+        profiler.end_frame()
+        self.assertEqual(len(profiler.samples["bird"]), 4)
+        self.assertEqual(profiler.samples["bird"][-1], 0.0)
+        self.assertEqual(len(profiler.samples["collision"]), 3)
+
+    def test_export_csv_and_json(self):
+        profiler = FrameProfiler(trace=True)
+        self.run_frames(profiler, frames=10)
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "trace.csv")
+            profiler.export(csv_path)
+            with open(csv_path) as file:
+                lines = file.read().splitlines()
+            self.assertEqual(lines[0], "frame,bird,pipes,collision,render,total,pipe_count")
+            self.assertEqual(len(lines), 11)
+
+            json_path = os.path.join(directory, "trace.json")
+            profiler.export(json_path)
+            with open(json_path) as file:
+                data = json.load(file)
+            self.assertEqual(len(data["frames"]), 10)
+            self.assertIn("p99", data["summary"]["total"])
+
+    def test_overlay_only_draws_when_visible(self):
+        pygame.init()
+        profiler = FrameProfiler()
+        self.run_frames(profiler, frames=5)
+        screen = pygame.Surface((400, 300))
+        font = pygame.font.Font(None, 18)
+        self.assertIsNone(profiler.render_overlay(screen, font))
+        profiler.toggle_overlay()
+        self.assertIsInstance(profiler.render_overlay(screen, font), pygame.Rect)
+        pygame.quit()
+
+
+class TestFixedTimestep(unittest.TestCase):
+    def test_high_refresh_frames_share_ticks(self):
+        timestep = FixedTimestep(tick_rate=30)
+        timestep.advance(0.0)
+        ticks = [timestep.advance(frame / 120) for frame in range(1, 121)]
+        self.assertEqual(sum(ticks), 30)  # One second of frames is one second of game time
+        self.assertLessEqual(max(ticks), 1)
+        self.assertTrue(0.0 <= timestep.alpha < 1.0)
+
+    def test_alpha_is_the_leftover_fraction_of_a_tick(self):
+        timestep = FixedTimestep(tick_rate=10)
+        timestep.advance(0.0)
+        self.assertEqual(timestep.advance(0.25), 2)
+        self.assertAlmostEqual(timestep.alpha, 0.5)
+
+    def test_slow_frames_are_capped(self):
+        timestep = FixedTimestep(tick_rate=30, max_ticks_per_frame=5, max_frame_time=0.25)
+        timestep.advance(0.0)
+        self.assertEqual(timestep.advance(3.0), 5)
+        self.assertGreater(timestep.dropped_time, 2.5)
+        timestep.reset()
+        self.assertEqual(timestep.advance(10.0), 0)  # The first frame after a reset only starts the clock
+
+    def test_tick_times_are_contiguous_across_frames(self):
+        timestep = FixedTimestep(tick_rate=10)
+        timestep.advance(1.0)
+        ticks = timestep.advance(1.25)
+        self.assertAlmostEqual(timestep.tick_time(0), 1.0)
+        end = timestep.tick_time(ticks)
+        timestep.advance(1.31)
+        self.assertAlmostEqual(timestep.tick_time(0), end)
+
+    def test_rendering_interpolates_between_ticks(self):
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pipe = Pipe(speed=4)
+        pipe.x = 600
+        previous, _ = pipe.render(screen, alpha=0.0)
+        current, _ = pipe.render(screen, alpha=1.0)
+        halfway, _ = pipe.render(screen, alpha=0.5)
+        self.assertEqual((previous.x, halfway.x, current.x), (604, 602, 600))
+
+        bitcoin = Bitcoin()
+        bitcoin.update()
+        self.assertGreater(bitcoin.y, bitcoin.previous_y)
+        pygame.quit()
+
+
+class TestInputTimer(unittest.TestCase):
+    def test_flaps_land_on_their_tick_and_phase(self):
+        inputs = InputTimer()
+        inputs.flaps.extend([0.95, 1.025, 1.03, 1.275])
+        self.assertEqual(inputs.flap_for_tick(1.0, 0.1), (True, 0))  # Already simulated: as soon as possible
+        self.assertEqual(list(inputs.flaps), [1.275])
+        self.assertEqual(inputs.merged, 2)
+        self.assertEqual(inputs.flap_for_tick(1.1, 0.1), (False, 0))
+        flap, phase = inputs.flap_for_tick(1.2, 0.1)
+        self.assertTrue(flap)
+        self.assertIn(phase, (3 * PHASE_STEPS // 4 - 1, 3 * PHASE_STEPS // 4))
+        inputs.presented(now=1.3)
+        self.assertEqual(len(inputs.latency["present"]), 4)
+        self.assertAlmostEqual(max(inputs.latency["present"]), 350)
+
+    def test_polled_presses_are_stamped(self):
+        pygame.init()
+        pygame.display.set_mode((100, 100))
+        before = time.perf_counter()
+        inputs = InputTimer()
+        seen = []
+        inputs.on_flap = seen.append
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        events = [(event, stamp) for event, stamp in inputs.take_events() if event.type == pygame.KEYDOWN]
+        self.assertEqual(len(events), 1)
+        self.assertLessEqual(inputs.last_poll - events[0][1], inputs.last_poll - before)
+        self.assertEqual(seen, [events[0][1]])
+        self.assertEqual(list(inputs.flaps), seen)
+        self.assertIn("poll", inputs.report())
+        pygame.quit()
+
+    def test_late_flaps_move_the_bird_later(self):
+        heights = []
+        for phase in (0, PHASE_STEPS // 2, PHASE_STEPS - 1):
+            sim = Simulation(seed=1)
+            for _ in range(10):
+                sim.step()
+            sim.step(True, phase)
+            heights.append(sim.bird.y)
+        self.assertLess(heights[0], heights[1])
+        self.assertLess(heights[1], heights[2])
+        self.assertAlmostEqual(sim.bird.velocity, LIFT + GRAVITY)
+
+
+class TestObjectPool(unittest.TestCase):
+    def test_released_objects_are_reset_and_reused(self):
+        pool = ObjectPool(PipeState)
+        pipe = pool.acquire(3, 100)
+        pipe.x = -500
+        pool.release(pipe)
+        again = pool.acquire(4, 200)
+        self.assertIs(again, pipe)
+        self.assertEqual((again.x, again.speed, again.top_height), (SCREEN_WIDTH, 4, 200))
+        self.assertEqual((pool.created, pool.reused), (1, 1))
+
+    def test_entity_queue_expires_from_the_front(self):
+        queue = EntityQueue(PipeState)
+        for x in (-300, -100, 400):
+            queue.spawn(3, 100).x = x
+        self.assertEqual(queue.expire(PipeState.is_offscreen), 1)
+        self.assertEqual([pipe.x for pipe in queue], [-100, 400])
+        self.assertEqual(len(queue.pool), 1)
+
+    def test_simulation_recycles_pipes(self):
+        sim = Simulation(seed=42)
+
+        def controller(s):
+            ahead = next(pipe for pipe in s.pipes if pipe.x + pipe.width > s.bird.x)
+            return s.bird.y > ahead.top_height + 80 and s.bird.velocity >= 0
+
+        sim.play(controller, max_ticks=3000)
+        self.assertGreater(sim.pipes.pool.reused, 0)
+        self.assertLessEqual(sim.pipes.pool.created, 4)
+
+    def test_coins_share_faded_frames(self):
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        first, second = FloatingBitcoin(100, 200), FloatingBitcoin(300, 200)
+        first.alpha, second.alpha = 130, 131
+        sprite_cache.clear()
+        misses = sprite_cache.misses
+        first.render(screen)
+        second.render(screen)
+        self.assertEqual(sprite_cache.misses, misses + 1)
+        pygame.quit()
+
+
+class TestStreaming(unittest.TestCase):
+    def test_frame_sender_drops_frames_when_the_encoder_is_busy(self):
+        pygame.init()
+        screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        frames = queue.Queue(maxsize=1)
+        sender = FrameSender(frames, size=(64, 36))
+        for _ in range(3):
+            sender(screen)
+        frame_id, dropped, data = frames.get_nowait()
+        self.assertEqual((frame_id, len(data)), (1, 64 * 36 * 3))
+        self.assertEqual(sender.dropped, 2)
+        pygame.quit()
+
+    def test_encode_frame_produces_a_jpeg(self):
+        image, encode_ms = encode_frame(bytes(64 * 36 * 3), (64, 36))
+        self.assertEqual(image[:2], b"\xff\xd8")
+        self.assertGreaterEqual(encode_ms, 0)
+
+    def test_streamed_session_sends_frames_and_accepts_input(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        app = create_app(max_sessions=1, encoder_workers=1, leaderboard_path=os.path.join(directory.name, "scores.db"))
+        try:
+            client = app.test_client()
+            self.assertIn(b"gameCanvas", client.get("/").data)
+            session_id = client.post("/session").get_json()["id"]
+            self.assertEqual(client.post("/session").status_code, 503)  # Only one game may run
+            self.assertEqual(client.post(f"/session/{session_id}/input", json={"key": "space"}).status_code, 204)
+            self.assertEqual(client.post("/session/missing/input").status_code, 404)
+
+            response = client.get(f"/session/{session_id}/stream", buffered=False)
+            chunks, buffered, frames = iter(response.response), b"", 0
+            while frames < 5:
+                buffered += next(chunks)
+                while len(buffered) >= FRAME_HEADER.size:
+                    (length,) = FRAME_HEADER.unpack_from(buffered)
+                    if len(buffered) < FRAME_HEADER.size + length:
+                        break
+                    buffered = buffered[FRAME_HEADER.size + length:]
+                    frames += 1
+            metrics = client.get("/metrics").get_json()[session_id]
+            self.assertGreaterEqual(metrics["frames_sent"], 4)
+            self.assertGreater(metrics["bytes_sent"], 0)
+            self.assertEqual(metrics["inputs"], 1)
+            response.close()
+            self.assertEqual(client.get("/metrics").get_json(), {})
+        finally:
+            app.close_all()
+
+    def test_abandoned_session_is_reaped(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        app = create_app(max_sessions=1, encoder_workers=1, leaderboard_path=os.path.join(directory.name, "scores.db"),
+                         idle_timeout=0.2)
+        try:
+            client = app.test_client()
+            session_id = client.post("/session").get_json()["id"]
+            self.assertEqual(app.reap_sessions(), 0)
+            time.sleep(0.3)  # Never streamed and no input since it started
+            self.assertEqual(app.reap_sessions(), 1)
+            self.assertEqual(client.post(f"/session/{session_id}/input", json={"key": "space"}).status_code, 404)
+            self.assertEqual(client.post("/session").status_code, 200)  # Its slot is free again
+        finally:
+            app.close_all()
+
+
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "scores.db")
+        self.leaderboard = Leaderboard(self.path)
+
+    def tearDown(self):
+        self.leaderboard.close()
+        self.directory.cleanup()
+
+    def test_best_scores_rank_players(self):
+        for player, score in [("alice", 5), ("bob", 9), ("alice", 12), ("carol", 9), ("bob", 3)]:
+            self.leaderboard.submit(player, score)
+        self.assertTrue(self.leaderboard.flush(timeout=5))
+        self.assertEqual([(e["rank"], e["player"], e["score"]) for e in self.leaderboard.top(3)],
+                         [(1, "alice", 12), (2, "bob", 9), (2, "carol", 9)])
+        self.assertEqual(self.leaderboard.rank("carol")["rank"], 2)
+        self.assertEqual(self.leaderboard.rank("bob")["games"], 2)
+        self.assertIsNone(self.leaderboard.rank("dave"))
+
+    def test_closed_leaderboard_can_be_collected(self):
+        other = Leaderboard(os.path.join(self.directory.name, "other.db"))
+        reference = weakref.ref(other)
+        other.close()
+        del other
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_cached_top_is_invalidated_by_writes(self):
+        self.leaderboard.submit("alice", 5)
+        self.leaderboard.flush(timeout=5)
+        self.assertEqual(self.leaderboard.top(1)[0]["score"], 5)
+        self.leaderboard.submit("bob", 7)
+        self.leaderboard.flush(timeout=5)
+        self.assertEqual(self.leaderboard.top(1)[0]["player"], "bob")
+
+    def test_cached_top_sees_scores_from_other_processes(self):
+        self.assertEqual(self.leaderboard.top(5), [])
+        script = ("import sys; from leaderboard import Leaderboard; board = Leaderboard(sys.argv[1]); "
+                  "board.submit('alice', 42); board.close()")
+        subprocess.run([sys.executable, "-c", script, self.path], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual([(e["player"], e["score"]) for e in self.leaderboard.top(5)], [("alice", 42)])
+
+    def test_scores_persist_in_wal_mode(self):
+        for score in range(1000):
+            self.leaderboard.submit(f"player{score % 10}", score)
+        self.leaderboard.close()
+        self.assertGreater(self.leaderboard.batches, 0)
+        reopened = Leaderboard(self.path)
+        self.assertEqual(reopened.best("player9"), 999)
+        self.assertEqual(reopened._reader().execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        reopened.close()
+
+    def test_invalid_scores_are_rejected(self):
+        for player, score in [("", 1), ("x" * 40, 1), ("alice", -1), ("alice", "7"), ("alice", True),
+                              ("alice", 10**20)]:
+            with self.assertRaises(ValueError):
+                self.leaderboard.submit(player, score)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            player_name("x" * 40)
+        self.assertEqual(player_name(" alice "), "alice")
+
+    def test_a_bad_row_does_not_stop_the_writer(self):
+        self.leaderboard.submitted += 1
+        self.leaderboard.pending.put(("mallory", 10**20, time.time()))  # Past validate(), as from an old caller
+        self.leaderboard.submit("alice", 5)
+        self.assertTrue(self.leaderboard.flush(timeout=5))
+        self.assertTrue(self.leaderboard.writer.is_alive())
+        self.assertEqual(self.leaderboard.dropped, 1)
+        self.assertEqual([e["player"] for e in self.leaderboard.top(10)], ["alice"])
+
+    def test_endpoints(self):
+        app = create_app(encoder_workers=1, leaderboard_path=os.path.join(self.directory.name, "server.db"))
+        try:
+            client = app.test_client()
+            self.assertEqual(client.post("/scores", json={"player": "alice", "score": 4}).status_code, 202)
+            response = client.post("/scores", json=[{"player": "bob", "score": 8}, {"player": "carol", "score": 2}])
+            self.assertEqual(response.get_json(), {"accepted": 2})
+            self.assertEqual(client.post("/scores", json={"player": "bob"}).status_code, 400)
+            app.leaderboard.flush(timeout=5)
+            top = client.get("/leaderboard?n=2").get_json()["top"]
+            self.assertEqual([entry["player"] for entry in top], ["bob", "alice"])
+            self.assertEqual(client.get("/leaderboard/carol").get_json()["rank"], 3)
+            self.assertEqual(client.get("/leaderboard/dave").status_code, 404)
+        finally:
+            app.close_all()
+
+
+class TestTournament(unittest.TestCase):
+    def test_results_match_single_games(self):
+        report = tournament.run_tournament(["tournament:follow_gap", "tournament:never_flap"], games=12,
+                                           max_ticks=3000, workers=2, chunk_size=5)
+        expected = []
+        for seed in range(12):
+            sim = Simulation(seed, pixel_collision=True)  # The game's collision, the tournament default
+            expected.append(sim.play(tournament.follow_gap, 3000))
+        result = report["controllers"]["tournament:follow_gap"]
+        self.assertEqual(result["games"], 12)
+        self.assertAlmostEqual(result["mean"], round(sum(expected) / 12, 3))
+        self.assertEqual(result["max"], max(expected))
+        self.assertEqual(sum(count for _, _, count in result["histogram"]), 12)
+        self.assertEqual(report["controllers"]["tournament:never_flap"]["max"], 0)
+        self.assertGreater(report["games_per_s"], 0)
+        self.assertGreater(report["efficiency"], 0)
+        self.assertAlmostEqual(report["efficiency"], report["speedup"] / 2, delta=0.01)
+        unmeasured = tournament.run_tournament(["tournament:never_flap"], games=4, workers=1, reference_games=0)
+        self.assertIsNone(unmeasured["efficiency"])
+
+    def test_look_ahead_leaves_the_game_as_it_was(self):
+        sim = Simulation(seed=3)
+        for _ in range(200):
+            before = sim.state_hash()
+            flap = tournament.look_ahead(sim)
+            self.assertEqual(sim.state_hash(), before)
+            sim.step(flap)
+
+    def test_bad_controller_names_fail_early(self):
+        with self.assertRaises(ValueError):
+            tournament.load_controller("follow_gap")
+        with self.assertRaises(AttributeError):
+            tournament.load_controller("tournament:missing")
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_scenario_reports_fps_stages_and_allocations(self):
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        result = benchmark.run_scenario(screen, pygame.font.Font(None, 54), benchmark.SCENARIOS[1], frame_scale=0.02,
+                                        warmup_frames=5, lighting_effect=LightingEffect(use_cache=False))
+        pygame.quit()
+        self.assertEqual(result["frames"], 12)
+        self.assertGreater(result["fps"], 0)
+        for stage in ("bird", "pipes", "collision", "entities", "lighting"):  # The game's own stages
+            self.assertIn(stage, result["stages"])
+        self.assertIn("allocated_blocks", result)
+        self.assertGreaterEqual(result["peak_kib"], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_compare_flags_regressions(self):
+        baseline = {"scenarios": {"idle": {"fps": 100.0, "allocated_blocks": 0},
+                                  "soak": {"fps": 100.0, "allocated_blocks": 0}},
+                    "thresholds": {"soak": 0.5}}
+        results = {"idle": {"fps": 80.0, "allocated_blocks": 5000},
+                   "soak": {"fps": 60.0, "allocated_blocks": 0}}
+        failures = benchmark.compare(results, baseline, threshold=0.1, alloc_threshold=1000)
+        self.assertEqual(len(failures), 2)
+        self.assertTrue(all(failure.startswith("idle") for failure in failures))
+
+
+class TestSoak(unittest.TestCase):
+    def test_soak_samples_restarts_and_trends(self):
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        report = soak.run_soak(screen, pygame.font.Font(None, 54), hours=0.004, sample_minutes=0.04,
+                               render_every=8, mistake_rate=0.2, warmup_minutes=0.08)
+        pygame.quit()
+        self.assertEqual(report["ticks"], 432)
+        self.assertEqual(len(report["samples"]), 6)
+        self.assertGreater(report["games"], 1)
+        self.assertIn("traced_kib", report["growth_per_hour"])
+        self.assertIn("surfaces", report["samples"][-1])
+        self.assertLessEqual(report["samples"][-1]["text_cache"], 64)
+        self.assertIn("Growth per hour", soak.format_report(report, max_growth_kib=64))
+
+    def test_slope(self):
+        self.assertEqual(soak.slope([0, 1, 2], [5, 5, 5]), 0)
+        self.assertAlmostEqual(soak.slope([0, 1, 2], [1, 3, 5]), 2)
+        self.assertEqual(soak.slope([1], [3]), 0)
+
+
+class TestCollision(unittest.TestCase):
+    def setUp(self):
+        pygame.init()
+        self.collider = PixelCollider()
+
+    def tearDown(self):
+        pygame.quit()
+
+    def make_pipe(self, x, top_height=300):
+        pipe = PipeState(3, top_height)
+        pipe.x = x
+        return pipe
+
+    def test_bird_inside_a_pipe_hits(self):
+        bird = BirdState()
+        bird.y = 50
+        self.assertTrue(self.collider.hits(bird, self.make_pipe(bird.x)))
+
+    def test_bird_in_the_gap_or_far_away_misses(self):
+        bird = BirdState()
+        bird.y = 300 + PIPE_GAP // 2 - BIRD_HEIGHT // 2
+        self.assertFalse(self.collider.hits(bird, self.make_pipe(bird.x)))
+        self.assertFalse(self.collider.hits(BirdState(), self.make_pipe(900)))
+
+    def test_masks_are_prebuilt_for_every_angle(self):
+        masks = len(self.collider.bird_masks)
+        bird = BirdState()
+        pipe = self.make_pipe(bird.x)
+        for velocity in range(-8, 40):
+            bird.velocity = velocity
+            for pose in ("rising", "neutral", "falling"):
+                bird.pose = pose
+                self.collider.hits(bird, pipe)
+        self.assertEqual(len(self.collider.bird_masks), masks)
+
+    def test_pixel_hits_are_within_the_sprite_boxes(self):
+        rng = random.Random(4)
+        for _ in range(500):
+            bird = BirdState()
+            bird.y = rng.uniform(0, 720 - BIRD_HEIGHT)
+            bird.velocity = rng.uniform(-12, 12)
+            bird.pose = rng.choice(["rising", "neutral", "falling"])
+            pipe = self.make_pipe(rng.uniform(-200, 200), rng.randint(50, 490))
+            if self.collider.hits(bird, pipe):
+                bird_rect = self.collider.bird_rect(bird)
+                top = pygame.Rect(int(pipe.x), 0, 192, pipe.top_height)
+                bottom = pygame.Rect(int(pipe.x), 720 - pipe.bottom_height, 192, pipe.bottom_height)
+                self.assertTrue(bird_rect.colliderect(top) or bird_rect.colliderect(bottom))
+
+    def test_pixel_simulation_still_scores(self):
+        sim = Simulation(seed=42, pixel_collision=True)
+
+        def controller(s):
+            ahead = next(pipe for pipe in s.pipes if pipe.x + pipe.width > s.bird.x)
+            return s.bird.y > ahead.top_height + 80 and s.bird.velocity >= 0
+
+        sim.play(controller, max_ticks=3000)
+        self.assertGreater(sim.score, 0)
+
+
+class TestReplay(unittest.TestCase):
+    def record_game(self, seed=42):
+        sim = Simulation(seed)
+        recorder = Recorder(seed)
+        while not sim.game_over:
+            ahead = next(pipe for pipe in sim.pipes if pipe.x + pipe.width > sim.bird.x)
+            flap = sim.bird.y > ahead.top_height + 80 and sim.bird.velocity >= 0
+            recorder.record(sim.tick, flap)
+            sim.step(flap)
+        return sim, recorder.finish(sim)
+
+    def test_recording_round_trips_through_bytes(self):
+        _, recording = self.record_game()
+        data = recording.to_bytes()
+        copy = Recording.from_bytes(data)
+        self.assertEqual(copy.flaps, recording.flaps)
+        self.assertEqual((copy.seed, copy.ticks, copy.score, copy.state_hash),
+                         (recording.seed, recording.ticks, recording.score, recording.state_hash))
+        self.assertLess(len(data), 80 + 2 * len(recording.flaps))
+
+    def test_recording_keeps_the_collision_mode(self):
+        pygame.init()
+        sim = Simulation(5, pixel_collision=True)
+        recorder = Recorder(5)
+        for tick in range(200):
+            if sim.game_over:
+                break
+            recorder.record(sim.tick, tick % 10 == 0)
+            sim.step(tick % 10 == 0)
+        recording = Recording.from_bytes(recorder.finish(sim).to_bytes())
+        self.assertTrue(recording.pixel_collision)
+        self.assertTrue(verify(recording))
+        pygame.quit()
+
+    def test_replay_reproduces_the_game(self):
+        sim, recording = self.record_game()
+        replayed = replay(recording)
+        self.assertEqual(replayed.score, sim.score)
+        self.assertEqual(replayed.state_hash(), sim.state_hash())
+        self.assertTrue(verify(recording))
+
+    def test_flap_phases_are_recorded(self):
+        sim, recorder = Simulation(8), Recorder(8)
+        for tick in range(120):
+            if sim.game_over:
+                break
+            flap = tick % 9 == 0
+            recorder.record(sim.tick, flap, (tick * 37) % PHASE_STEPS)
+            sim.step(flap, (tick * 37) % PHASE_STEPS)
+        recording = Recording.from_bytes(recorder.finish(sim).to_bytes())
+        self.assertEqual(recording.phases, recorder.phases)
+        self.assertTrue(verify(recording))
+
+    def test_tampered_recording_fails(self):
+        _, recording = self.record_game()
+        recording.score += 1
+        self.assertFalse(verify(recording))
+
+    def test_recording_must_end_with_the_game(self):
+        sim, recording = self.record_game()
+        self.assertEqual(replay(Recording(recording.seed, recording.flaps, recording.ticks + 50, recording.score,
+                                          recording.state_hash)).tick, sim.tick)  # Nothing is stepped after game over
+        longer = Recording(recording.seed, recording.flaps, recording.ticks + 1, recording.score, recording.state_hash)
+        self.assertFalse(verify(longer))
+        late_flap = Recording(recording.seed, recording.flaps + [recording.ticks + 5], recording.ticks + 6,
+                              recording.score, recording.state_hash)
+        self.assertFalse(verify(late_flap))
+
+    def test_seeded_entities_are_reproducible(self):
+        pygame.init()
+        first, second = Pipe(3, rng=random.Random(5)), Pipe(3, rng=random.Random(5))
+        self.assertEqual(first.top_height, second.top_height)
+        pygame.quit()
+
 
 class TestGameOverScreen(unittest.TestCase):
 
@@ -65,10 +1346,16 @@ class TestGameOverScreen(unittest.TestCase):
         # Arrange: Set up the initial values for the score and best score
         score = 10
         best_score = 20
+        frames = []
+
+        def press_space(screen):
+            # The screen waits for SPACE, so press it from the first waiting frame
+            frames.append(screen)
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
 
         # Act: Call the game_over_screen function
         try:
-            game_over_screen(self.screen, self.font, score, best_score)
+            game_over_screen(self.screen, self.font, score, best_score, on_frame=press_space)
             success = True
         except Exception as e:
             success = False
@@ -76,31 +1363,34 @@ class TestGameOverScreen(unittest.TestCase):
 
         # Assert: Ensure the screen was updated without errors
         self.assertTrue(success)
+        self.assertTrue(frames)
 
 
 class TestResetGame(unittest.TestCase):
 
     def setUp(self):
-        # Setup any necessary initial conditions
-        self.initial_speed = 5
+        # Setup a game that has been played for a while
+        self.sim = Simulation(seed=3)
+        self.sim.play(tournament.follow_gap, max_ticks=900)
 
     def test_reset_game_returns_correct_objects(self):
-        # Act: Call the reset_game function
-        bitcoin, pipes, score = reset_game(self.initial_speed)
+        # Act: Reset the simulation
+        self.sim.reset()
 
-        # Assert: Check if the returned objects are of the correct types
-        self.assertIsInstance(bitcoin, Bitcoin)
-        self.assertIsInstance(pipes, list)
-        self.assertGreater(len(pipes), 0)
-        self.assertIsInstance(pipes[0], Pipe)
-        self.assertEqual(score, 0)
+        # Assert: Check that the bird, pipes and score start over
+        self.assertIsInstance(self.sim.bird, BirdState)
+        self.assertEqual((self.sim.bird.y, self.sim.bird.velocity), (SCREEN_HEIGHT // 2, 0))
+        self.assertEqual(len(self.sim.pipes), 1)
+        self.assertIsInstance(self.sim.pipes[0], PipeState)
+        self.assertEqual(self.sim.score, 0)
+        self.assertFalse(self.sim.game_over)
 
     def test_reset_game_initializes_pipe_with_correct_speed(self):
-        # Act: Call the reset_game function
-        bitcoin, pipes, _ = reset_game(self.initial_speed)
+        # Act: Reset the simulation
+        self.sim.reset()
 
         # Assert: Check if the pipe's speed matches the initial speed
-        self.assertEqual(pipes[0].speed, self.initial_speed)
+        self.assertEqual(self.sim.pipes[0].speed, SPEED_TABLE[0])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,213 @@
+"""Evaluate bot controllers on thousands of seeded courses, using every core and no window or audio.
+
+A controller is any callable controller(simulation) -> bool that decides from the bird and pipe
+state whether to flap (the Bitcoin.jump of the game) on the coming tick. Name them as module:function:
+
+    python tournament.py tournament:follow_gap tournament:never_flap mybots:smart --games 5000
+
+Every controller plays the same seeds, so their score distributions can be compared directly.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+from profiler import percentile
+from simulation import Simulation, BIRD_HEIGHT, PIPE_GAP, SCREEN_HEIGHT
+
+
+DEFAULT_CONTROLLERS = ["tournament:follow_gap", "tournament:never_flap"]
+
+
+def never_flap(sim):
+    """Baseline that lets the bird fall."""
+    return False
+
+
+def follow_gap(sim):
+    """Flap whenever the bird sinks below the middle of the gap of the next pipe."""
+    bird = sim.bird
+    ahead = next((pipe for pipe in sim.pipes if pipe.x + pipe.width > bird.x), None)
+    if ahead is None:
+        return bird.y > SCREEN_HEIGHT // 2 and bird.velocity >= 0
+    gap_middle = ahead.top_height + PIPE_GAP / 2
+    return bird.y + BIRD_HEIGHT / 2 > gap_middle + 20 and bird.velocity >= 0
+
+
+LOOKAHEAD_TICKS = 30  # One second of play
+
+
+def look_ahead(sim):
+    """follow_gap that first plays both choices for this tick a second ahead, each followed by follow_gap
+    play, and overrules it when the other choice survives longer. Both are played on sim itself and
+    rewound with snapshot/restore."""
+    start = sim.snapshot()
+    survived = []
+    for flap in (False, True):
+        sim.step(flap)
+        ticks = 0
+        while not sim.game_over and ticks < LOOKAHEAD_TICKS:
+            sim.step(follow_gap(sim))
+            ticks += 1
+        survived.append(ticks)
+        sim.restore(start)
+    if survived[0] == survived[1]:
+        return follow_gap(sim)
+    return survived[1] > survived[0]
+
+
+def load_controller(spec):
+    """Import a controller from "module:function"."""
+    module_name, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"Controller {spec!r} should look like module:function")
+    controller = getattr(importlib.import_module(module_name), name)
+    if not callable(controller):
+        raise ValueError(f"{spec} is not callable")
+    return controller
+
+
+def play_chunk(spec, seeds, max_ticks, pixel_collision=True):
+    """Worker task: play one game per seed and return compact records.
+
+    Returns (spec, first seed, scores as bytes of uint32, ticks as bytes of uint32).
+    """
+    controller = load_controller(spec)
+    scores, ticks = array("I"), array("I")
+    sim = Simulation(pixel_collision=pixel_collision)
+    for seed in seeds:
+        sim.reset(seed)
+        scores.append(sim.play(controller, max_ticks))
+        ticks.append(sim.tick)
+    return spec, seeds[0], scores.tobytes(), ticks.tobytes()
+
+
+def summarize(scores, ticks, max_ticks):
+    ordered = sorted(scores)
+    return {
+        "games": len(scores),
+        "mean": round(sum(scores) / len(scores), 3),
+        "p10": percentile(ordered, 10),
+        "median": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "max": ordered[-1],
+        "capped": sum(1 for tick in ticks if tick >= max_ticks),  # Still alive when the game was stopped
+        "ticks": sum(ticks),
+        "histogram": histogram(scores),
+    }
+
+
+def single_worker_throughput(specs, seeds, max_ticks, pixel_collision=True):
+    """Ticks per second of playing seeds with every controller in this one process, as a reference."""
+    ticks = 0
+    start = time.perf_counter()
+    for spec in specs:
+        ticks += sum(array("I", play_chunk(spec, seeds, max_ticks, pixel_collision)[3]))
+    return ticks / (time.perf_counter() - start)
+
+
+def run_tournament(specs, games, first_seed=0, max_ticks=20000, workers=None, chunk_size=50, pixel_collision=True,
+                   reference_games=None):
+    """Play games seeded courses with every controller and return per-controller results and timing.
+
+    The first reference_games seeds (default chunk_size, 0 to skip) are also played in a single process
+    beforehand, and the pool's throughput is compared with it to report how well it scales per core.
+    Throughput is measured in ticks per second, because games on different seeds differ in length.
+    Collisions are pixel-accurate like the game's; pixel_collision=False uses the faster trimmed boxes,
+    whose scores can differ from the game's on the same course.
+    """
+    for spec in specs:
+        load_controller(spec)  # Fail early, in this process, on a bad name
+    workers = workers or os.cpu_count()
+    seeds = range(first_seed, first_seed + games)
+    tasks = [(spec, seeds[i:i + chunk_size], max_ticks, pixel_collision)
+             for spec in specs for i in range(0, games, chunk_size)]
+    reference_games = chunk_size if reference_games is None else min(reference_games, games)
+    reference = (single_worker_throughput(specs, seeds[:reference_games], max_ticks, pixel_collision)
+                 if reference_games else None)
+
+    collected = {spec: {} for spec in specs}  # spec -> first seed -> (scores, ticks)
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        for spec, chunk_start, scores, ticks in pool.starmap(play_chunk, tasks):
+            collected[spec][chunk_start] = (array("I", scores), array("I", ticks))
+    elapsed = time.perf_counter() - start
+
+    results = {}
+    for spec in specs:
+        scores, ticks = array("I"), array("I")
+        for chunk_start in sorted(collected[spec]):
+            chunk_scores, chunk_ticks = collected[spec][chunk_start]
+            scores.extend(chunk_scores)
+            ticks.extend(chunk_ticks)
+        results[spec] = summarize(scores, ticks, max_ticks)
+
+    total_games = games * len(specs)
+    ticks_per_s = sum(r["ticks"] for r in results.values()) / elapsed
+    return {
+        "controllers": results,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "games_per_s": round(total_games / elapsed, 1),
+        "ticks_per_s": round(ticks_per_s),
+        "single_worker_ticks_per_s": round(reference) if reference else None,
+        # Throughput over that of one worker, and that per worker: 1.0 would be perfect scaling
+        "speedup": round(ticks_per_s / reference, 2) if reference else None,
+        "efficiency": round(ticks_per_s / (workers * reference), 3) if reference else None,
+    }
+
+
+def histogram(scores, buckets=10):
+    """Return [(low, high, count)] over equal-width score ranges."""
+    high = max(scores)
+    width = max(1, -(-(high + 1) // buckets))
+    counts = [0] * buckets
+    for score in scores:
+        counts[min(score // width, buckets - 1)] += 1
+    return [(i * width, (i + 1) * width - 1, count) for i, count in enumerate(counts) if count]
+
+
+def format_report(report):
+    lines = [f"{'controller':<28}{'games':>7}{'mean':>9}{'p10':>6}{'median':>8}{'p90':>6}{'max':>6}{'capped':>8}"]
+    for spec, result in report["controllers"].items():
+        lines.append(f"{spec:<28}{result['games']:>7}{result['mean']:>9.2f}{result['p10']:>6}{result['median']:>8}"
+                     f"{result['p90']:>6}{result['max']:>6}{result['capped']:>8}")
+    for spec, result in report["controllers"].items():
+        bars = "  ".join(f"{low}-{high}: {count}" for low, high, count in result["histogram"])
+        lines.append(f"{spec} score distribution  {bars}")
+    summary = (f"{report['games_per_s']} games/s, {report['ticks_per_s']} ticks/s on {report['workers']} workers "
+               f"in {report['elapsed_s']} s")
+    if report["speedup"] is not None:
+        summary += (f" ({report['speedup']}x the {report['single_worker_ticks_per_s']} ticks/s of one worker, "
+                    f"{report['efficiency']:.0%} scaling efficiency per core)")
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run bot controllers over many seeded Bitcoin Bird courses")
+    parser.add_argument("controllers", nargs="*", default=DEFAULT_CONTROLLERS,
+                        help="controllers as module:function (default: the built-in ones)")
+    parser.add_argument("--games", type=int, default=2000, help="seeded courses per controller")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=20000, help="stop a game that lasts this long")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=50, help="games per worker task")
+    parser.add_argument("--box-collision", action="store_true",
+                        help="test collisions against the trimmed boxes instead of the game's sprite masks; "
+                             "about twice as fast, but scores can differ from the game's")
+    parser.add_argument("--reference-games", type=int, default=None,
+                        help="games per controller played on one worker first to measure scaling (default: "
+                             "--chunk-size, 0 to skip)")
+    args = parser.parse_args(argv)
+
+    report = run_tournament(args.controllers, args.games, args.first_seed, args.max_ticks, args.workers,
+                            args.chunk_size, not args.box_collision, args.reference_games)
+    print(format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
+from collections import OrderedDict, deque
 import pygame
+from quality import settings as quality
+from resolution import SCREEN_WIDTH
 
-SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 720
+SCALE_STEP = 0.02  # Score animation scale factors are cached in steps of this size
+SCORE_TEXT_COLOR = (255, 255, 255)
+SCORE_GLOW_COLOR = (0, 0, 0)
+GLOW_ALPHA = int(0.4 * 255)  # Opacity of each offset copy of the text that makes up the glow
 
 def load_custom_font(size):
     try:
@@ -8,40 +14,118 @@ def load_custom_font(size):
     except:
         return pygame.font.Font(None, size)
 
-def draw_glowing_text(screen, text, font, x, y, glow_color, text_color, glow_radius=5):
-    """Draws glowing text with a shadow/glow effect."""
-    # Render the base text
-    text_surface = font.render(text, True, text_color)
+class TextCache:
+    """LRU cache of rendered text surfaces, keyed by string, font, colors and effect settings."""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.pending = deque()  # Surfaces queued by prerender_scales(spread=True), built a few per frame
+
+    def _get(self, key, build):
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = build()
+            self.entries[key] = surface
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return surface
+
+    def render(self, font, text, color):
+        return self._get(("text", font, text, color), lambda: font.render(text, True, color))
+
+    def glowing(self, font, text, glow_color, text_color, glow_radius):
+        """Return the text with its glow baked into one surface, padded by glow_radius on every side."""
+        def build():
+            text_surface = self.render(font, text, text_color)
+            width, height = text_surface.get_size()
+            surface = pygame.Surface((width + 2 * glow_radius, height + 2 * glow_radius), pygame.SRCALPHA)
+
+            # Draw the glow effect by blitting the text multiple times with an offset
+            glow_surface = font.render(text, True, glow_color)
+            glow_surface.set_alpha(GLOW_ALPHA)
+            for i in range(glow_radius, 0, -1):
+                for dx, dy in ((-i, -i), (i, -i), (-i, i), (i, i)):
+                    surface.blit(glow_surface, (glow_radius + dx, glow_radius + dy))
+
+            # Draw the main text on top of the glow
+            surface.blit(text_surface, (glow_radius, glow_radius))
+            return surface
+        return self._get(("glow", font, text, glow_color, text_color, glow_radius), build)
+
+    def scaled(self, font, text, color, factor):
+        """Return the text smoothly scaled by factor, rounded to SCALE_STEP so animation frames are reused."""
+        factor = round(factor / SCALE_STEP) * SCALE_STEP
+        def build():
+            text_surface = self.render(font, text, color)
+            width, height = text_surface.get_size()
+            return pygame.transform.smoothscale(text_surface, (int(width * factor), int(height * factor)))
+        return self._get(("scaled", font, text, color, factor), build)
+
+    def prerender_scales(self, font, text, color, start, end=1.0, spread=False):
+        """Render every cached animation step between start and end ahead of time.
+
+        With spread=True the steps are queued in animation order instead, for build_pending() to render.
+        """
+        steps = int(round(abs(start - end) / SCALE_STEP))
+        for step in range(steps, -1, -1):
+            factor = end + (start - end) * step / max(steps, 1)
+            if spread:
+                self.pending.append(lambda factor=factor: self.scaled(font, text, color, factor))
+            else:
+                self.scaled(font, text, color, factor)
 
-    # Draw the glow effect by rendering the text multiple times with an offset
-    for i in range(glow_radius, 0, -1):
-        glow_surface = font.render(text, True, glow_color)
-        glow_surface.set_alpha(0.4)
-        screen.blit(glow_surface, (x - i, y - i))
-        screen.blit(glow_surface, (x + i, y - i))
-        screen.blit(glow_surface, (x - i, y + i))
-        screen.blit(glow_surface, (x + i, y + i))
+    def build_pending(self, count=1):
+        """Render up to count queued surfaces. Call once per frame to spread the work out."""
+        for _ in range(min(count, len(self.pending))):
+            self.pending.popleft()()
 
-    # Draw the main text on top of the glow
-    screen.blit(text_surface, (x, y))
+    def clear(self):
+        self.entries.clear()
+        self.pending.clear()
+
+
+# Shared cache used by the score display
+text_cache = TextCache()
+
+
+def draw_glowing_text(screen, text, font, x, y, glow_color, text_color, glow_radius=5):
+    """Draws glowing text with a shadow/glow effect and returns the drawn rect."""
+    # The glow is baked once per string and reused until the text changes
+    surface = text_cache.glowing(font, text, glow_color, text_color, glow_radius)
+    return screen.blit(surface, (x - glow_radius, y - glow_radius))
 
 
 def display_score(screen, score, font, animation_factor=1.0):
-    """Displays the score with a stylish look and animation."""
+    """Displays the score with a stylish look and animation, and returns the drawn rect."""
     score_text = f"Wallet: {score}.00 BTC"
-    text_color = (255, 255, 255)  # Gold color for the score
-    glow_color = (0, 0, 0)  # White glow
+    text_color = SCORE_TEXT_COLOR
+    glow_color = SCORE_GLOW_COLOR
 
     # Create the glowing and animated score text
-    text_surface = font.render(score_text, True, text_color)
+    text_surface = text_cache.render(font, score_text, text_color)
     text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, 50))
 
     # Apply scaling animation to make the score grow when updated
     if animation_factor != 1.0:
-        scaled_surface = pygame.transform.smoothscale(text_surface,
-                                                      (int(text_rect.width * animation_factor),
-                                                       int(text_rect.height * animation_factor)))
+        scaled_surface = text_cache.scaled(font, score_text, text_color, animation_factor)
         text_rect = scaled_surface.get_rect(center=text_rect.center)
-        screen.blit(scaled_surface, text_rect.topleft)
-    else:
-        draw_glowing_text(screen, score_text, font, text_rect.x, text_rect.y, glow_color, text_color)
+        return screen.blit(scaled_surface, text_rect.topleft)
+    if not quality.glow:
+        return screen.blit(text_surface, text_rect.topleft)
+    return draw_glowing_text(screen, score_text, font, text_rect.x, text_rect.y, glow_color, text_color)
+
+
+def prepare_score(font, score, animation_factor=1.3):
+    """Queue the animation frames and glow of a new score, so display_score finds them built.
+
+    Only the first animation frame is rendered now. The rest, and the glow shown once the animation
+    ends, are built by text_cache.build_pending() over the following frames, so scoring causes no spike.
+    """
+    score_text = f"Wallet: {score}.00 BTC"
+    text_cache.pending.clear()  # The previous score's frames are no longer needed
+    text_cache.scaled(font, score_text, SCORE_TEXT_COLOR, animation_factor)
+    text_cache.prerender_scales(font, score_text, SCORE_TEXT_COLOR, animation_factor, spread=True)
+    text_cache.pending.append(lambda: text_cache.glowing(font, score_text, SCORE_GLOW_COLOR, SCORE_TEXT_COLOR, 5))